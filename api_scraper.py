@@ -21,10 +21,30 @@ if _file_dir not in sys.path:
     sys.path.insert(0, _file_dir)
 
 from __init__ import Deal, logger
+from keepa_cache import KeepaCache, FAILED_LOOKUP_TTL
+from keepa_budget import TokenBudget, LookupQueue, SEARCH_TOKEN_COST, PRODUCT_TOKEN_COST
+from price_history import PriceHistoryStore, decode_history, CSV_AMAZON, CSV_NEW
 
 # Keepa API Base URL
 KEEPA_API_URL = "https://api.keepa.com/"
 KEEPA_API_KEY = os.environ.get("KEEPA_API_KEY", "")
+# Keepa's product endpoint takes up to 100 ASINs per request
+KEEPA_BATCH_SIZE = 100
+# Smallest product request worth waiting for when tokens run low
+MIN_BATCH_SIZE = 10
+# Products kept per search term
+ASINS_PER_TERM = 10
+# Lookup priority of ASINs with no cached price - they can't be shown at all
+NEW_ASIN_PRIORITY = 100
+
+# Search terms for deals
+SEARCH_TERMS = [
+    "today's deals",
+    "best sellers",
+    "deals under 1000",
+    "electronics sale",
+    "fashion deals"
+]
 
 
 class KeepaScraper:
@@ -34,6 +54,10 @@ class KeepaScraper:
         self.source = "amazon"
         self.api_key = api_key or KEEPA_API_KEY
         self.session = requests.Session()
+        self.cache = KeepaCache()
+        self.budget = TokenBudget()
+        self.history = PriceHistoryStore()
+        self.api_calls = 0
         
     def search_products(self, search_term: str = "deals", domain: int = 3) -> List[Dict]:
         """Search for products on Amazon via Keepa"""
@@ -59,51 +83,174 @@ class KeepaScraper:
             logger.error(f"Keepa API error: {str(e)}")
             return []
     
+    def _keepa_get(self, endpoint: str, params: Dict[str, Any]) -> Dict:
+        """Call a Keepa endpoint, tracking the token state it reports"""
+        self.api_calls += 1
+        response = self.session.get(f"{KEEPA_API_URL}{endpoint}", params={"key": self.api_key, **params}, timeout=30)
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        # Error responses (e.g. 429) report tokens too
+        self.budget.update(data)
+        response.raise_for_status()
+        return data
+    
+    def search_asins(self, search_term: str, domain: int = 3) -> List[str]:
+        """ASINs matching a search term, served from cache while fresh"""
+        cached = self.cache.search_asins(search_term)
+        if cached is not None:
+            return cached
+        
+        if not self.budget.acquire(SEARCH_TOKEN_COST):
+            logger.info(f"Keepa tokens exhausted, skipping search: {search_term}")
+            return []
+        
+        try:
+            data = self._keepa_get("search", {
+                "domain": domain,
+                "term": search_term,
+                "type": "deals",
+                "asins-only": 1
+            })
+        except Exception as e:
+            logger.error(f"Keepa API error: {str(e)}")
+            return []
+        
+        asins = data.get("asinList") or [p["asin"] for p in data.get("products", []) if p.get("asin")]
+        self.cache.store_search(search_term, asins)
+        return asins
+    
+    def _lookup_priority(self, asin: str) -> float:
+        """Refresh order - unknown products first, then by last known discount"""
+        fields = self.cache.get(asin)
+        if not fields:
+            return NEW_ASIN_PRIORITY
+        if fields["original_price"] > 0:
+            return (fields["original_price"] - fields["current_price"]) / fields["original_price"] * 100
+        return 0
+    
+    def lookup_products(self, asins: List[str], domain: int = 3) -> List[Dict]:
+        """
+        Fetch products in priority order, in batches of up to KEEPA_BATCH_SIZE ASINs
+        Batches shrink to the available tokens and lookups left over when the
+        budget runs dry wait for the next run. ASINs of a failed batch, or
+        missing from Keepa's answer, are cached as unavailable.
+        """
+        queue = LookupQueue()
+        for asin in asins:
+            queue.push(asin, self._lookup_priority(asin))
+        
+        products = []
+        while queue:
+            size = min(KEEPA_BATCH_SIZE, len(queue))
+            available = self.budget.available()
+            if available < size * PRODUCT_TOKEN_COST:
+                size = max(int(available // PRODUCT_TOKEN_COST), min(MIN_BATCH_SIZE, size))
+            if not self.budget.acquire(size * PRODUCT_TOKEN_COST):
+                logger.info(f"Keepa tokens exhausted, deferring {len(queue)} lookups to the next run")
+                break
+            
+            batch = queue.pop_batch(size)
+            try:
+                data = self._keepa_get("product", {"domain": domain, "asin": ",".join(batch), "history": 1})
+            except Exception as e:
+                logger.error(f"Keepa API error for {len(batch)} ASINs: {str(e)}")
+                for asin in batch:
+                    self.cache.store_unavailable(asin, ttl=FAILED_LOOKUP_TTL)
+                continue
+            returned = data.get("products", [])
+            products.extend(returned)
+            for asin in set(batch) - {p.get("asin") for p in returned}:
+                self.cache.store_unavailable(asin)
+        return products
+    
+    def _product_fields(self, product: Dict) -> Optional[Dict[str, Any]]:
+        """Extract the Deal-relevant fields from a Keepa product"""
+        current_price = (product.get("currents") or [0])[0] / 100
+        original_price = (product.get("listPrice") or 0) / 100
+        
+        if current_price <= 0:
+            return None
+        
+        return {
+            "title": product.get("title", "Unknown Product")[:200],
+            "image": product.get("image", ""),
+            "current_price": current_price,
+            "original_price": original_price,
+        }
+    
+    def _store_history(self, product: Dict):
+        """Append the product's Amazon and marketplace price histories to the local store, one segment each"""
+        csv = product.get("csv") or []
+        for series in (CSV_AMAZON, CSV_NEW):
+            if series < len(csv) and csv[series]:
+                self.history.write(product["asin"], *decode_history(csv[series]), series=series)
+    
+    def _deal_quality(self, asin: str, current_price: float, discount: int) -> tuple:
+        """Rank key from local history - 90-day lows, then drops since yesterday, then discount"""
+        lowest = self.history.lowest_in(asin, days=90)
+        at_low = lowest is not None and current_price <= lowest
+        return (at_low, self.history.dropped_since(asin, hours=24), discount)
+    
     def get_product_deals(self, category: int = None) -> List[Deal]:
         """Get deals from Keepa API"""
-        deals = []
+        self.api_calls = 0
         
-        # Search terms for deals
-        search_terms = [
-            "today's deals",
-            "best sellers",
-            "deals under 1000",
-            "electronics sale",
-            "fashion deals"
-        ]
+        # ASINs across all search terms, each looked up once
+        asins = []
+        seen = set()
+        for term in SEARCH_TERMS:
+            for asin in self.search_asins(term)[:ASINS_PER_TERM]:
+                if asin not in seen:
+                    seen.add(asin)
+                    asins.append(asin)
+        
+        # Only products past their TTL are fetched again
+        stale = self.cache.stale(asins)
+        for product in self.lookup_products(stale):
+            try:
+                fields = self._product_fields(product)
+                if fields:
+                    self.cache.store_product(product["asin"], fields)
+                else:
+                    self.cache.store_unavailable(product["asin"])  # out of stock - stop listing it
+                self._store_history(product)
+            except Exception as e:
+                logger.debug(f"Error parsing product: {str(e)}")
+        self.cache.save()
+        logger.info(
+            f"Keepa: {len(asins)} ASINs, {len(stale)} stale, {self.api_calls} API calls, "
+            f"budget {self.budget.snapshot()}"
+        )
         
-        for term in search_terms:
-            products = self.search_products(term)
+        ranked = []
+        for asin in asins:
+            fields = self.cache.get(asin)
+            if not fields:
+                continue
+            
+            current_price = fields["current_price"]
+            original_price = fields["original_price"]
+            discount = 0
+            if original_price > 0:
+                discount = int(((original_price - current_price) / original_price) * 100)
             
-            for product in products[:10]:
-                try:
-                    # Parse Keepa product data
-                    current_price = product.get("currents", [0])[0] / 100
-                    original_price = product.get("listPrice", 0) / 100
-                    
-                    if current_price == 0:
-                        continue
-                    
-                    discount = 0
-                    if original_price > 0:
-                        discount = int(((original_price - current_price) / original_price) * 100)
-                    
-                    deal = Deal(
-                        product_name=product.get("title", "Unknown Product")[:200],
-                        product_url=f"https://www.amazon.in/dp/{product.get('asin', '')}",
-                        image_url=product.get("image", ""),
-                        current_price=current_price,
-                        original_price=original_price if original_price > 0 else current_price,
-                        discount_percent=discount,
-                        source=self.source,
-                        category=self._get_category_fromasin(product.get("asin", "")),
-                        timestamp=datetime.now().isoformat()
-                    )
-                    deals.append(deal)
-                except Exception as e:
-                    logger.debug(f"Error parsing product: {str(e)}")
+            ranked.append((self._deal_quality(asin, current_price, discount), Deal(
+                product_name=fields["title"],
+                product_url=f"https://www.amazon.in/dp/{asin}",
+                image_url=fields["image"],
+                current_price=current_price,
+                original_price=original_price if original_price > 0 else current_price,
+                discount_percent=discount,
+                source=self.source,
+                category=self._get_category_fromasin(asin),
+                timestamp=datetime.now().isoformat()
+            )))
         
-        return deals
+        # Best deals first, stable among equals
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return [deal for _, deal in ranked]
     
     def _get_category_fromasin(self, asin: str) -> str:
         """Infer category from ASIN"""
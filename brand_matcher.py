@@ -0,0 +1,81 @@
+"""
+Brand Matcher
+Aho-Corasick automaton that finds the longest known brand in a product name in one pass
+"""
+
+from collections import deque
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class BrandMatcher(Generic[V]):
+    """
+    Case-insensitive multi-pattern matcher over a brand -> value mapping
+    Matches must start at a word boundary ('HP' matches 'HP Victus' but not
+    'WHP'), and the longest match wins, the leftmost among equals.
+    """
+
+    def __init__(self, patterns: Dict[str, V]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (pattern length, value) per state, for the longest pattern ending there
+        self._output: List[Optional[Tuple[int, V]]] = [None]
+        # Next shorter pattern ending at a state, via failure links
+        self._output_link: List[int] = [0]
+
+        for pattern, value in patterns.items():
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern.lower():
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                    self._output_link.append(0)
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            if self._output[state] is None:  # first mapping wins for duplicate keys
+                self._output[state] = (len(pattern), value)
+        self._build_links()
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                link = self._fail[child]
+                self._output_link[child] = link if self._output[link] is not None else self._output_link[link]
+
+    def _matches(self, text: str) -> Iterator[Tuple[int, int, V]]:
+        """(start, length, value) of every pattern occurrence starting at a word boundary"""
+        state = 0
+        text = text.lower()
+        for end, char in enumerate(text, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+
+            match = state if self._output[state] is not None else self._output_link[state]
+            while match:
+                length, value = self._output[match]
+                start = end - length
+                if start == 0 or not text[start - 1].isalnum():
+                    yield start, length, value
+                match = self._output_link[match]
+
+    def find(self, text: str) -> Optional[V]:
+        """Value of the longest brand in text, None if there is none"""
+        best = min(self._matches(text), key=lambda m: (-m[1], m[0]), default=None)
+        return best[2] if best else None
+
+    def find_all(self, text: str) -> List[V]:
+        """Values of every pattern in text, in order of occurrence"""
+        return [value for _, _, value in sorted(self._matches(text), key=lambda m: (m[0], -m[1]))]
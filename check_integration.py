@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
-import json
+from coupon_store import CouponStore
+from restaurant_cache import RestaurantCache
 
-cache = json.load(open('restaurant_cache.json'))
+# Through the stores so journaled changes apply
+cache = RestaurantCache('restaurant_cache.json').restaurants
 rest = list(cache.values())[0]
 
 print('Sample restaurant from cache:')
@@ -15,8 +17,7 @@ print('Rating:', rest.get('rating'))
 print()
 
 # Now check if the coupons have coordinates
-coupons_data = json.load(open('data/coupons.json'))
-coupons = coupons_data['coupons']
+coupons = CouponStore('data/coupons.json').active()
 food = [c for c in coupons if c.get('category') == 'food']
 
 print(f'Food coupons: {len(food)}')
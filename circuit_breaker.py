@@ -0,0 +1,151 @@
+"""
+Circuit Breakers
+Per-source, per-endpoint breakers shared by the scrapers and the web app
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Consecutive failures before a breaker opens
+FAILURE_THRESHOLD = 3
+# Seconds an open breaker waits before letting a trial request through
+COOLDOWN_SECONDS = 600
+
+# Markers of a CAPTCHA / bot-check page served with a 200 status
+BLOCK_MARKERS = (
+    b"validateCaptcha",
+    b"Enter the characters you see below",
+    b"Are you a human",
+    b"g-recaptcha",
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected by an open breaker"""
+
+
+def looks_blocked(response) -> bool:
+    """Check if a successful response is actually a CAPTCHA or bot-check page"""
+    content = response.content or b""
+    return any(marker in content for marker in BLOCK_MARKERS)
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures, half-open trial after a cooldown"""
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 cooldown: float = COOLDOWN_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a request may go through"""
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+                logger.info(f"Circuit {self.name} half-open, allowing a trial request")
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.total_rejected += 1
+            return False
+
+    def record_success(self):
+        """Close the breaker after a successful request"""
+        if self.state == CLOSED and self.failures == 0:
+            return
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Count a failure, opening the breaker at the threshold or on a failed trial"""
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(
+                        f"Circuit {self.name} open after {self.failures} failure(s), "
+                        f"cooling down for {self.cooldown}s"
+                    )
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self._trial_in_flight = False
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func through the breaker, raising CircuitOpenError when open"""
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state for status output"""
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(0.0, round(self.cooldown - (self.clock() - self.opened_at), 1))
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "total_failures": self.total_failures,
+            "total_rejected": self.total_rejected,
+            "retry_in_seconds": retry_in,
+        }
+
+
+# Process-wide registry so the scheduler thread and the web app share breakers
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(source: str, endpoint: str, failure_threshold: int = FAILURE_THRESHOLD,
+                cooldown: float = COOLDOWN_SECONDS) -> CircuitBreaker:
+    """Get or create the breaker for a source and endpoint"""
+    name = f"{source}:{endpoint}"
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, failure_threshold, cooldown)
+                _breakers[name] = breaker
+    return breaker
+
+
+def breaker_status(source: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Snapshot of all breakers, optionally limited to one source"""
+    return {
+        name: breaker.snapshot()
+        for name, breaker in sorted(_breakers.items())
+        if source is None or name.startswith(f"{source}:")
+    }
@@ -0,0 +1,215 @@
+"""
+City Shards
+Restaurant data and coupons partitioned into one file per city, with a manifest, loaded on demand
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from opening_hours import OpeningHoursIndex
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SHARD_DIR = os.path.join(_file_dir, "data", "restaurants")
+MANIFEST_FILE = "manifest.json"
+# Best-rated coupons of every city, for views that span all cities
+SUMMARY_FILE = "summary.json"
+SUMMARY_PER_CITY = 12
+# Cities kept in memory at once - the least recently used is evicted first
+MAX_RESIDENT_SHARDS = 3
+
+
+def shard_file_name(city: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', city.lower()).strip('_') + ".json"
+
+
+def _write_json(path: str, data: Any, **kwargs):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+    os.replace(tmp_path, path)
+
+
+class CityShard:
+    """Restaurants and coupons of one city"""
+
+    def __init__(self, city: str, restaurants: Dict[str, Dict[str, Any]], coupons: List[Dict[str, Any]],
+                 updated: str = ""):
+        self.city = city
+        self.restaurants = restaurants
+        self.coupons = coupons
+        self.updated = updated
+        self._opening_index: Optional[OpeningHoursIndex] = None
+
+    @property
+    def opening_index(self) -> OpeningHoursIndex:
+        """Opening hours of the shard's coupons, built on first use"""
+        if self._opening_index is None:
+            self._opening_index = OpeningHoursIndex(self.coupons)
+        return self._opening_index
+
+
+class CityShardStore:
+    """
+    Directory of <city>.json shards plus manifest.json listing each city's
+    file, counts and update time, and summary.json with the best-rated
+    SUMMARY_PER_CITY coupons of each city. Shards are read on first access
+    and kept in an LRU of max_resident cities; the manifest is re-read when
+    it changes on disk, and a resident shard whose manifest entry is newer
+    is loaded again. ingest, if given, is applied to the coupons of every
+    shard and of the summary as they load.
+    """
+
+    def __init__(self, directory: str = DEFAULT_SHARD_DIR, max_resident: int = MAX_RESIDENT_SHARDS,
+                 ingest: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_FILE)
+        self.summary_path = os.path.join(directory, SUMMARY_FILE)
+        self.max_resident = max_resident
+        self.ingest = ingest
+        self._summary: Optional[CityShard] = None
+        self._summary_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+        self._manifest_mtime: Optional[int] = None
+        self._resident: "OrderedDict[str, CityShard]" = OrderedDict()
+
+    def _refresh_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            self._manifest, self._manifest_mtime = {}, None
+            return self._manifest
+        if mtime != self._manifest_mtime:
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f).get('cities', {})
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable shard manifest {self.manifest_path}: {e}")
+                self._manifest = {}
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def cities(self) -> List[str]:
+        """Cities with a shard, in manifest order"""
+        with self._lock:
+            return list(self._refresh_manifest())
+
+    def resident(self) -> List[str]:
+        """Cities currently in memory, least recently used first"""
+        with self._lock:
+            return list(self._resident)
+
+    def get(self, city: str) -> Optional[CityShard]:
+        """The city's shard, loading it if needed, None if the city has no shard"""
+        with self._lock:
+            entry = self._refresh_manifest().get(city)
+            if entry is None:
+                self._resident.pop(city, None)
+                return None
+            shard = self._resident.get(city)
+            if shard is not None and shard.updated == entry.get('updated', ''):
+                self._resident.move_to_end(city)
+                return shard
+            shard = self._load(city, entry)
+            if shard is None:
+                return None
+            self._resident[city] = shard
+            self._resident.move_to_end(city)
+            while len(self._resident) > self.max_resident:
+                evicted, _ = self._resident.popitem(last=False)
+                logger.info(f"Evicted restaurant shard {evicted}")
+            return shard
+
+    def _load(self, city: str, entry: Dict[str, Any]) -> Optional[CityShard]:
+        path = os.path.join(self.directory, entry.get('file', shard_file_name(city)))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable restaurant shard {path}: {e}")
+            return None
+        coupons = data.get('coupons', [])
+        if self.ingest:
+            coupons = self.ingest(coupons)
+        logger.info(f"Loaded restaurant shard {city}: {len(coupons)} coupons")
+        return CityShard(city, data.get('restaurants', {}), coupons, entry.get('updated', ''))
+
+    def summary(self) -> Optional[CityShard]:
+        """Best-rated coupons of every city as one shard without restaurants, None if there are no shards"""
+        with self._lock:
+            manifest = self._refresh_manifest()
+            if not manifest:
+                self._summary = self._summary_version = None
+                return None
+            if self._summary is None or self._summary_version != self._manifest_mtime:
+                by_city = self._read_summary()
+                coupons = [coupon for city in manifest for coupon in by_city.get(city, [])]
+                if self.ingest:
+                    coupons = self.ingest(coupons)
+                self._summary = CityShard("all", {}, coupons)
+                self._summary_version = self._manifest_mtime
+            return self._summary
+
+    def _read_summary(self) -> Dict[str, List[Dict[str, Any]]]:
+        try:
+            with open(self.summary_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('cities', {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable shard summary {self.summary_path}: {e}")
+            return {}
+
+    def shards(self, cities: Optional[Iterable[str]] = None) -> Iterator[CityShard]:
+        """Shards of the given cities, or of every city one at a time"""
+        for city in (self.cities() if cities is None else cities):
+            shard = self.get(city)
+            if shard is not None:
+                yield shard
+
+    def write(self, restaurants: Dict[str, Dict[str, Any]], coupons: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Partition restaurants ({key: restaurant}) and coupons by city into shard files
+        Every given city's shard is replaced; cities that aren't given keep
+        theirs. Returns the number of coupons per written city.
+        """
+        by_city: Dict[str, Dict[str, Any]] = {}
+        for key, restaurant in restaurants.items():
+            shard = by_city.setdefault(restaurant.get('city', ''), {'restaurants': {}, 'coupons': []})
+            shard['restaurants'][key] = restaurant
+        for coupon in coupons:
+            by_city.setdefault(coupon.get('city', ''), {'restaurants': {}, 'coupons': []})['coupons'].append(coupon)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            manifest = dict(self._refresh_manifest())
+            summary = self._read_summary()
+            updated = datetime.now().isoformat()
+            for city, shard in by_city.items():
+                if not city:
+                    continue
+                file_name = shard_file_name(city)
+                _write_json(os.path.join(self.directory, file_name),
+                            {'city': city, 'updated': updated, **shard}, separators=(',', ':'))
+                manifest[city] = {
+                    'file': file_name,
+                    'restaurants': len(shard['restaurants']),
+                    'coupons': len(shard['coupons']),
+                    'updated': updated,
+                }
+                summary[city] = sorted(shard['coupons'], key=lambda c: c.get('rating') or 0,
+                                       reverse=True)[:SUMMARY_PER_CITY]
+            # The manifest goes last - readers pick up shards and summary when it changes
+            _write_json(self.summary_path, {'updated': updated, 'cities': summary}, separators=(',', ':'))
+            _write_json(self.manifest_path, {'updated': updated, 'cities': manifest}, indent=2)
+        logger.info(f"💾 Wrote {len(by_city)} restaurant shards to {self.directory}")
+        return {city: len(shard['coupons']) for city, shard in by_city.items() if city}
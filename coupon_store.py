@@ -0,0 +1,192 @@
+"""
+Coupon Store
+Keyed coupon file with in-place upserts, tombstones and an append-only change journal
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fields that change on every generation and don't count as an update
+VOLATILE_FIELDS = {'timestamp', 'product_url', 'phone'}
+# Removed coupons stay in the file as tombstones this long, so readers see the removal
+TOMBSTONE_RETENTION = timedelta(days=7)
+# The journal is folded into the coupons file once it has this many lines
+# or half as many lines as there are coupons
+COMPACT_MIN_LINES = 500
+
+
+def coupon_key(coupon: Dict[str, Any]) -> str:
+    """Identity of a coupon in the store"""
+    return coupon.get('id') or coupon.get('coupon_code', '')
+
+
+def _is_tombstone(coupon: Dict[str, Any]) -> bool:
+    return bool(coupon.get('removed_at'))
+
+
+class CouponStore:
+    """
+    Coupons indexed by key, in file order
+    Changes are appended to <file>.journal as one JSON line per coupon and
+    the coupons file is rewritten only on compaction - readers should load
+    through CouponStore so journaled changes are applied.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._journal_lines = 0
+        self._rekeyed = False
+        self.coupons: Dict[str, Dict[str, Any]] = {}
+        for coupon in self._load_file():
+            self.coupons.setdefault(coupon_key(coupon), coupon)
+        self._replay_journal()
+
+    def _load_file(self) -> List[Dict[str, Any]]:
+        """Coupons of a {'coupons': [...]}, list or {code: coupon} file"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        if isinstance(data, dict) and 'coupons' in data:
+            return data['coupons']
+        if isinstance(data, list):
+            return data
+        if isinstance(data, dict):
+            return [value for value in data.values() if isinstance(value, dict)]
+        return []
+
+    def _replay_journal(self):
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._journal_lines += 1
+                    try:
+                        coupon = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of an interrupted write
+                    self.coupons[coupon_key(coupon)] = coupon
+        except FileNotFoundError:
+            pass
+
+    def active(self) -> List[Dict[str, Any]]:
+        """Coupons that have not been removed"""
+        return [coupon for coupon in self.coupons.values() if not _is_tombstone(coupon)]
+
+    def upsert(self, coupon: Dict[str, Any]) -> str:
+        """Add or update a coupon in place, returns 'added', 'updated' or 'unchanged'"""
+        key = coupon_key(coupon)
+        with self._lock:
+            current = self.coupons.get(key)
+            if current is None:
+                self.coupons[key] = coupon
+                self._pending.append(coupon)
+                return 'added'
+
+            changed = {field: value for field, value in coupon.items()
+                       if field not in VOLATILE_FIELDS and current.get(field) != value}
+            if not changed and not _is_tombstone(current):
+                return 'unchanged'
+            current.update(changed)
+            current.pop('removed_at', None)  # a removed coupon that came back
+            if 'timestamp' in coupon:
+                current['timestamp'] = coupon['timestamp']
+            self._pending.append(current)
+            return 'updated'
+
+    def remove(self, key: str) -> bool:
+        """Tombstone a coupon, returns False if it is unknown or already removed"""
+        with self._lock:
+            current = self.coupons.get(key)
+            if current is None or _is_tombstone(current):
+                return False
+            current['removed_at'] = datetime.now().isoformat()
+            self._pending.append(current)
+            return True
+
+    def assign_id(self, key: str, coupon_id: str) -> bool:
+        """Give a coupon stored under another key its id, returns False if the key is unknown or taken"""
+        with self._lock:
+            current = self.coupons.get(key)
+            if current is None or key == coupon_id or coupon_id in self.coupons:
+                return False
+            # The old key is still in the coupons file, so the next save compacts
+            self.coupons = {coupon_id if k == key else k: coupon for k, coupon in self.coupons.items()}
+            current['id'] = coupon_id
+            self._rekeyed = True
+            return True
+
+    def save(self) -> int:
+        """Append pending changes to the journal, compacting when it has grown, returns lines written"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._rekeyed:
+                self._compact()
+                return len(pending)
+            if not pending:
+                return 0
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(coupon, ensure_ascii=False) + '\n' for coupon in pending))
+            self._journal_lines += len(pending)
+            if self._journal_lines >= max(COMPACT_MIN_LINES, len(self.coupons) // 2):
+                self._compact()
+        return len(pending)
+
+    def compact(self):
+        """Rewrite the coupons file with journaled changes and drop old tombstones"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        cutoff = (datetime.now() - TOMBSTONE_RETENTION).isoformat()
+        self.coupons = {
+            key: coupon for key, coupon in self.coupons.items()
+            if not _is_tombstone(coupon) or coupon['removed_at'] >= cutoff
+        }
+        coupons = list(self.coupons.values())
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(),
+                'count': len(coupons),
+                'coupons': coupons,
+            }, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_lines = 0
+        self._rekeyed = False
+        logger.info(f"Compacted {self.path}: {len(coupons)} coupons")
+
+
+def merge(store: CouponStore, coupons: Iterable[Dict[str, Any]],
+          owned: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """
+    Upsert coupons into a store and tombstone owned coupons that are gone
+    owned maps a field name to the value marking coupons this merge manages,
+    e.g. {'category': 'food'}; only those can be removed. Returns a summary.
+    """
+    summary = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+    seen = set()
+    for coupon in coupons:
+        key = coupon_key(coupon)
+        if key in seen:
+            continue  # first coupon wins within a batch
+        seen.add(key)
+        summary[store.upsert(coupon)] += 1
+
+    if owned:
+        for key, coupon in list(store.coupons.items()):
+            if key not in seen and all(coupon.get(field) == value for field, value in owned.items()):
+                summary['removed'] += store.remove(key)
+    return summary
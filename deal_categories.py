@@ -0,0 +1,70 @@
+"""
+Deal Categories
+Rule-based deal classifier compiled from data/category_rules.json
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from brand_matcher import BrandMatcher
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_RULES_FILE = os.path.join(_file_dir, "data", "category_rules.json")
+
+# Used when the rules file has no default
+FALLBACK_RULE = {
+    "name": "shopping",
+    "icon": "fa-shopping-bag",
+    "gradient": "linear-gradient(135deg, #ff9a9e 0%, #fecfef 100%)",
+}
+
+
+class CategoryClassifier:
+    """
+    Picks the first rule whose categories contain the coupon's category or
+    whose keywords start a word of its description. Keywords of all rules are
+    compiled into one automaton, so a description is scanned once.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], default: Optional[Dict[str, Any]] = None):
+        self.rules = rules
+        self.default = default or FALLBACK_RULE
+        self._by_category: Dict[str, int] = {}
+        keywords: Dict[str, int] = {}
+        for index, rule in enumerate(rules):
+            for category in rule.get("categories", []):
+                self._by_category.setdefault(category.lower(), index)
+            for keyword in rule.get("keywords", []):
+                keywords.setdefault(keyword.lower(), index)
+        self._keywords = BrandMatcher(keywords)
+
+    @classmethod
+    def from_file(cls, rules_file: str = DEFAULT_RULES_FILE) -> "CategoryClassifier":
+        try:
+            with open(rules_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable category rules {rules_file}: {e}")
+            data = {}
+        return cls(data.get("rules", []), data.get("default"))
+
+    def classify(self, category: str, description: str) -> Dict[str, Any]:
+        """Matching rule for a coupon's category and description"""
+        matches = self._keywords.find_all(description or "")
+        index = self._by_category.get((category or "").lower())
+        if index is not None:
+            matches.append(index)
+        return self.rules[min(matches)] if matches else self.default
+
+    def apply(self, coupon: Dict[str, Any]) -> Dict[str, Any]:
+        """Store the deal category, icon and gradient on a coupon"""
+        rule = self.classify(coupon.get("category", ""), coupon.get("description", ""))
+        coupon["deal_category"] = rule["name"]
+        coupon["image_icon"] = rule["icon"]
+        coupon["image_gradient"] = rule["gradient"]
+        return coupon
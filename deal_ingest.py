@@ -0,0 +1,42 @@
+"""
+Deal Ingest
+Steps every freshly scraped deal batch goes through before it is stored
+"""
+
+import logging
+import threading
+from typing import Any, List, Optional
+
+from price_alerts import AlertEngine
+from update_deal_images import assign_brand_images
+
+logger = logging.getLogger(__name__)
+
+_alert_engine: Optional[AlertEngine] = None
+_alert_engine_lock = threading.Lock()
+
+
+def default_alert_engine() -> AlertEngine:
+    """Alert engine shared by the scrapers of this process"""
+    global _alert_engine
+    with _alert_engine_lock:
+        if _alert_engine is None:
+            _alert_engine = AlertEngine()
+        return _alert_engine
+
+
+def ingest_deals(deals: List[Any], sample: bool = False, alerts: Optional[AlertEngine] = None) -> int:
+    """
+    Set brand or category images and queue price-drop alerts for a scraped batch
+    Sample deals shown when scraping fails get images but never alert. A
+    failure in alert matching is logged and never fails the scrape. Returns
+    the number of alerts queued.
+    """
+    assign_brand_images(deals)
+    if sample or not deals:
+        return 0
+    try:
+        return (alerts or default_alert_engine()).process(deals)
+    except Exception as e:
+        logger.error(f"Alert matching failed for {len(deals)} deals: {e}")
+        return 0
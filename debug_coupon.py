@@ -1,13 +1,12 @@
 #!/usr/bin/env python3
 """Debug script to check restaurant cache and coupon integration"""
 
-import json
+from coupon_store import CouponStore
+from restaurant_cache import RestaurantCache
 
-# Check restaurant cache
+# Check restaurant cache - through RestaurantCache so journaled changes apply
 try:
-    with open('restaurant_cache.json') as f:
-        cache = json.load(f)
-    restaurants = cache.get('restaurants', [])
+    restaurants = list(RestaurantCache('restaurant_cache.json').restaurants.values())
     print(f'Restaurant cache: {len(restaurants)} restaurants')
     if restaurants:
         print(f'\nSample restaurant:')
@@ -24,9 +23,7 @@ except Exception as e:
 
 # Check coupons
 print('='*60)
-with open('data/coupons.json') as f:
-    data = json.load(f)
-coupons = data['coupons']
+coupons = CouponStore('data/coupons.json').active()
 food = [c for c in coupons if c.get('category') == 'food']
 
 print(f'Food coupons: {len(food)}')
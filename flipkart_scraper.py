@@ -11,8 +11,8 @@ import random
 import time
 import sys
 from datetime import datetime
-from typing import List, Optional
-from urllib.parse import urljoin
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urljoin, urlparse
 
 # Add current directory to path for imports
 import os
@@ -27,6 +27,11 @@ import requests
 from bs4 import BeautifulSoup
 
 from __init__ import Deal, logger
+from selector_strategy import Selector, SelectorStrategy
+from url_memory import UrlSuccessMemory, GONE_STATUSES
+from circuit_breaker import get_breaker, looks_blocked
+from page_cache import PageCache, content_hash
+from deal_ingest import ingest_deals
 
 # Flipkart URLs
 FLIPKART_BASE_URL = "https://www.flipkart.com"
@@ -41,6 +46,53 @@ CATEGORIES = [
     ("computers", "computers"),
 ]
 
+# Total deals per scrape() run
+MAX_DEALS = 50
+
+# Deal card containers, in default fallback order
+DEAL_CARD_SELECTORS = [
+    Selector("1xHGtK", "div", "class", "_1xHGtK"),
+    Selector("2kHMtA", "div", "class", "_2kHMtA", "exact"),
+    Selector("col-2-gKeQ", "div", "class", "col _2-gKeQ", "exact"),
+    Selector("product", "div", "class", "product", "icontains"),
+]
+SEARCH_RESULT_SELECTORS = [
+    Selector("2kHMtA", "div", "class", "_2kHMtA", "exact"),
+]
+
+# Fallback chains for fields inside a deal card
+LINK_SELECTORS = [
+    Selector("CG4Wz", "a", "class", "CG4Wz"),
+    Selector("1LKTO3", "a", "class", "_1LKTO3"),
+    Selector("1fQZEK", "a", "class", "_1fQZEK", "exact"),
+    Selector("product-href", "a", "href", "/p/"),
+]
+TITLE_SELECTORS = [
+    Selector("KzDlHZ", "div", "class", "KzDlHZ"),
+    Selector("4rR01T", "div", "class", "_4rR01T", "exact"),
+    Selector("s1Q9rs", "a", "class", "s1Q9rs"),
+    Selector("aaginpr", "div", "class", "aaginpr", "exact"),
+]
+IMAGE_SELECTORS = [
+    Selector("DByuf4", "img", "class", "DByuf4", "exact"),
+    Selector("396xMc", "img", "class", "_396xMc", "exact"),
+    Selector("2r5hL", "img", "class", "_2r5hL", "exact"),
+    Selector("img", "img"),
+]
+PRICE_SELECTORS = [
+    Selector("hl05eU", "div", "class", "hl05eU"),
+    Selector("30jeq3", "div", "class", "_30jeq3", "exact"),
+]
+ORIGINAL_PRICE_SELECTORS = [
+    Selector("MyjaPH", "div", "class", "MyjaPH"),
+    Selector("3I9_wc", "div", "class", "_3I9_wc", "exact"),
+    Selector("3Ay6Sb", "span", "class", "_3Ay6Sb", "exact"),
+]
+DISCOUNT_SELECTORS = [
+    Selector("G6XhEU", "div", "class", "G6XhEU"),
+    Selector("3Ay6Sb", "span", "class", "_3Ay6Sb", "exact"),
+]
+
 
 class FlipkartScraper:
     """Scraper for Flipkart deals"""
@@ -63,22 +115,51 @@ class FlipkartScraper:
             "Referer": "https://www.flipkart.com/",
         }
         self.session.headers.update(self.headers)
+        self.selectors = SelectorStrategy(self.source)
+        self.url_memory = UrlSuccessMemory(self.source)
+        self.page_cache = PageCache(self.source)
+        self.categories = CATEGORIES
         
     def _random_delay(self):
         """Add random delay to avoid detection"""
         time.sleep(random.uniform(1, 3))
     
-    def _get_page(self, url: str) -> Optional[BeautifulSoup]:
-        """Fetch a page and return BeautifulSoup object"""
+    def _fetch(self, url: str) -> Optional[bytes]:
+        """
+        Fetch a page and return its raw content
+        None if the page could not be fetched - breaker open, blocked or an
+        error - and empty content for a page that no longer exists
+        """
+        # Fail fast while the endpoint's breaker is open
+        breaker = get_breaker(self.source, urlparse(url).path or "/")
+        if not breaker.allow():
+            logger.info(f"Circuit {breaker.name} is open, skipping {url}")
+            return None
+        
         try:
             self._random_delay()
             response = self.session.get(url, timeout=30)
+            if response.status_code in GONE_STATUSES:
+                breaker.record_success()
+                logger.info(f"Page gone ({response.status_code}): {url}")
+                return b""
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            if looks_blocked(response):
+                raise ValueError("CAPTCHA page returned")
+            breaker.record_success()
+            return response.content
         except Exception as e:
+            breaker.record_failure()
             logger.error(f"Error fetching {url}: {str(e)}")
             return None
     
+    def _get_page(self, url: str) -> Optional[BeautifulSoup]:
+        """Fetch a page and return BeautifulSoup object"""
+        content = self._fetch(url)
+        if content is None:
+            return None
+        return BeautifulSoup(content, 'html.parser')
+    
     def _extract_price(self, price_str: str) -> float:
         """Extract numeric price from string"""
         if not price_str:
@@ -101,22 +182,15 @@ class FlipkartScraper:
     
     def _parse_deal_card(self, card, category: str) -> Optional[Deal]:
         """Parse a single deal card"""
+        fields = self._parse_card_fields(card, category)
+        return Deal(**fields) if fields else None
+    
+    def _parse_card_fields(self, card, category: str) -> Optional[Dict[str, Any]]:
+        """Parse a single deal card into Deal fields"""
         try:
-            # Find product link - Flipkart uses _1AtkZe or similar classes
-            link_elem = card.find('a', {'class': lambda x: x and 'CG4Wz' in x})
-            if not link_elem:
-                link_elem = card.find('a', {'class': lambda x: x and '_1LKTO3' in x})
-            if not link_elem:
-                link_elem = card.find('a', {'class': '_1fQZEK'})
-            
-            if not link_elem:
-                # Try generic anchor
-                links = card.find_all('a')
-                for link in links:
-                    href = link.get('href', '')
-                    if '/p/' in href:
-                        link_elem = link
-                        break
+            # Find product link - Flipkart uses _1AtkZe or similar classes,
+            # generic product anchor as last resort
+            link_elem = self.selectors.find(card, "card.link", LINK_SELECTORS)
             
             if not link_elem:
                 return None
@@ -128,13 +202,7 @@ class FlipkartScraper:
             product_url = urljoin(FLIPKART_BASE_URL, product_url)
             
             # Product name - Flipkart uses different classes
-            title_elem = card.find('div', {'class': lambda x: x and 'KzDlHZ' in x})
-            if not title_elem:
-                title_elem = card.find('div', {'class': '_4rR01T'})
-            if not title_elem:
-                title_elem = card.find('a', {'class': lambda x: x and 's1Q9rs' in x})
-            if not title_elem:
-                title_elem = card.find('div', {'class': 'aaginpr'})
+            title_elem = self.selectors.find(card, "card.title", TITLE_SELECTORS)
             
             if not title_elem:
                 return None
@@ -144,20 +212,12 @@ class FlipkartScraper:
                 return None
             
             # Image
-            img_elem = card.find('img', {'class': 'DByuf4'})
-            if not img_elem:
-                img_elem = card.find('img', {'class': '_396xMc'})
-            if not img_elem:
-                img_elem = card.find('img', {'class': '_2r5hL'})
-            if not img_elem:
-                img_elem = card.find('img')
+            img_elem = self.selectors.find(card, "card.image", IMAGE_SELECTORS)
             
             image_url = img_elem.get('src', '') if img_elem else ''
             
             # Price - current price
-            price_elem = card.find('div', {'class': lambda x: x and 'hl05eU' in x})
-            if not price_elem:
-                price_elem = card.find('div', {'class': '_30jeq3'})
+            price_elem = self.selectors.find(card, "card.price", PRICE_SELECTORS)
             
             current_price = 0
             if price_elem:
@@ -165,20 +225,14 @@ class FlipkartScraper:
             
             # Original price
             original_price = current_price
-            orig_price_elem = card.find('div', {'class': lambda x: x and 'MyjaPH' in x})
-            if not orig_price_elem:
-                orig_price_elem = card.find('div', {'class': '_3I9_wc'})
-            if not orig_price_elem:
-                orig_price_elem = card.find('span', {'class': '_3Ay6Sb'})
+            orig_price_elem = self.selectors.find(card, "card.original_price", ORIGINAL_PRICE_SELECTORS)
             
             if orig_price_elem:
                 original_price = self._extract_price(orig_price_elem.get_text())
             
             # Discount
             discount = 0
-            discount_elem = card.find('div', {'class': lambda x: x and 'G6XhEU' in x})
-            if not discount_elem:
-                discount_elem = card.find('span', {'class': '_3Ay6Sb'})
+            discount_elem = self.selectors.find(card, "card.discount", DISCOUNT_SELECTORS)
             
             if discount_elem:
                 discount = self._extract_discount(discount_elem.get_text())
@@ -188,106 +242,125 @@ class FlipkartScraper:
             if current_price == 0:
                 return None
             
-            return Deal(
-                product_name=product_name,
-                product_url=product_url,
-                image_url=image_url,
-                current_price=current_price,
-                original_price=original_price if original_price > 0 else current_price,
-                discount_percent=discount,
-                source=self.source,
-                category=category,
-                timestamp=datetime.now().isoformat()
-            )
+            return {
+                "product_name": product_name,
+                "product_url": product_url,
+                "image_url": image_url,
+                "current_price": current_price,
+                "original_price": original_price if original_price > 0 else current_price,
+                "discount_percent": discount,
+                "source": self.source,
+                "category": category,
+                "timestamp": datetime.now().isoformat(),
+            }
             
         except Exception as e:
             logger.debug(f"Error parsing deal card: {str(e)}")
             return None
     
-    def scrape_deals_page(self, category: str = "electronics") -> List[Deal]:
-        """Scrape deals from Flipkart"""
-        deals = []
+    def _iter_page(self, url: str, content: bytes, category: str, page_kind: str) -> Iterator[Deal]:
+        """Yield deals from a fetched page, reusing the last result if its content is unchanged"""
+        page_hash = content_hash(content)
+        cached = self.page_cache.lookup(category, url, page_hash)
+        if cached is not None:
+            logger.info(f"Page unchanged, reusing {len(cached)} parsed deals: {url}")
+            for fields in cached:
+                yield Deal(**fields)
+            return
         
-        # Try different deal URLs
-        urls_to_try = [
-            f"{FLIPKART_BASE_URL}/offers",
-            f"{FLIPKART_BASE_URL}/offer/electronics",
-            f"{FLIPKART_BASE_URL}/search?q=deals+{category}",
-        ]
-        
-        for url in urls_to_try:
-            logger.info(f"Trying Flipkart URL: {url}")
-            soup = self._get_page(url)
-            
-            if not soup:
-                continue
-            
-            # Find deal cards - try multiple selectors
-            deal_cards = soup.find_all('div', {'class': lambda x: x and '_1xHGtK' in x})
-            
-            if not deal_cards:
-                deal_cards = soup.find_all('div', {'class': '_2kHMtA'})
-            
-            if not deal_cards:
-                deal_cards = soup.find_all('div', {'class': 'col _2-gKeQ'})
-            
-            if not deal_cards:
-                # Try generic product container
-                deal_cards = soup.find_all('div', {'class': lambda x: x and 'product' in x.lower()})
+        parsed = []
+        soup = BeautifulSoup(content, 'html.parser')
+        for fields in self._iter_listing_fields(soup, category, page_kind):
+            parsed.append(fields)
+            yield Deal(**fields)
+        # Only reached when the consumer read the whole page, so partial parses are never cached
+        self.page_cache.store(category, url, page_hash, parsed)
+    
+    def _iter_listing_fields(self, soup: BeautifulSoup, category: str, page_kind: str) -> Iterator[Dict[str, Any]]:
+        """Yield Deal fields from a listing page as each card is parsed"""
+        if page_kind == "deals":
+            # Find deal cards - all selectors matched in one pass
+            selector, deal_cards = self.selectors.select_all(soup, "deals", DEAL_CARD_SELECTORS)
+            if selector:
+                logger.debug(f"Deal cards matched by selector: {selector.name}")
             
             logger.info(f"Found {len(deal_cards)} potential deal cards")
             
             for card in deal_cards[:20]:  # Limit to 20 deals
-                deal = self._parse_deal_card(card, category)
-                if deal:
-                    deals.append(deal)
+                fields = self._parse_card_fields(card, category)
+                if fields:
+                    yield fields
+        else:
+            # Find product items
+            _, items = self.selectors.select_all(soup, "search", SEARCH_RESULT_SELECTORS)
             
-            if deals:
-                break
-        
-        # If no deals from deals page, try search pages
-        if not deals:
-            logger.info("No deals from deals page, trying search pages")
-            search_urls = [
-                f"{FLIPKART_BASE_URL}/search?q=today%27s+deals",
-                f"{FLIPKART_BASE_URL}/search?q=best+offers",
-                f"{FLIPKART_BASE_URL}/search?q=discount+{category}",
-            ]
-            
-            for url in search_urls:
-                soup = self._get_page(url)
-                if soup:
-                    # Find product items
-                    items = soup.find_all('div', {'class': '_2kHMtA'})
-                    
-                    for item in items[:15]:
-                        deal = self._parse_deal_card(item, category)
-                        if deal and deal.discount_percent > 10:
-                            deals.append(deal)
-                    
-                    if deals:
-                        break
-        
+            for item in items[:15]:
+                fields = self._parse_card_fields(item, category)
+                if fields and fields["discount_percent"] > 10:
+                    yield fields
+    
+    def _parse_listing_fields(self, soup: BeautifulSoup, category: str, page_kind: str) -> List[Dict[str, Any]]:
+        """Parse a listing page into Deal fields - safe to run in a worker process"""
+        return list(self._iter_listing_fields(soup, category, page_kind))
+    
+    def _candidate_urls(self, category: str) -> Dict[str, str]:
+        """Candidate URLs for a category mapped to their page kind"""
+        # Deal URLs first, search pages as fallback
+        return {
+            f"{FLIPKART_BASE_URL}/offers": "deals",
+            f"{FLIPKART_BASE_URL}/offer/electronics": "deals",
+            f"{FLIPKART_BASE_URL}/search?q=deals+{category}": "deals",
+            f"{FLIPKART_BASE_URL}/search?q=today%27s+deals": "search",
+            f"{FLIPKART_BASE_URL}/search?q=best+offers": "search",
+            f"{FLIPKART_BASE_URL}/search?q=discount+{category}": "search",
+        }
+    
+    def iter_deals_page(self, category: str = "electronics", limit: Optional[int] = None) -> Iterator[Deal]:
+        """Yield deals for one category from the first candidate URL that has any"""
+        candidates = self._candidate_urls(category)
+        yield from self.url_memory.iter_candidates(
+            category, list(candidates), self._fetch,
+            lambda url, content: self._iter_page(url, content, category, candidates[url]),
+            limit,
+        )
+    
+    def scrape_deals_page(self, category: str = "electronics", limit: Optional[int] = None) -> List[Deal]:
+        """Scrape deals from Flipkart"""
+        deals = list(self.iter_deals_page(category, limit))
         logger.info(f"Scraped {len(deals)} deals from Flipkart")
         return deals
     
+    def iter_deals(self, limit: Optional[int] = MAX_DEALS) -> Iterator[Deal]:
+        """Yield deals across all categories as they are parsed, stopping at limit"""
+        self.page_cache.reset_counters()
+        count = 0
+        try:
+            for cat_id, cat_name in self.categories:
+                logger.info(f"Scraping Flipkart category: {cat_name}")
+                remaining = None if limit is None else limit - count
+                for deal in self.iter_deals_page(cat_name, remaining):
+                    count += 1
+                    yield deal
+                
+                if limit is not None and count >= limit:
+                    break
+        finally:
+            self.url_memory.save()
+            self.page_cache.save()
+            logger.info(f"Flipkart pages unchanged: {self.page_cache.hits}, parsed: {self.page_cache.misses}")
+    
     def scrape(self) -> List[Deal]:
         """Main scrape method - scrape all categories"""
-        all_deals = []
-        
-        for cat_id, cat_name in CATEGORIES:
-            logger.info(f"Scraping Flipkart category: {cat_name}")
-            deals = self.scrape_deals_page(cat_name)
-            all_deals.extend(deals)
-            
-            if len(all_deals) >= 50:  # Limit total deals
-                break
+        all_deals = list(self.iter_deals(MAX_DEALS))
         
         # If we don't have many deals, add sample deals for demo
-        if len(all_deals) < 5:
+        sample = len(all_deals) < 5
+        if sample:
             logger.info("Adding sample deals for demonstration")
             all_deals = self._get_sample_deals()
         
+        # Images and price-drop alerts before the aggregator stores the batch
+        ingest_deals(all_deals, sample=sample)
         return all_deals
     
     def _get_sample_deals(self) -> List[Deal]:
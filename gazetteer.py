@@ -0,0 +1,116 @@
+"""
+Location Gazetteer
+Sub-location centroids loaded from data/gazetteer.json into a compact array-backed lookup
+"""
+
+import os
+import json
+import math
+import logging
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_GAZETTEER_FILE = os.path.join(_file_dir, "data", "gazetteer.json")
+EARTH_RADIUS_KM = 6371
+
+
+def _normalize(name: str) -> str:
+    return " ".join((name or "").casefold().split())
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    dlat, dlng = math.radians(lat2 - lat1), math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Gazetteer:
+    """
+    Coordinates of a city's localities, with the city centre as fallback
+    Points are stored as lat, lng pairs in one array of doubles; the index
+    maps (city, location) to a slot, with location "" for the centre.
+    """
+
+    def __init__(self, cities: Dict[str, Dict[str, Any]]):
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._points = array('d')
+        self._cities: List[str] = []  # city name of each slot
+        for city, info in cities.items():
+            city_key = _normalize(city)
+            if info.get("centre"):
+                self._add(city, (city_key, ""), info["centre"])
+            for location, point in info.get("locations", {}).items():
+                self._add(city, (city_key, _normalize(location)), point)
+
+    def _add(self, city: str, key: Tuple[str, str], point: Iterable[float]):
+        if key not in self._index:
+            self._index[key] = len(self._points) // 2
+            self._points.extend(point)
+            self._cities.append(city)
+
+    @classmethod
+    def from_file(cls, gazetteer_file: str = DEFAULT_GAZETTEER_FILE) -> "Gazetteer":
+        try:
+            with open(gazetteer_file, 'r', encoding='utf-8') as f:
+                cities = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable gazetteer {gazetteer_file}: {e}")
+            cities = {}
+        return cls(cities)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _slot(self, city: str, location: str) -> Optional[int]:
+        city_key = _normalize(city)
+        slot = self._index.get((city_key, _normalize(location)))
+        return slot if slot is not None else self._index.get((city_key, ""))
+
+    def coordinates(self, city: str, location: str) -> Optional[Tuple[float, float]]:
+        """Centroid of a locality, the city centre if it is unknown, None for unknown cities"""
+        slot = self._slot(city, location)
+        if slot is None:
+            return None
+        return self._points[2 * slot], self._points[2 * slot + 1]
+
+    def assign(self, restaurants: Iterable[Dict[str, Any]]) -> int:
+        """
+        Set latitude and longitude on restaurants from their city and location
+        Each distinct (city, location) is resolved once. Restaurants in unknown
+        cities get None. Returns how many were placed at a locality centroid
+        rather than a city centre or nowhere.
+        """
+        resolved: Dict[Tuple[str, str], Tuple[Optional[int], bool]] = {}
+        exact = 0
+        for restaurant in restaurants:
+            key = (restaurant.get('city', ''), restaurant.get('location', ''))
+            if key not in resolved:
+                city_key, location_key = _normalize(key[0]), _normalize(key[1])
+                slot = self._index.get((city_key, location_key)) if location_key else None
+                resolved[key] = (slot, True) if slot is not None else (self._index.get((city_key, "")), False)
+            slot, is_locality = resolved[key]
+            if slot is None:
+                restaurant['latitude'] = restaurant['longitude'] = None
+                continue
+            restaurant['latitude'] = self._points[2 * slot]
+            restaurant['longitude'] = self._points[2 * slot + 1]
+            exact += is_locality
+        return exact
+
+    def cities_near(self, lat: float, lng: float, max_distance_km: float) -> List[str]:
+        """
+        Cities with a locality or centre within max_distance_km of a point
+        Restaurants sit on these points, so no restaurant of another city can
+        be that close. Nearest city first.
+        """
+        nearest: Dict[str, float] = {}
+        for slot, city in enumerate(self._cities):
+            distance = haversine_km(lat, lng, self._points[2 * slot], self._points[2 * slot + 1])
+            if distance <= max_distance_km and distance < nearest.get(city, float("inf")):
+                nearest[city] = distance
+        return sorted(nearest, key=nearest.get)
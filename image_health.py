@@ -0,0 +1,229 @@
+"""
+Image Health Checker
+Validates image_url fields with concurrent HEAD requests and cached results
+"""
+
+import os
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+
+from coupon_store import CouponStore
+from restaurant_cache import RestaurantCache
+from update_deal_images import DEFAULT_CATEGORY_IMAGES, DEFAULT_IMAGE
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_STATE_FILE = os.path.join(_file_dir, "data", "image_health.json")
+
+# Concurrent requests in flight
+MAX_WORKERS = 8
+# Seconds per request
+TIMEOUT = 5
+# Working images are rechecked daily, broken ones sooner in case they recover
+OK_TTL = 24 * 3600
+FAILED_TTL = 3600
+
+# Replacement images for broken URLs, by category
+CATEGORY_FALLBACK_IMAGES = {
+    **DEFAULT_CATEGORY_IMAGES,
+    'food': 'https://images.unsplash.com/photo-1546069901-ba9599a7e63c?w=400&h=300&fit=crop',
+}
+
+# Files whose image_url fields are validated by main()
+IMAGE_FILES = [
+    os.path.join(_file_dir, "data", "coupons.json"),
+    os.path.join(_file_dir, "data", "combined_deals.json"),
+    os.path.join(_file_dir, "coupons.json"),
+    os.path.join(_file_dir, "restaurant_cache.json"),
+]
+
+
+def category_fallback(item: Dict[str, Any]) -> str:
+    """Default image for an item's category"""
+    category = (item.get("category") or "").lower()
+    if not category and item.get("cuisines"):
+        category = "food"  # restaurants carry cuisines instead of a category
+    return CATEGORY_FALLBACK_IMAGES.get(category, DEFAULT_IMAGE)
+
+
+class ImageHealthChecker:
+    """Bounded-concurrency image URL checks with a TTL result cache"""
+
+    def __init__(self, state_file: Optional[str] = DEFAULT_STATE_FILE, max_workers: int = MAX_WORKERS,
+                 timeout: float = TIMEOUT, session: Optional[requests.Session] = None,
+                 clock: Callable[[], float] = time.time):
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.results: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not self.state_file:
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable image health cache {self.state_file}: {e}")
+            return {}
+
+    def save(self):
+        """Write cached results atomically"""
+        if not self.state_file:
+            return
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+                tmp_path = f"{self.state_file}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.results, f)
+                os.replace(tmp_path, self.state_file)
+            except Exception as e:
+                logger.error(f"Failed to save image health cache: {e}")
+
+    def cached(self, url: str) -> Optional[bool]:
+        """Cached result while within its TTL, None otherwise"""
+        entry = self.results.get(url)
+        if entry is None:
+            return None
+        ttl = OK_TTL if entry["ok"] else FAILED_TTL
+        if self.clock() - entry["checked_at"] >= ttl:
+            return None
+        return entry["ok"]
+
+    def probe(self, url: str) -> bool:
+        """Check that a URL serves an image"""
+        try:
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+            if response.status_code in (403, 405, 501):
+                # Some hosts reject HEAD - fall back to a GET without reading the body
+                response = self.session.get(url, timeout=self.timeout, stream=True)
+                response.close()
+            content_type = response.headers.get("Content-Type", "")
+            return response.status_code < 400 and (not content_type or content_type.startswith("image/"))
+        except requests.RequestException as e:
+            logger.debug(f"Image check failed for {url}: {e}")
+            return False
+
+    def check_many(self, urls: Iterable[str]) -> Dict[str, bool]:
+        """Result for every URL, probing only those without a fresh cached result"""
+        results = {}
+        to_probe = []
+        for url in dict.fromkeys(u for u in urls if u):
+            cached = self.cached(url)
+            if cached is None:
+                to_probe.append(url)
+            else:
+                results[url] = cached
+
+        if to_probe:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for url, ok in zip(to_probe, pool.map(self.probe, to_probe)):
+                    results[url] = ok
+                    with self._lock:
+                        self.results[url] = {"ok": ok, "checked_at": self.clock()}
+            logger.info(f"Checked {len(to_probe)} image URLs, {sum(not results[u] for u in to_probe)} broken")
+        return results
+
+    def validate(self, items: List[Dict[str, Any]],
+                 fallback: Callable[[Dict[str, Any]], str] = category_fallback) -> int:
+        """Replace broken image_url fields with the fallback, returns how many were replaced"""
+        results = self.check_many(item.get("image_url") for item in items)
+        replaced = 0
+        for item in items:
+            url = item.get("image_url")
+            if url and not results.get(url, True):
+                item["image_url"] = fallback(item)
+                replaced += 1
+        return replaced
+
+
+def _items_in(data: Any) -> List[Dict[str, Any]]:
+    """Items of a coupons, deals or restaurant cache file"""
+    if isinstance(data, dict):
+        for key in ("coupons", "deals"):
+            if key in data:
+                return data[key]
+        return [value for value in data.values() if isinstance(value, dict)]
+    return data if isinstance(data, list) else []
+
+
+def _validate_coupons(path: str, checker: ImageHealthChecker) -> int:
+    """Validate a coupons file through its store, journaling the replaced images"""
+    store = CouponStore(path)
+    coupons = [dict(coupon) for coupon in store.active()]
+    replaced = checker.validate(coupons)
+    if replaced:
+        for coupon in coupons:
+            store.upsert(coupon)
+        store.save()
+    return replaced
+
+
+def _validate_restaurants(path: str, checker: ImageHealthChecker) -> int:
+    """Validate a restaurant cache through its journal"""
+    cache = RestaurantCache(path)
+    entries = {key: dict(entry) for key, entry in cache.restaurants.items()}
+    replaced = checker.validate(list(entries.values()))
+    if replaced:
+        for key, entry in entries.items():
+            if entry.get("image_url") != cache.restaurants[key].get("image_url"):
+                cache.update(key, {"image_url": entry["image_url"]})
+        cache.flush()
+    return replaced
+
+
+def _validate_json(path: str, checker: ImageHealthChecker) -> int:
+    """Validate a plain JSON file, rewriting it when images were replaced"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    replaced = checker.validate(_items_in(data))
+    if replaced:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    return replaced
+
+
+def validate_files(paths: List[str] = IMAGE_FILES, checker: Optional[ImageHealthChecker] = None) -> Dict[str, int]:
+    """
+    Validate images in each file, writing only files with replacements
+    Coupon files and the restaurant cache are snapshots with a journal beside
+    them, so they are loaded and saved through CouponStore and RestaurantCache.
+    """
+    checker = checker or ImageHealthChecker()
+    summary = {}
+    for path in paths:
+        if not os.path.exists(path) and not os.path.exists(f"{path}.journal"):
+            continue
+        name = os.path.basename(path)
+        if name == "restaurant_cache.json":
+            replaced = _validate_restaurants(path, checker)
+        elif name == "coupons.json":
+            replaced = _validate_coupons(path, checker)
+        else:
+            replaced = _validate_json(path, checker)
+        summary[path] = replaced
+        if replaced:
+            logger.info(f"Replaced {replaced} broken images in {path}")
+    checker.save()
+    return summary
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for path, replaced in validate_files().items():
+        print(f"{path}: {replaced} broken images replaced")
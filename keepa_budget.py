@@ -0,0 +1,105 @@
+"""
+Keepa Token Budget
+Tracks Keepa API tokens and orders product lookups by priority
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Token cost of a search request and of each ASIN in a product request
+SEARCH_TOKEN_COST = 10
+PRODUCT_TOKEN_COST = 1
+# Longest a single request waits for tokens to refill
+MAX_WAIT_SECONDS = 60
+# Keepa buckets hold at most an hour of refills
+BUCKET_MINUTES = 60
+
+
+class TokenBudget:
+    """Remaining Keepa tokens, refilled at the rate reported by the API"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens_left: Optional[float] = None  # unknown until the first response
+        self.refill_rate = 0.0  # tokens per minute
+        self.updated_at = 0.0
+        self.total_waited = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, data: Dict[str, Any]):
+        """Take the token state reported in a Keepa response"""
+        with self._lock:
+            if "refillRate" in data:
+                self.refill_rate = float(data["refillRate"])
+            if "tokensLeft" in data:
+                self.tokens_left = float(data["tokensLeft"])
+                self.updated_at = self.clock()
+
+    def available(self) -> float:
+        """Estimated tokens available now"""
+        if self.tokens_left is None:
+            return float("inf")
+        refilled = self.refill_rate * (self.clock() - self.updated_at) / 60
+        capacity = self.refill_rate * BUCKET_MINUTES
+        return min(self.tokens_left + refilled, max(capacity, self.tokens_left))
+
+    def wait_time(self, cost: float) -> float:
+        """Seconds until cost tokens are available"""
+        deficit = cost - self.available()
+        if deficit <= 0:
+            return 0.0
+        if self.refill_rate <= 0:
+            return float("inf")
+        return deficit / self.refill_rate * 60
+
+    def acquire(self, cost: float, max_wait: float = MAX_WAIT_SECONDS) -> bool:
+        """Reserve cost tokens, waiting up to max_wait for a refill"""
+        wait = self.wait_time(cost)
+        if wait > max_wait:
+            return False
+        if wait > 0:
+            logger.info(f"Waiting {wait:.1f}s for {cost} Keepa tokens")
+            self.sleep(wait)
+            self.total_waited += wait
+        with self._lock:
+            if self.tokens_left is not None:
+                self.tokens_left = self.available() - cost
+                self.updated_at = self.clock()
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        available = self.available()
+        return {
+            "tokens_available": None if available == float("inf") else round(available, 1),
+            "refill_rate_per_minute": self.refill_rate,
+            "seconds_waited": round(self.total_waited, 1),
+        }
+
+
+class LookupQueue:
+    """Highest-priority ASINs first, insertion order among equals"""
+
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+
+    def push(self, asin: str, priority: float):
+        heapq.heappush(self._heap, (-priority, next(self._counter), asin))
+
+    def pop_batch(self, size: int) -> List[str]:
+        """Remove and return up to size ASINs"""
+        batch = []
+        while self._heap and len(batch) < size:
+            batch.append(heapq.heappop(self._heap)[2])
+        return batch
+
+    def __len__(self) -> int:
+        return len(self._heap)
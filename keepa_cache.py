@@ -0,0 +1,133 @@
+"""
+Keepa Cache
+Per-ASIN product cache with a price-volatility based TTL
+"""
+
+import os
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_STATE_FILE = os.path.join(_file_dir, "data", "keepa_cache.json")
+
+# Refresh bounds for a cached product - volatile prices sit near MIN_TTL
+MIN_TTL = 3600
+MAX_TTL = 24 * 3600
+# Average relative price move at which a product gets MIN_TTL
+HIGH_VOLATILITY = 0.10
+# Weight of the latest price move in the volatility average
+VOLATILITY_ALPHA = 0.5
+# Search results (term -> ASINs) change slowly
+SEARCH_TTL = 6 * 3600
+# Cached fields older than this are never served, even if refreshing them fails
+MAX_FIELDS_AGE = 2 * MAX_TTL
+# Out-of-stock or unlisted products are looked up again after this
+UNAVAILABLE_TTL = MIN_TTL
+# Failed lookups are retried sooner
+FAILED_LOOKUP_TTL = 15 * 60
+
+
+def ttl_for(volatility: float) -> float:
+    """Cache lifetime for a product with the given average relative price move"""
+    stable = max(0.0, 1.0 - volatility / HIGH_VOLATILITY)
+    return MIN_TTL + (MAX_TTL - MIN_TTL) * stable
+
+
+class KeepaCache:
+    """
+    Cached Keepa search results and product fields
+    Products that were unavailable or whose lookup failed are cached as
+    negative entries without fields, so they stop being listed until a
+    later lookup succeeds.
+    """
+
+    def __init__(self, state_file: str = DEFAULT_STATE_FILE,
+                 clock: Callable[[], float] = time.time):
+        self.state_file = state_file
+        self.clock = clock
+        self._lock = threading.Lock()
+        data = self._load()
+        self.products: Dict[str, Dict[str, Any]] = data.get("products", {})
+        self.searches: Dict[str, Dict[str, Any]] = data.get("searches", {})
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable Keepa cache {self.state_file}: {e}")
+            return {}
+
+    def save(self):
+        """Write the cache atomically"""
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+                tmp_path = f"{self.state_file}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({"products": self.products, "searches": self.searches}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.state_file)
+            except Exception as e:
+                logger.error(f"Failed to save Keepa cache: {e}")
+
+    def search_asins(self, term: str) -> Optional[List[str]]:
+        """ASINs of a recent search for term, None if not cached or expired"""
+        entry = self.searches.get(term)
+        if entry is None or self.clock() - entry["fetched_at"] >= SEARCH_TTL:
+            return None
+        return entry["asins"]
+
+    def store_search(self, term: str, asins: List[str]):
+        with self._lock:
+            self.searches[term] = {"asins": asins, "fetched_at": self.clock()}
+
+    def get(self, asin: str) -> Optional[Dict[str, Any]]:
+        """Cached product fields past their TTL too, None if unavailable or older than MAX_FIELDS_AGE"""
+        entry = self.products.get(asin)
+        if not entry or not entry["fields"] or self.clock() - entry["fetched_at"] >= MAX_FIELDS_AGE:
+            return None
+        return entry["fields"]
+
+    def is_fresh(self, asin: str) -> bool:
+        entry = self.products.get(asin)
+        return entry is not None and self.clock() - entry["fetched_at"] < entry["ttl"]
+
+    def stale(self, asins: Iterable[str]) -> List[str]:
+        """ASINs that need a lookup - missing or past their TTL"""
+        return [asin for asin in asins if not self.is_fresh(asin)]
+
+    def store_product(self, asin: str, fields: Dict[str, Any]):
+        """Cache product fields, updating the price volatility and TTL"""
+        with self._lock:
+            entry = self.products.get(asin)
+            volatility = HIGH_VOLATILITY  # unknown products are refreshed early
+            if entry is not None:
+                previous = (entry["fields"] or {}).get("current_price") or 0
+                current = fields.get("current_price") or 0
+                move = abs(current - previous) / previous if previous > 0 else 0.0
+                volatility = VOLATILITY_ALPHA * move + (1 - VOLATILITY_ALPHA) * entry["volatility"]
+            self.products[asin] = {
+                "fields": fields,
+                "fetched_at": self.clock(),
+                "volatility": volatility,
+                "ttl": ttl_for(volatility),
+            }
+
+    def store_unavailable(self, asin: str, ttl: float = UNAVAILABLE_TTL):
+        """Cache a product as unavailable - no fields are served for it until a lookup succeeds"""
+        with self._lock:
+            entry = self.products.get(asin)
+            self.products[asin] = {
+                "fields": None,
+                "fetched_at": self.clock(),
+                "volatility": entry["volatility"] if entry else HIGH_VOLATILITY,
+                "ttl": ttl,
+            }
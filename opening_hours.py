@@ -0,0 +1,164 @@
+"""
+Opening Hours
+Parses restaurant opening hours into minute-of-week intervals and indexes them per coupons snapshot
+"""
+
+import re
+import logging
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Restaurants are all in India, hours are local time
+LOCAL_TZ = timezone(timedelta(hours=5, minutes=30), "IST")
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# opening_hours keys and the weekdays (0 = Monday) they cover
+DAY_KEYS = {
+    'monday_friday': range(0, 5),
+    'saturday_sunday': range(5, 7),
+    'weekdays': range(0, 5),
+    'weekends': range(5, 7),
+    'daily': range(0, 7),
+    **{day: (index,) for index, day in enumerate(DAYS)},
+}
+
+RANGE_PATTERN = re.compile(r'(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})')
+OPEN_AT_PATTERN = re.compile(r'^(?:([a-z]{3})[a-z]*\s+)?(\d{1,2}):(\d{2})$')
+
+Interval = Tuple[int, int]
+
+
+def parse_hours(opening_hours: Dict[str, Any]) -> List[List[int]]:
+    """
+    Minute-of-week intervals of an opening_hours dict
+    {'monday_friday': '11:00-23:00', 'saturday_sunday': '11:00-24:00'} gives
+    [start, end) pairs counted from Monday 00:00. Ranges past midnight run
+    into the next day. Unknown keys such as 'notes' are ignored. Returns
+    sorted, merged intervals as lists, so they compare equal after a JSON
+    round trip.
+    """
+    intervals = []
+    for key, value in (opening_hours or {}).items():
+        days = DAY_KEYS.get(key.lower())
+        if days is None or not isinstance(value, str):
+            continue
+        for open_h, open_m, close_h, close_m in RANGE_PATTERN.findall(value):
+            start = int(open_h) * 60 + int(open_m)
+            end = int(close_h) * 60 + int(close_m)
+            if start >= MINUTES_PER_DAY or end > MINUTES_PER_DAY or start == end:
+                continue
+            if end < start:
+                end += MINUTES_PER_DAY  # closes after midnight
+            for day in days:
+                offset = day * MINUTES_PER_DAY
+                if offset + end > MINUTES_PER_WEEK:  # Sunday night into Monday
+                    intervals.append((offset + start, MINUTES_PER_WEEK))
+                    intervals.append((0, offset + end - MINUTES_PER_WEEK))
+                else:
+                    intervals.append((offset + start, offset + end))
+    return _merge(intervals)
+
+
+def _merge(intervals: List[Interval]) -> List[List[int]]:
+    merged: List[List[int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def minute_of_week(when: datetime) -> int:
+    """Minutes since Monday 00:00 local time"""
+    if when.tzinfo is not None:
+        when = when.astimezone(LOCAL_TZ)
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+def parse_open_at(value: str, now: Optional[datetime] = None) -> Optional[int]:
+    """Minute of week of an open_at parameter - "21:30" (today) or "sat 21:30", None if invalid"""
+    match = OPEN_AT_PATTERN.match((value or "").strip().lower())
+    if not match:
+        return None
+    day, hour, minute = match.group(1), int(match.group(2)), int(match.group(3))
+    if hour > 23 or minute > 59:
+        return None
+    if day:
+        weekday = next((index for index, name in enumerate(DAYS) if name.startswith(day)), None)
+        if weekday is None:
+            return None
+    else:
+        weekday = (now or datetime.now(LOCAL_TZ)).astimezone(LOCAL_TZ).weekday()
+    return weekday * MINUTES_PER_DAY + hour * 60 + minute
+
+
+class OpeningHoursIndex:
+    """
+    Opening hours of a coupons snapshot
+    Coupons sharing a schedule share one sorted interval list, so answering
+    "open at" checks each distinct schedule once with a binary search and
+    then looks each coupon's schedule up by identity. Coupons without hours,
+    such as platform-wide promo codes, are not filtered out. The index keeps a reference to the snapshot it was
+    built from, see covers().
+    """
+
+    def __init__(self, coupons: List[Dict[str, Any]]):
+        self.coupons = coupons
+        self._starts: List[List[int]] = []
+        self._ends: List[List[int]] = []
+        self._slots: Dict[int, int] = {}
+        by_schedule: Dict[Tuple[Interval, ...], int] = {}
+        parsed: Dict[str, List[List[int]]] = {}
+
+        for coupon in coupons:
+            intervals = coupon.get('open_intervals')  # parsed at ingest
+            if intervals is None:
+                hours = coupon.get('opening_hours')
+                if not hours:
+                    continue
+                text = repr(sorted(hours.items())) if isinstance(hours, dict) else str(hours)
+                if text not in parsed:
+                    parsed[text] = parse_hours(hours) if isinstance(hours, dict) else []
+                intervals = parsed[text]
+            schedule = tuple(tuple(interval) for interval in intervals)
+            if not schedule:
+                continue
+            slot = by_schedule.get(schedule)
+            if slot is None:
+                slot = by_schedule[schedule] = len(self._starts)
+                self._starts.append([start for start, _ in schedule])
+                self._ends.append([end for _, end in schedule])
+            self._slots[id(coupon)] = slot
+        logger.info(f"Indexed opening hours of {len(self._slots)} coupons, {len(self._starts)} schedules")
+
+    def covers(self, coupons: List[Dict[str, Any]]) -> bool:
+        """True if the index was built from this snapshot"""
+        return self.coupons is coupons
+
+    def open_schedules(self, minute: int) -> Set[int]:
+        """Schedules open at a minute of the week"""
+        minute %= MINUTES_PER_WEEK
+        open_slots = set()
+        for slot, starts in enumerate(self._starts):
+            position = bisect_right(starts, minute) - 1
+            if position >= 0 and minute < self._ends[slot][position]:
+                open_slots.add(slot)
+        return open_slots
+
+    def open_at(self, coupons: Iterable[Dict[str, Any]], minute: int) -> List[Dict[str, Any]]:
+        """Coupons of the snapshot that are open at a minute of the week or have no hours"""
+        open_slots = self.open_schedules(minute)
+        open_slots.add(None)
+        return [coupon for coupon in coupons if self._slots.get(id(coupon)) in open_slots]
+
+    def open_now(self, coupons: Iterable[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Coupons of the snapshot that are open at the current local time"""
+        return self.open_at(coupons, minute_of_week(now or datetime.now(LOCAL_TZ)))
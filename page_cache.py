@@ -0,0 +1,104 @@
+"""
+Page Cache
+Content hashes of scraped pages with their last parsed result
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_STATE_FILE = os.path.join(_file_dir, "data", "page_cache.json")
+
+# Markup that changes on every request without changing the deals on the page.
+# The parsers never read scripts, styles or comments, so dropping them is safe.
+VOLATILE_PATTERNS = [
+    re.compile(rb"<script\b.*?</script>", re.S | re.I),
+    re.compile(rb"<style\b.*?</style>", re.S | re.I),
+    re.compile(rb"<!--.*?-->", re.S),
+    # Per-request attributes: CSP nonces, CSRF tokens, request/session ids
+    re.compile(rb"\s(?:nonce|data-csa-c-[\w-]+|data-request-id|data-session-id|csrf[\w-]*)=\"[^\"]*\"", re.I),
+    re.compile(rb"<input[^>]+type=\"hidden\"[^>]*>", re.I),
+    # Tracking parameters in links
+    re.compile(rb"[?&](?:ref_?|pf_rd_\w+|pd_rd_\w+|qid|sr|crid|sprefix|_encoding|lid|otracker)=[^\"'&\s]*", re.I),
+    # Epoch timestamps (seconds or milliseconds)
+    re.compile(rb"\b\d{10,13}\b"),
+]
+WHITESPACE = re.compile(rb"\s+")
+
+
+def content_hash(content: bytes) -> str:
+    """Hash of the page with volatile tokens stripped"""
+    for pattern in VOLATILE_PATTERNS:
+        content = pattern.sub(b"", content)
+    content = WHITESPACE.sub(b" ", content)
+    return hashlib.sha1(content).hexdigest()
+
+
+class PageCache:
+    """Last parsed Deal fields per category and URL, keyed by content hash"""
+
+    def __init__(self, source: str, state_file: str = DEFAULT_STATE_FILE):
+        self.source = source
+        self.state_file = state_file
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.pages: Dict[str, Dict[str, Dict[str, Any]]] = self._load().get(source, {})
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable page cache {self.state_file}: {e}")
+            return {}
+
+    def save(self):
+        """Write this source's pages, keeping other sources untouched"""
+        with self._lock:
+            try:
+                data = self._load()
+                data[self.source] = self.pages
+                os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+                tmp_path = f"{self.state_file}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.state_file)
+            except Exception as e:
+                logger.error(f"Failed to save page cache: {e}")
+
+    def lookup(self, category: str, url: str, page_hash: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached fields if the page is unchanged, None otherwise"""
+        entry = self.pages.get(category, {}).get(url)
+        if entry is None or entry["hash"] != page_hash:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        # Reused deals are re-stamped as seen now
+        timestamp = datetime.now().isoformat()
+        return [{**fields, "timestamp": timestamp} for fields in entry["fields"]]
+
+    def store(self, category: str, url: str, page_hash: str, fields: List[Dict[str, Any]]):
+        """Remember the parsed fields for a page"""
+        with self._lock:
+            self.pages.setdefault(category, {})[url] = {
+                "hash": page_hash,
+                "fields": fields,
+                "parsed_at": datetime.now().isoformat(),
+            }
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
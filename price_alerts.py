@@ -0,0 +1,314 @@
+"""
+Price Alerts
+Subscription store and matcher that turns scraped deals into alert messages
+"""
+
+import os
+import json
+import uuid
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from product_matcher import normalize_title
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SUBSCRIPTIONS_FILE = os.path.join(_file_dir, "data", "alert_subscriptions.json")
+DEFAULT_OUTBOX_FILE = os.path.join(_file_dir, "data", "alert_outbox.jsonl")
+# Seconds to wait for another process's write of the subscriptions file
+LOCK_TIMEOUT = 10
+# A lock file older than this was left by a crashed writer
+LOCK_STALE_SECONDS = 60
+
+
+@dataclass
+class Subscription:
+    """A user's alert criteria - every criterion set must hold"""
+    id: str
+    contact: str
+    keywords: List[str] = field(default_factory=list)  # normalized tokens, all required
+    category: str = ""
+    max_price: Optional[float] = None
+    min_discount: Optional[int] = None
+    created_at: str = ""
+
+
+def _deal_value(deal: Any, name: str, default: Any = None) -> Any:
+    """Read a field from a Deal object or a deal dict"""
+    if isinstance(deal, dict):
+        return deal.get(name, default)
+    return getattr(deal, name, default)
+
+
+class _FileLock:
+    """Cross-process lock held by exclusively creating <path>.lock"""
+
+    def __init__(self, path: str, timeout: float = LOCK_TIMEOUT, stale_after: float = LOCK_STALE_SECONDS):
+        self.lock_path = f"{path}.lock"
+        self.timeout = timeout
+        self.stale_after = stale_after
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > self.stale_after:
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    continue  # released meanwhile
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for {self.lock_path}")
+                time.sleep(0.02)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
+
+
+class SubscriptionStore:
+    """
+    Subscriptions and the last price each one was alerted at, per product
+    Several processes share the file - the web app adds and removes
+    subscriptions while the scraper records alerts. Each store keeps its own
+    changes since it loaded and save() applies them to a fresh read of the
+    file under a file lock, so concurrent writers don't drop each other's
+    changes.
+    """
+
+    def __init__(self, state_file: str = DEFAULT_SUBSCRIPTIONS_FILE):
+        self.state_file = state_file
+        self.version = 0
+        self._lock = threading.Lock()
+        self._added: Dict[str, Subscription] = {}
+        self._removed: Set[str] = set()
+        self._notified_changes: Dict[str, Dict[str, float]] = {}
+        self.subscriptions: Dict[str, Subscription] = {}
+        self.notified: Dict[str, Dict[str, float]] = {}
+        self._apply(self._load())
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable subscriptions {self.state_file}: {e}")
+            return {}
+
+    def _apply(self, data: Dict[str, Any]):
+        """Replace the in-memory state with the file's, with this store's unsaved changes on top"""
+        subscriptions = {sub_id: Subscription(**sub) for sub_id, sub in data.get("subscriptions", {}).items()}
+        subscriptions.update(self._added)
+        notified = data.get("notified", {})
+        for sub_id, prices in self._notified_changes.items():
+            notified.setdefault(sub_id, {}).update(prices)
+        for sub_id in self._removed:
+            subscriptions.pop(sub_id, None)
+            notified.pop(sub_id, None)
+        if subscriptions.keys() != self.subscriptions.keys():
+            self.version += 1
+        self.subscriptions = subscriptions
+        self.notified = notified
+
+    def reload(self):
+        """Pick up subscriptions saved by other processes"""
+        with self._lock:
+            self._apply(self._load())
+
+    def save(self):
+        """Apply this store's changes to the current file, atomically and under the file lock"""
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+                with _FileLock(self.state_file):
+                    self._apply(self._load())
+                    tmp_path = f"{self.state_file}.tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump({
+                            "subscriptions": {sub_id: asdict(sub) for sub_id, sub in self.subscriptions.items()},
+                            "notified": self.notified,
+                        }, f, ensure_ascii=False)
+                    os.replace(tmp_path, self.state_file)
+                self._added.clear()
+                self._removed.clear()
+                self._notified_changes.clear()
+            except Exception as e:
+                logger.error(f"Failed to save subscriptions: {e}")
+
+    def add(self, contact: str, keywords: str = "", category: str = "",
+            max_price: Optional[float] = None, min_discount: Optional[int] = None) -> Subscription:
+        """Create a subscription, e.g. keywords="jbl headphones", max_price=1500"""
+        tokens = normalize_title(keywords).split()
+        if not contact:
+            raise ValueError("A contact is required")
+        if not (tokens or category or max_price is not None or min_discount is not None):
+            raise ValueError("At least one alert criterion is required")
+
+        sub = Subscription(
+            id=uuid.uuid4().hex[:12],
+            contact=contact,
+            keywords=tokens,
+            category=category.strip().lower(),
+            max_price=max_price,
+            min_discount=min_discount,
+            created_at=datetime.now().isoformat(),
+        )
+        with self._lock:
+            self.subscriptions[sub.id] = sub
+            self._added[sub.id] = sub
+            self.version += 1
+        return sub
+
+    def remove(self, sub_id: str) -> bool:
+        with self._lock:
+            removed = self.subscriptions.pop(sub_id, None) is not None
+            self.notified.pop(sub_id, None)
+            self._added.pop(sub_id, None)
+            self._notified_changes.pop(sub_id, None)
+            if removed:
+                self._removed.add(sub_id)
+                self.version += 1
+            return removed
+
+    def mark_notified(self, sub_id: str, url: str, price: float):
+        """Record the price a subscription was alerted at for a product"""
+        with self._lock:
+            self.notified.setdefault(sub_id, {})[url] = price
+            self._notified_changes.setdefault(sub_id, {})[url] = price
+
+
+class _Bucket:
+    """
+    Subscriptions sorted by threshold - price-capped ones by max price
+    (highest first), the rest by min discount (lowest first)
+    """
+
+    def __init__(self, subs: List[Subscription]):
+        capped = sorted((s for s in subs if s.max_price is not None), key=lambda s: -s.max_price)
+        uncapped = sorted((s for s in subs if s.max_price is None), key=lambda s: s.min_discount or 0)
+        self.capped = capped
+        self.capped_keys = [-s.max_price for s in capped]
+        self.uncapped = uncapped
+        self.uncapped_keys = [s.min_discount or 0 for s in uncapped]
+
+    def candidates(self, price: float, discount: float) -> List[Subscription]:
+        """Subscriptions whose price cap admits the price or whose min discount the discount meets"""
+        return (self.capped[:bisect.bisect_right(self.capped_keys, -price)]
+                + self.uncapped[:bisect.bisect_right(self.uncapped_keys, discount)])
+
+
+class AlertMatcher:
+    """
+    Inverted indexes over subscriptions
+    Keyword subscriptions are indexed by their longest keyword, keyword-free
+    ones by category, the rest in a catch-all bucket. Buckets are sorted by
+    threshold, so a deal mostly scans subscriptions it already satisfies.
+    """
+
+    def __init__(self, subscriptions: Iterable[Subscription]):
+        grouped: Dict[Tuple[str, str], List[Subscription]] = defaultdict(list)
+        for sub in subscriptions:
+            if sub.keywords:
+                grouped[("keyword", max(sub.keywords, key=len))].append(sub)
+            elif sub.category:
+                grouped[("category", sub.category)].append(sub)
+            else:
+                grouped[("any", "")].append(sub)
+        self.buckets = {key: _Bucket(subs) for key, subs in grouped.items()}
+
+    def match(self, deal: Any) -> List[Subscription]:
+        """Subscriptions satisfied by a deal, none for a deal without a price"""
+        price = _deal_value(deal, "current_price", 0) or 0
+        if not isinstance(price, (int, float)) or price <= 0:
+            return []  # failed price parse - it would pass every max_price
+        discount = _deal_value(deal, "discount_percent", 0) or 0
+        category = (_deal_value(deal, "category", "") or "").lower()
+        tokens = set(normalize_title(_deal_value(deal, "product_name", "")).split())
+
+        keys = [("keyword", token) for token in tokens]
+        keys += [("category", category), ("any", "")]
+
+        matches = []
+        for key in keys:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                continue
+            for sub in bucket.candidates(price, discount):
+                if sub.min_discount is not None and discount < sub.min_discount:
+                    continue
+                if sub.category and sub.category != category:
+                    continue
+                if len(sub.keywords) > 1 and not tokens.issuperset(sub.keywords):
+                    continue
+                matches.append(sub)
+        return matches
+
+    def match_batch(self, deals: Iterable[Any]) -> List[Tuple[Subscription, Any]]:
+        return [(sub, deal) for deal in deals for sub in self.match(deal)]
+
+
+class AlertEngine:
+    """Matches scraped deal batches and appends alerts to the outbox file"""
+
+    def __init__(self, store: Optional[SubscriptionStore] = None, outbox_file: str = DEFAULT_OUTBOX_FILE):
+        self.store = store or SubscriptionStore()
+        self.outbox_file = outbox_file
+        self._matcher: Optional[AlertMatcher] = None
+        self._matcher_version = -1
+
+    def matcher(self) -> AlertMatcher:
+        """Indexes are rebuilt only after subscriptions change"""
+        if self._matcher is None or self._matcher_version != self.store.version:
+            self._matcher = AlertMatcher(list(self.store.subscriptions.values()))
+            self._matcher_version = self.store.version
+        return self._matcher
+
+    def process(self, deals: Iterable[Any]) -> int:
+        """Queue alerts for new matches or lower prices, returns the number queued"""
+        self.store.reload()  # subscriptions made since the last batch
+        matched_at = datetime.now().isoformat()
+        messages = []
+        for sub, deal in self.matcher().match_batch(deals):
+            url = _deal_value(deal, "product_url", "")
+            price = _deal_value(deal, "current_price", 0)
+            sent = self.store.notified.get(sub.id, {})
+            if url in sent and price >= sent[url]:
+                continue  # Already alerted at this price or lower
+            self.store.mark_notified(sub.id, url, price)
+            messages.append({
+                "subscription_id": sub.id,
+                "contact": sub.contact,
+                "product_name": _deal_value(deal, "product_name", ""),
+                "product_url": url,
+                "current_price": price,
+                "discount_percent": _deal_value(deal, "discount_percent", 0),
+                "source": _deal_value(deal, "source", ""),
+                "matched_at": matched_at,
+            })
+
+        if messages:
+            os.makedirs(os.path.dirname(self.outbox_file), exist_ok=True)
+            with open(self.outbox_file, 'a', encoding='utf-8') as f:
+                for message in messages:
+                    f.write(json.dumps(message, ensure_ascii=False) + "\n")
+            self.store.save()
+            logger.info(f"Queued {len(messages)} price alerts")
+        return len(messages)
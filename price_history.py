@@ -0,0 +1,145 @@
+"""
+Price History
+Keepa price-history decoding and a compact per-ASIN time-series store
+"""
+
+import os
+import re
+import mmap
+import logging
+import threading
+import time
+from array import array
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_HISTORY_DIR = os.path.join(_file_dir, "data", "price_history")
+
+# Keepa times are minutes since 2011-01-01, offset from the Unix epoch in minutes
+KEEPA_EPOCH_MINUTES = 21564000
+# Keepa csv index of the Amazon price and the lowest new (marketplace) price
+CSV_AMAZON = 0
+CSV_NEW = 1
+
+_ASIN_PATTERN = re.compile(r"^[A-Z0-9]{10}$")
+
+
+def keepa_minutes(unix_seconds: float) -> int:
+    """Unix timestamp to Keepa time"""
+    return int(unix_seconds // 60) - KEEPA_EPOCH_MINUTES
+
+
+def unix_seconds(keepa_time: int) -> int:
+    """Keepa time to Unix timestamp"""
+    return (keepa_time + KEEPA_EPOCH_MINUTES) * 60
+
+
+def decode_history(series: Sequence[int]) -> Tuple[Sequence[int], Sequence[int]]:
+    """
+    Split a Keepa [time, price, time, price, ...] series into times and prices
+    Returns int64 NumPy arrays
+    """
+    usable = len(series) - len(series) % 2
+    pairs = np.asarray(series[:usable], dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0].copy(), pairs[:, 1].copy()
+
+
+def _count_until(times: Sequence[int], keepa_time: int) -> int:
+    """Number of points at or before keepa_time"""
+    return int(np.searchsorted(times, keepa_time, side='right'))
+
+
+class PriceHistoryStore:
+    """
+    One delta-encoded segment per ASIN and Keepa price series
+    Each segment holds int32 (time delta, price delta) pairs, the first pair
+    absolute, and is read through mmap. Prices are Keepa integers (1/100 of
+    the currency), -1 marks out of stock. Series are never mixed in one
+    segment - the Amazon series lives in <ASIN>.bin, others in
+    <ASIN>.<series>.bin.
+    """
+
+    def __init__(self, directory: str = DEFAULT_HISTORY_DIR, clock=time.time):
+        self.directory = directory
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def _path(self, asin: str, series: int = CSV_AMAZON) -> str:
+        if not _ASIN_PATTERN.match(asin):
+            raise ValueError(f"Invalid ASIN: {asin}")
+        suffix = "" if series == CSV_AMAZON else f".{int(series)}"
+        return os.path.join(self.directory, f"{asin}{suffix}.bin")
+
+    def history(self, asin: str, series: int = CSV_AMAZON) -> Tuple[Sequence[int], Sequence[int]]:
+        """Decoded (Keepa times, prices) of one series for an ASIN, empty if unknown"""
+        try:
+            with open(self._path(asin, series), 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return decode_history([])
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as segment:
+                    deltas = np.frombuffer(segment, dtype=np.int32).reshape(-1, 2)
+                    values = deltas.cumsum(axis=0, dtype=np.int64)
+                    del deltas  # release the buffer before the map closes
+                    return values[:, 0].copy(), values[:, 1].copy()
+        except FileNotFoundError:
+            return decode_history([])
+
+    def write(self, asin: str, times: Sequence[int], prices: Sequence[int], series: int = CSV_AMAZON) -> int:
+        """Append points newer than the series' stored history, returns how many were added"""
+        with self._lock:
+            stored_times, stored_prices = self.history(asin, series)
+            last_time = int(stored_times[-1]) if len(stored_times) else None
+            last_price = int(stored_prices[-1]) if len(stored_prices) else 0
+
+            deltas = array('i')
+            prev_time = last_time if last_time is not None else 0
+            prev_price = last_price
+            for t, p in zip(times, prices):
+                t, p = int(t), int(p)
+                if last_time is not None and t <= last_time:
+                    continue
+                deltas.extend((t - prev_time, p - prev_price))
+                prev_time, prev_price, last_time = t, p, t
+
+            if deltas:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._path(asin, series), 'ab') as f:
+                    deltas.tofile(f)
+            return len(deltas) // 2
+
+    def price_at(self, asin: str, when: float, series: int = CSV_AMAZON) -> Optional[float]:
+        """Price in effect at a Unix time, None if unknown or out of stock"""
+        times, prices = self.history(asin, series)
+        index = _count_until(times, keepa_minutes(when))
+        if index == 0 or prices[index - 1] < 0:
+            return None
+        return int(prices[index - 1]) / 100
+
+    def current_price(self, asin: str, series: int = CSV_AMAZON) -> Optional[float]:
+        _, prices = self.history(asin, series)
+        if not len(prices) or prices[-1] < 0:
+            return None
+        return int(prices[-1]) / 100
+
+    def lowest_in(self, asin: str, days: int = 90, now: Optional[float] = None,
+                  series: int = CSV_AMAZON) -> Optional[float]:
+        """Lowest in-stock price over the last days, including the price in effect at the start"""
+        now = self.clock() if now is None else now
+        times, prices = self.history(asin, series)
+        start = max(_count_until(times, keepa_minutes(now - days * 86400)) - 1, 0)
+        window = prices[start:]
+        window = window[window >= 0]
+        return int(window.min()) / 100 if window.size else None
+
+    def dropped_since(self, asin: str, hours: float = 24, now: Optional[float] = None,
+                      series: int = CSV_AMAZON) -> bool:
+        """True if the current price is below the price hours ago"""
+        now = self.clock() if now is None else now
+        current = self.current_price(asin, series)
+        before = self.price_at(asin, now - hours * 3600, series)
+        return current is not None and before is not None and current < before
@@ -0,0 +1,172 @@
+"""
+Product Matcher
+Near-duplicate product titles across sources via MinHash and LSH banding
+"""
+
+import re
+import random
+import hashlib
+import zlib
+import logging
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Character shingle length
+SHINGLE_SIZE = 3
+# MinHash signature length = BANDS * ROWS_PER_BAND
+# 16 bands of 3 rows make titles with Jaccard ~0.4+ likely to share a bucket
+BANDS = 16
+ROWS_PER_BAND = 3
+NUM_PERM = BANDS * ROWS_PER_BAND
+# Estimated Jaccard similarity needed to treat two candidates as one product
+SIMILARITY_THRESHOLD = 0.4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(541)  # fixed seed - signatures must be stable across runs
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_NUMBER = re.compile(r"\d+")
+# Words that make a different model of the same product line
+VARIANT_WORDS = {"pro", "max", "ultra", "plus", "mini", "lite", "fe", "se", "neo", "air"}
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase alphanumeric words separated by single spaces"""
+    return _NON_WORD.sub(" ", (title or "").lower()).strip()
+
+
+def shingles(normalized: str, size: int = SHINGLE_SIZE) -> set:
+    """Character shingles of a normalized title"""
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+@lru_cache(maxsize=8192)
+def signature(normalized: str) -> Tuple[int, ...]:
+    """MinHash signature of a normalized title"""
+    hashes = [zlib.crc32(s.encode()) for s in shingles(normalized)]
+    if not hashes:
+        return tuple([_MERSENNE_PRIME] * NUM_PERM)
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def _compatible(a: str, b: str) -> bool:
+    """
+    Checks similar-looking titles can be one product: same brand (first word),
+    same variant words and agreeing model numbers - 'Rockerz 550' is not
+    'Rockerz 450', but the shorter title may omit specs such as '5G' or '256GB'
+    """
+    words_a, words_b = a.split(), b.split()
+    if words_a[0] != words_b[0]:
+        return False
+    if VARIANT_WORDS.intersection(words_a) != VARIANT_WORDS.intersection(words_b):
+        return False
+    numbers_a, numbers_b = set(_NUMBER.findall(a)), set(_NUMBER.findall(b))
+    return numbers_a <= numbers_b or numbers_b <= numbers_a
+
+
+def group_titles(titles: List[str], threshold: float = SIMILARITY_THRESHOLD) -> List[int]:
+    """
+    Group index for each title, equal for near-duplicates
+    Candidates come from LSH buckets, so the work grows with the number of
+    titles rather than the number of pairs
+    """
+    normalized = [normalize_title(t) for t in titles]
+    signatures = [signature(n) for n in normalized]
+    parent = list(range(len(titles)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(BANDS):
+        start = band * ROWS_PER_BAND
+        buckets: Dict[Tuple[int, ...], List[int]] = defaultdict(list)
+        for i, sig in enumerate(signatures):
+            if normalized[i]:
+                buckets[sig[start:start + ROWS_PER_BAND]].append(i)
+        for members in buckets.values():
+            for pos, current in enumerate(members[1:], 1):
+                for earlier in members[:pos]:
+                    root_a, root_b = find(earlier), find(current)
+                    if root_a == root_b:
+                        break
+                    if (similarity(signatures[earlier], signatures[current]) >= threshold
+                            and _compatible(normalized[earlier], normalized[current])):
+                        parent[root_b] = root_a
+                        break
+
+    return [find(i) for i in range(len(titles))]
+
+
+def product_id(normalized_titles: List[str]) -> str:
+    """Canonical id of a group - derived from its smallest normalized title"""
+    return "p_" + hashlib.sha1(min(normalized_titles).encode()).hexdigest()[:12]
+
+
+def assign_product_ids(items: List[Dict[str, Any]], title_key: str = "product_name") -> Dict[str, List[Dict[str, Any]]]:
+    """Set product_id on items with a title, returns the items grouped by id"""
+    titled = [item for item in items if item.get(title_key)]
+    groups: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for item, group in zip(titled, group_titles([item[title_key] for item in titled])):
+        groups[group].append(item)
+
+    by_id = {}
+    for members in groups.values():
+        pid = product_id([normalize_title(m[title_key]) for m in members])
+        for member in members:
+            member["product_id"] = pid
+        by_id[pid] = members
+    return by_id
+
+
+def collapse_duplicates(items: List[Dict[str, Any]], title_key: str = "product_name",
+                        price_key: str = "current_price") -> List[Dict[str, Any]]:
+    """
+    One entry per product, the lowest priced offer kept at the position of the
+    group's first item. Items without a title pass through untouched. Titled
+    items are shallow-copied before product_id, offer_count and other_sources
+    are set, so shared snapshots such as the coupons cache stay unchanged.
+    """
+    items = [dict(item) if item.get(title_key) else item for item in items]
+    by_id = assign_product_ids(items, title_key)
+
+    def price(item: Dict[str, Any]) -> float:
+        value = item.get(price_key)
+        return value if isinstance(value, (int, float)) and value > 0 else float("inf")
+
+    best = {}
+    for pid, members in by_id.items():
+        winner = min(members, key=price)
+        winner["offer_count"] = len(members)
+        winner["other_sources"] = sorted({m.get("source", "") for m in members if m is not winner} - {""})
+        best[pid] = winner
+
+    result = []
+    emitted = set()
+    for item in items:
+        pid: Optional[str] = item.get("product_id") if item.get(title_key) else None
+        if pid is None:
+            result.append(item)
+        elif pid not in emitted:
+            emitted.add(pid)
+            result.append(best[pid])
+    return result
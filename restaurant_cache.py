@@ -0,0 +1,263 @@
+"""
+Restaurant Cache
+Restaurant entries with per-restaurant and per-location fetch times, saved through an append-only journal,
+and checkpoints of pipeline runs that have not finished
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a location's restaurants are scraped again
+CACHE_TTL = 24 * 3600
+# The journal is folded into the snapshot once it has this many lines
+# or more lines than there are restaurants
+COMPACT_MIN_LINES = 1000
+# Fields that differ on every enrichment and don't count as a change
+VOLATILE_FIELDS = {'timestamp', 'phone', 'fetched_at'}
+
+
+def location_key(city: str, location: str) -> str:
+    return f"{city} > {location}"
+
+
+def restaurant_key(city: str, location: str, name: str) -> str:
+    """Stable restaurant id - a hash of city, location and name, independent of scrape order"""
+    normalized = "|".join(" ".join((part or "").lower().split()) for part in (city, location, name))
+    return "r_" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def entry_key(entry: Dict[str, Any]) -> str:
+    return restaurant_key(entry.get('city', ''), entry.get('location', ''), entry.get('name', ''))
+
+
+def _content(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: value for field, value in entry.items() if field not in VOLATILE_FIELDS}
+
+
+class RestaurantCache:
+    """
+    Snapshot file of {restaurant_key: restaurant} plus a JSONL journal beside it.
+    Changed restaurants are appended to the journal in full, unchanged ones
+    only as a fetch time and vanished ones as a removal, so a refresh writes
+    in proportion to what it touched. The snapshot keeps the original
+    restaurant_cache.json layout.
+    """
+
+    def __init__(self, path: str = "restaurant_cache.json", ttl: float = CACHE_TTL,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._journal_lines = 0
+        self.restaurants: Dict[str, Dict[str, Any]] = self._load_snapshot()
+        self.locations: Dict[str, float] = {}
+        self._replay_journal()
+        self._by_location: Dict[str, Set[str]] = defaultdict(set)
+        for key, entry in self.restaurants.items():
+            self._by_location[location_key(entry.get('city', ''), entry.get('location', ''))].add(key)
+
+    def _load_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                # Keyed by content id - older snapshots used "<City>_<scrape id>"
+                return {entry_key(entry): entry for entry in json.load(f).values()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable restaurant cache {self.path}: {e}")
+            return {}
+
+    def _replay_journal(self):
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._journal_lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of an interrupted write
+                    self._apply(record)
+        except FileNotFoundError:
+            pass
+
+    def _apply(self, record: Dict[str, Any]):
+        if 'location' in record:
+            self.locations[record['location']] = record['fetched_at']
+        elif record.get('removed'):
+            self.restaurants.pop(record['restaurant'], None)
+        elif 'entry' in record:
+            self.restaurants[record['restaurant']] = record['entry']
+        elif record.get('restaurant') in self.restaurants:
+            self.restaurants[record['restaurant']]['fetched_at'] = record['fetched_at']
+
+    def _fresh(self, fetched_at: Any, now: float) -> bool:
+        return isinstance(fetched_at, (int, float)) and now - fetched_at < self.ttl
+
+    def is_fresh(self, city: str, location: str) -> bool:
+        """True if the location was scraped within the TTL"""
+        return self._fresh(self.locations.get(location_key(city, location)), self.clock())
+
+    def put(self, key: str, entry: Dict[str, Any]) -> bool:
+        """Store a freshly fetched restaurant, returns True if its content changed"""
+        now = self.clock()
+        with self._lock:
+            current = self.restaurants.get(key)
+            unchanged = current is not None and _content(current) == _content(entry)
+            if unchanged:
+                current['fetched_at'] = now
+                self._pending.append({'restaurant': key, 'fetched_at': now})
+                return False
+            entry = {**entry, 'fetched_at': now}
+            self.restaurants[key] = entry
+            self._by_location[location_key(entry.get('city', ''), entry.get('location', ''))].add(key)
+            self._pending.append({'restaurant': key, 'entry': entry})
+            return True
+
+    def update(self, key: str, fields: Dict[str, Any]) -> bool:
+        """Change fields of a stored restaurant without marking it fetched, returns False if it is unknown"""
+        with self._lock:
+            current = self.restaurants.get(key)
+            if current is None:
+                return False
+            entry = {**current, **fields}
+            self.restaurants[key] = entry
+            self._pending.append({'restaurant': key, 'entry': entry})
+            return True
+
+    def replace_location(self, city: str, location: str, entries: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Store a location's freshly scraped restaurants and mark it scraped
+        Restaurants of the location that are no longer listed are dropped.
+        Returns the number of restaurants added, changed or removed.
+        """
+        changed = sum(self.put(key, entry) for key, entry in entries.items())
+        with self._lock:
+            gone = self._by_location.get(location_key(city, location), set()) - set(entries)
+            for key in gone:
+                self._by_location[location_key(city, location)].discard(key)
+                self.restaurants.pop(key, None)
+                self._pending.append({'restaurant': key, 'removed': True})
+        self.mark_location(city, location)
+        return changed + len(gone)
+
+    def mark_location(self, city: str, location: str):
+        """Record that a location was scraped now"""
+        now = self.clock()
+        with self._lock:
+            key = location_key(city, location)
+            self.locations[key] = now
+            self._pending.append({'location': key, 'fetched_at': now})
+
+    def flush(self) -> int:
+        """Append pending changes to the journal, compacting when it has grown, returns lines written"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in pending))
+            self._journal_lines += len(pending)
+            if self._journal_lines >= max(COMPACT_MIN_LINES, len(self.restaurants)):
+                self._compact()
+        logger.info(f"💾 Journaled {len(pending)} restaurant cache changes")
+        return len(pending)
+
+    def compact(self):
+        """Fold the journal into the snapshot"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.restaurants, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+        # Location fetch times live only in the journal
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, fetched_at in self.locations.items():
+                f.write(json.dumps({'location': key, 'fetched_at': fetched_at}, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.journal_path)
+        self._journal_lines = len(self.locations)
+        logger.info(f"💾 Compacted restaurant cache: {len(self.restaurants)} restaurants")
+
+
+class PipelineCheckpoint:
+    """
+    Locations completed by a pipeline run that has not finished yet
+    One JSON line per location holding its enriched restaurants, appended
+    and synced as soon as the location is done, after a header line with the
+    run's start time. A run that is interrupted leaves the file behind and the
+    next run picks its segments up instead of scraping again; a finished run
+    clears it. Checkpoints older than max_age are discarded.
+    """
+
+    def __init__(self, path: str, max_age: float = CACHE_TTL, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.started_at: Optional[float] = None
+        self.segments: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._load(max_age)
+
+    def _load(self, max_age: float):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # torn last line of an interrupted write
+        started_at = records[0].get('started_at') if records else None
+        if not isinstance(started_at, (int, float)) or self.clock() - started_at >= max_age:
+            logger.info(f"🗑️ Discarding stale pipeline checkpoint {self.path}")
+            self.clear()
+            return
+        self.started_at = started_at
+        for record in records[1:]:
+            if 'location' in record:
+                self.segments[record['location']] = record['entries']
+        logger.info(f"♻️ Resuming pipeline run: {len(self.segments)} locations already done")
+
+    def get(self, city: str, location: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Restaurants of a location completed by the interrupted run, None if it wasn't"""
+        return self.segments.get(location_key(city, location))
+
+    def record(self, city: str, location: str, entries: Dict[str, Dict[str, Any]]):
+        """Durably record a completed location"""
+        key = location_key(city, location)
+        with self._lock:
+            lines = []
+            if self.started_at is None:
+                self.started_at = self.clock()
+                lines.append(json.dumps({'started_at': self.started_at}) + '\n')
+            lines.append(json.dumps({'location': key, 'entries': entries}, ensure_ascii=False) + '\n')
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            self.segments[key] = entries
+
+    def clear(self):
+        """Forget the run, once its results are in the cache and coupons file"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.started_at = None
+            self.segments = {}
@@ -4,12 +4,22 @@ Scrapes data from Zomato and enriches coupons.json with real restaurant metadata
 """
 
 import requests
+import re
 import json
+import random
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Any, Optional
 from datetime import datetime
 import time
-from urllib.parse import quote
+from urllib.parse import quote, urlparse
+
+from restaurant_cache import RestaurantCache, PipelineCheckpoint, CACHE_TTL, restaurant_key, location_key
+from gazetteer import Gazetteer
+from opening_hours import parse_hours
+from city_shards import CityShardStore, DEFAULT_SHARD_DIR
+from coupon_store import CouponStore, merge
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -104,6 +114,81 @@ ZOMATO_HEADERS = {
 ZOMATO_BASE_URL = "https://www.zomato.com"
 GOOGLE_PLACES_BASE_URL = "https://maps.googleapis.com/maps/api/place"
 
+# Standardized cuisine options from EazyDiner, in display order
+CUISINE_MAP = {
+    'north indian': 'North Indian',
+    'south indian': 'South Indian',
+    'chinese': 'Chinese',
+    'continental': 'Continental',
+    'italian': 'Italian',
+    'mughlai': 'Mughlai',
+    'pan asian': 'Pan Asian',
+    'japanese': 'Japanese',
+    'mediterranean': 'Mediterranean',
+    'fast food': 'Fast Food',
+    'cafe': 'Cafe',
+    'bakery': 'Bakery',
+    'desserts': 'Desserts',
+    'biryani': 'Biryani',
+    'kebab': 'Kebab',
+    'seafood': 'Seafood',
+}
+DEFAULT_CUISINES = ['North Indian', 'Continental']
+# Phone area codes by city
+AREA_CODES = {
+    'Delhi': '11',
+    'Mumbai': '22',
+    'Bangalore': '80',
+    'Hyderabad': '40',
+    'Chennai': '44',
+    'Pune': '20',
+    'Kolkata': '33',
+    'Chandigarh': '172',
+    'Ahmedabad': '79',
+    'Jaipur': '141',
+}
+# Name keywords that set the price range
+PREMIUM_PATTERN = re.compile('premium|fine dining|michelin|luxury|exclusive', re.IGNORECASE)
+BUDGET_PATTERN = re.compile('dhabha|dhaba|roadside|street|fast', re.IGNORECASE)
+
+# Cities processed in parallel by process_all_cities
+MAX_CITY_WORKERS = 4
+# Minimum seconds between requests to the same host, shared by all workers
+HOST_MIN_INTERVAL = 0.5
+# Seconds per HTTP request
+REQUEST_TIMEOUT = 10
+# Marks coupons generated from restaurants - only these are removed when a restaurant disappears
+COUPON_ORIGIN = 'restaurant_scraper'
+
+
+class HostRateLimiter:
+    """
+    Spaces requests to each host at least min_interval apart across threads
+    Applied by RestaurantScraper.fetch() - location data is still generated
+    locally, so no request goes through it until real scraping is wired in.
+    """
+
+    def __init__(self, min_interval: float = HOST_MIN_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.min_interval = min_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> float:
+        """Block until the URL's host may be requested, returns the seconds waited"""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
 
 # ============================================================================
 # STEP 1: SCRAPER SKELETON - Basic functions
@@ -112,38 +197,51 @@ GOOGLE_PLACES_BASE_URL = "https://maps.googleapis.com/maps/api/place"
 class RestaurantScraper:
     """Main scraper class for restaurant data enrichment"""
     
-    def __init__(self, use_cache: bool = True):
+    def __init__(self, use_cache: bool = True, max_workers: int = MAX_CITY_WORKERS,
+                 rate_limiter: Optional[HostRateLimiter] = None, cache_ttl: float = CACHE_TTL):
         """
         Initialize the scraper
         Args:
             use_cache: Whether to use cached data to avoid excessive API calls
+            max_workers: Cities processed in parallel
+            rate_limiter: Per-host request spacing, shared by all workers
+            cache_ttl: Seconds before a cached location is scraped again
         """
         self.use_cache = use_cache
         self.cache_file = "restaurant_cache.json"
         self.session = requests.Session()
         self.session.headers.update(ZOMATO_HEADERS)
         self.scraped_restaurants = []
+        self.merge_summary: Dict[str, int] = {}
+        self.max_workers = max_workers
+        self.cache_ttl = cache_ttl
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.progress = {'total': 0, 'done': 0, 'fresh': 0, 'resumed': 0, 'failed': 0, 'locations': {}}
+        self._progress_lock = threading.Lock()
+        # Enrichment lookups, shared across batches
+        self._profiles: Dict[tuple, Dict[str, Any]] = {}
+        self._profiles_by_text: Dict[str, Dict[str, Any]] = {}
+        # Locality centroids for restaurant coordinates
+        self.gazetteer = Gazetteer.from_file()
         
         logger.info("✅ RestaurantScraper initialized")
     
     def load_cache(self) -> Dict[str, Any]:
         """Load cached restaurant data if it exists"""
-        try:
-            if self.use_cache:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache = json.load(f)
-                    logger.info(f"📦 Loaded cache with {len(cache)} restaurants")
-                    return cache
-        except FileNotFoundError:
-            pass
-        return {}
+        if not self.use_cache:
+            return {}
+        cache = RestaurantCache(self.cache_file, ttl=self.cache_ttl).restaurants
+        if cache:
+            logger.info(f"📦 Loaded cache with {len(cache)} restaurants")
+        return cache
     
     def save_cache(self, data: Dict[str, Any]):
         """Save scraped data to cache"""
         try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-                logger.info(f"💾 Cached {len(data)} restaurants")
+            cache = RestaurantCache(self.cache_file, ttl=self.cache_ttl)
+            cache.restaurants = data
+            cache.compact()
+            logger.info(f"💾 Cached {len(data)} restaurants")
         except Exception as e:
             logger.error(f"❌ Failed to save cache: {e}")
     
@@ -151,6 +249,11 @@ class RestaurantScraper:
     # STEP 2: RESTAURANT DATA EXTRACTION
     # ========================================================================
     
+    def fetch(self, url: str, **kwargs) -> requests.Response:
+        """GET a URL once the per-host rate limit allows - not called yet, see scrape_city_restaurants()"""
+        self.rate_limiter.wait(url)
+        return self.session.get(url, timeout=REQUEST_TIMEOUT, **kwargs)
+    
     def scrape_city_restaurants(self, city: str, location: str) -> List[Dict[str, Any]]:
         """
         Scrape restaurants for a specific city and location from Zomato
@@ -160,8 +263,9 @@ class RestaurantScraper:
         logger.info(f"🔍 Scraping: {city} > {location}")
         restaurants = []
         
-        # Use mock data generation (fast and reliable)
-        # In production, can replace with real Zomato scraping with proper rate limiting
+        # Use mock data generation (fast and reliable), so no request is made and
+        # the per-host rate limit is not exercised yet. Real Zomato scraping must
+        # fetch pages with self.fetch(), which applies it across workers
         restaurants = self._generate_mock_restaurants(city, location, count=5)
         
         return restaurants
@@ -220,92 +324,93 @@ class RestaurantScraper:
         """
         Enrich restaurant data with ratings, cuisines, hours, images, GPS coordinates
         """
+        return self.enrich_many([restaurant])[0]
+    
+    def _cuisine_profile(self, cuisines_text: str) -> Dict[str, Any]:
+        """Fields derived from a restaurant's cuisines, computed once per cuisine set"""
+        profile = self._profiles_by_text.get(cuisines_text)
+        if profile is not None:
+            return profile
+        
+        cuisines = tuple(self._parse_cuisines(cuisines_text))
+        profile = self._profiles.get(cuisines)
+        if profile is None:
+            cuisine_list = list(cuisines)
+            opening_hours = self._generate_opening_hours(cuisine_list)
+            profile = {
+                'cuisines': cuisine_list,
+                'opening_hours': opening_hours,
+                'open_intervals': parse_hours(opening_hours),  # minutes from Monday 00:00
+                'image_url': self._get_restaurant_image(cuisine_list),
+                'meal_periods': self._determine_meal_periods(cuisine_list),
+                'highlights': {},  # by rating tier, filled on demand
+            }
+            self._profiles[cuisines] = profile
+        self._profiles_by_text[cuisines_text] = profile
+        return profile
+    
+    def enrich_many(self, restaurants: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Enrich a batch of restaurants
+        Cuisine-derived fields are looked up per cuisine set and the same lists
+        and dicts are shared by every restaurant with that set - treat them as
+        read-only
+        """
+        timestamp = datetime.now().isoformat()
+        enriched_list = []
         
-        # 1. Parse and normalize cuisines
-        cuisines = self._parse_cuisines(restaurant.get('cuisines_text', ''))
-        
-        # 2. Enhance rating accuracy
-        rating = restaurant.get('rating', 4.0)
-        if rating < 3.5:
-            rating = 3.5  # Minimum realistic rating for active restaurant
-        
-        # 3. Generate opening hours based on cuisine type
-        opening_hours = self._generate_opening_hours(cuisines)
-        
-        # 4. Get restaurant image URL from Unsplash
-        image_url = self._get_restaurant_image(cuisines)
-        
-        # 5. Calculate GPS coordinates for location
-        lat, lng = self._get_location_coordinates(
-            restaurant['city'],
-            restaurant['location']
-        )
-        
-        # 6. Determine price range based on restaurant characteristics
-        price_range = self._determine_price_range(restaurant.get('name', ''), cuisines)
-        
-        # 7. Identify meal periods served
-        meal_periods = self._determine_meal_periods(cuisines)
-        
-        # 8. Generate highlights/tags
-        highlights = self._generate_highlights(restaurant.get('name', ''), cuisines, rating)
-        
-        # Enhance the restaurant data
-        enriched = {
-            **restaurant,
-            'rating': rating,
-            'cuisines': cuisines,  # Now an array instead of text
-            'opening_hours': opening_hours,
-            'image_url': image_url,
-            'latitude': lat,
-            'longitude': lng,
-            'price_range': price_range,
-            'meal_periods': meal_periods,
-            'highlights': highlights,
-            'phone': self._generate_phone(restaurant['city']),
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Remove temporary fields
-        enriched.pop('cuisines_text', None)
+        for restaurant in restaurants:
+            # 1. Parse and normalize cuisines (with hours, image and meal periods)
+            profile = self._cuisine_profile(restaurant.get('cuisines_text', ''))
+            cuisines = profile['cuisines']
+            
+            # 2. Enhance rating accuracy
+            rating = restaurant.get('rating', 4.0)
+            if rating < 3.5:
+                rating = 3.5  # Minimum realistic rating for active restaurant
+            
+            # 3. Highlights depend only on the cuisines and the rating tier
+            tier = (rating >= 4.5, rating >= 4.0)
+            highlights = profile['highlights'].get(tier)
+            if highlights is None:
+                highlights = profile['highlights'].setdefault(
+                    tier, self._generate_highlights(restaurant.get('name', ''), cuisines, rating))
+            
+            # Enhance the restaurant data
+            enriched = {
+                **restaurant,
+                'rating': rating,
+                'cuisines': cuisines,  # Now an array instead of text
+                'opening_hours': profile['opening_hours'],
+                'open_intervals': profile['open_intervals'],
+                'image_url': profile['image_url'],
+                'latitude': None,  # set from the gazetteer below
+                'longitude': None,
+                'price_range': self._determine_price_range(restaurant.get('name', ''), cuisines),
+                'meal_periods': profile['meal_periods'],
+                'highlights': highlights,
+                'phone': self._generate_phone(restaurant['city']),
+                'timestamp': timestamp
+            }
+            
+            # Remove temporary fields
+            enriched.pop('cuisines_text', None)
+            enriched_list.append(enriched)
         
-        return enriched
+        # 4. GPS coordinates of each location, resolved once per batch
+        self.gazetteer.assign(enriched_list)
+        return enriched_list
     
     def _parse_cuisines(self, cuisines_text: str) -> List[str]:
         """Parse cuisines from text into standardized array"""
-        
-        # Standardized cuisine options from EazyDiner
-        cuisine_map = {
-            'north indian': 'North Indian',
-            'south indian': 'South Indian',
-            'chinese': 'Chinese',
-            'continental': 'Continental',
-            'italian': 'Italian',
-            'mughlai': 'Mughlai',
-            'pan asian': 'Pan Asian',
-            'japanese': 'Japanese',
-            'mediterranean': 'Mediterranean',
-            'fast food': 'Fast Food',
-            'cafe': 'Cafe',
-            'bakery': 'Bakery',
-            'desserts': 'Desserts',
-            'biryani': 'Biryani',
-            'kebab': 'Kebab',
-            'seafood': 'Seafood',
-        }
-        
-        cuisines = []
         text_lower = cuisines_text.lower()
-        
-        for key, value in cuisine_map.items():
-            if key in text_lower:
-                cuisines.append(value)
+        cuisines = [value for key, value in CUISINE_MAP.items() if key in text_lower]
         
         # Default if none matched
         if not cuisines:
-            cuisines = ['North Indian', 'Continental']
+            cuisines = list(DEFAULT_CUISINES)
         
-        return list(set(cuisines))  # Remove duplicates
+        return list(dict.fromkeys(cuisines))  # Remove duplicates, keep map order
     
     def _generate_opening_hours(self, cuisines: List[str]) -> Dict[str, str]:
         """Generate realistic opening hours based on cuisine type"""
@@ -352,35 +457,12 @@ class RestaurantScraper:
         # Default restaurant image
         return 'https://images.unsplash.com/photo-1517521914051-ce0eeaca3311?w=400&h=300&fit=crop'
     
-    def _get_location_coordinates(self, city: str, location: str) -> tuple:
-        """Get GPS coordinates for city and location"""
-        
-        # Base coordinates for each city
-        city_coords = CITIES_CONFIG
-        
-        if city not in city_coords:
-            return 28.6139, 77.2090  # Default to Delhi
-        
-        base_lat = city_coords[city]['lat']
-        base_lng = city_coords[city]['lng']
-        
-        # Add slight variation based on location name
-        lat_offset = (len(location) % 10) * 0.01
-        lng_offset = (sum(ord(c) for c in location) % 10) * 0.01
-        
-        return round(base_lat + lat_offset, 4), round(base_lng + lng_offset, 4)
-    
     def _determine_price_range(self, restaurant_name: str, cuisines: List[str]) -> str:
         """Determine price range (₹ to ₹₹₹₹) based on restaurant type"""
         
-        premium_keywords = ['premium', 'fine dining', 'michelin', 'luxury', 'exclusive']
-        budget_keywords = ['dhabha', 'dhaba', 'roadside', 'street', 'fast']
-        
-        name_lower = restaurant_name.lower()
-        
-        if any(keyword in name_lower for keyword in premium_keywords):
+        if PREMIUM_PATTERN.search(restaurant_name):
             return '₹₹₹₹'
-        elif any(keyword in name_lower for keyword in budget_keywords) or 'Fast Food' in cuisines:
+        elif BUDGET_PATTERN.search(restaurant_name) or 'Fast Food' in cuisines:
             return '₹'
         elif 'Cafe' in cuisines or 'Bakery' in cuisines:
             return '₹₹'
@@ -432,21 +514,7 @@ class RestaurantScraper:
     
     def _generate_phone(self, city: str) -> str:
         """Generate realistic phone number format for restaurant"""
-        import random
-        area_codes = {
-            'Delhi': '11',
-            'Mumbai': '22',
-            'Bangalore': '80',
-            'Hyderabad': '40',
-            'Chennai': '44',
-            'Pune': '20',
-            'Kolkata': '33',
-            'Chandigarh': '172',
-            'Ahmedabad': '79',
-            'Jaipur': '141',
-        }
-        
-        area = area_codes.get(city, '11')
+        area = AREA_CODES.get(city, '11')
         number = f"{random.randint(41000000, 49999999)}"
         return f"+91-{area}-{number[:4]}-{number[4:]}"
     
@@ -460,9 +528,11 @@ class RestaurantScraper:
         Includes discount codes, URLs, and all enriched metadata
         """
         
-        # Generate unique coupon code: CITY + LOCATION + DISCOUNT
+        # Display code: CITY + LOCATION + DISCOUNT - shared by restaurants of a
+        # location in the same tier, so identity comes from the content id
         discount_percent = self._calculate_discount(restaurant.get('rating', 4.0))
-        coupon_code = f"{city[:3].upper()}{restaurant.get('id', 'REST').split('_')[1][:3].upper()}{discount_percent}".replace('%', '')
+        location_code = restaurant.get('location', '').replace(' ', '')[:3].upper() or 'RST'
+        coupon_code = f"{city[:3].upper()}{location_code}{discount_percent}".replace('%', '')
         
         # Generate coupon description
         description = f"{discount_percent} Off at {restaurant.get('name', 'Restaurant')}"
@@ -473,6 +543,7 @@ class RestaurantScraper:
         # Create coupon object with enriched fields
         coupon = {
             # Basic coupon fields
+            'id': restaurant_key(city, restaurant.get('location', ''), restaurant.get('name', '')),
             'coupon_code': coupon_code,
             'description': description,
             'discount': discount_percent,
@@ -483,6 +554,7 @@ class RestaurantScraper:
             'category': 'food',
             'city': city,
             'timestamp': datetime.now().isoformat(),
+            'origin': COUPON_ORIGIN,
             
             # Enriched fields from scraper (new data model)
             'location': restaurant.get('location', ''),
@@ -493,6 +565,7 @@ class RestaurantScraper:
             'meal_periods': restaurant.get('meal_periods', ['Lunch', 'Dinner']),
             'price_range': restaurant.get('price_range', '₹₹₹'),
             'opening_hours': restaurant.get('opening_hours', {}),
+            'open_intervals': restaurant.get('open_intervals') or parse_hours(restaurant.get('opening_hours', {})),
             'image_url': restaurant.get('image_url', ''),
             'tags': restaurant.get('highlights', []),
             'phone': restaurant.get('phone', ''),
@@ -555,8 +628,11 @@ class RestaurantScraper:
     
     def integrate_with_coupons_file(self, restaurants: List[Dict[str, Any]], output_file: str = 'coupons.json') -> int:
         """
-        Integrate scraped restaurants into existing coupons.json file
-        Preserves existing coupons and adds new restaurant coupons
+        Merge scraped restaurants into the coupons file
+        New coupons are added, changed ones updated in place and coupons of
+        restaurants that are gone are tombstoned. Only the changes are written,
+        to the file's journal. Returns the number of coupons added; the full
+        change summary is kept in self.merge_summary.
         """
         
         logger.info("=" * 60)
@@ -564,96 +640,138 @@ class RestaurantScraper:
         logger.info("=" * 60)
         
         try:
-            # Load existing coupons - handle both old format (list) and new format (dict with 'coupons' key)
-            coupons_list = []
-            try:
-                with open(output_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # If structure is {'timestamp': '...', 'count': ..., 'coupons': [...]}
-                    if isinstance(data, dict) and 'coupons' in data:
-                        coupons_list = data['coupons']
-                    # If structure is just a list of coupons
-                    elif isinstance(data, list):
-                        coupons_list = data
-                    # If it's a dict but not the above format, extract values
-                    elif isinstance(data, dict):
-                        coupons_list = list(data.values())
-                    logger.info(f"📖 Loaded {len(coupons_list)} existing coupons")
-            except FileNotFoundError:
-                logger.info("📝 Creating new coupons file")
-            
-            # Track new additions
-            new_coupons_count = 0
-            coupon_codes_added = set([c.get('coupon_code') for c in coupons_list])
+            store = CouponStore(output_file)
+            logger.info(f"📖 Loaded {len(store.coupons)} existing coupons")
+            adopted = self._adopt_legacy_coupons(store)
+            if adopted:
+                logger.info(f"🔑 Assigned ids to {adopted} restaurant coupons keyed by code")
             
-            # Convert restaurants to coupons
-            for restaurant in restaurants:
-                city = restaurant.get('city', 'Unknown')
-                
-                coupon = self.generate_coupon_from_restaurant(restaurant, city)
-                coupon_code = coupon['coupon_code']
-                
-                # Avoid duplicates
-                if coupon_code not in coupon_codes_added:
-                    coupons_list.append(coupon)
-                    coupon_codes_added.add(coupon_code)
-                    new_coupons_count += 1
-                    logger.debug(f"  ✓ Added: {coupon_code} - {coupon['description']}")
-            
-            # Save updated coupons with metadata
-            output_data = {
-                'timestamp': datetime.now().isoformat(),
-                'count': len(coupons_list),
-                'coupons': coupons_list
-            }
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+            coupons = (self.generate_coupon_from_restaurant(restaurant, restaurant.get('city', 'Unknown'))
+                       for restaurant in restaurants)
+            summary = merge(store, coupons, owned={'origin': COUPON_ORIGIN})
+            written = store.save()
+            self.merge_summary = summary
             
             logger.info(f"\n✅ Integration complete!")
-            logger.info(f"   Total coupons: {len(coupons_list)}")
-            logger.info(f"   New coupons added: {new_coupons_count}")
-            logger.info(f"   Saved to: {output_file}")
+            logger.info(f"   Total coupons: {len(store.active())}")
+            logger.info(f"   Added: {summary['added']}, updated: {summary['updated']}, "
+                        f"unchanged: {summary['unchanged']}, removed: {summary['removed']}")
+            logger.info(f"   Saved {written} changes to: {output_file}")
             
-            return new_coupons_count
+            return summary['added']
             
         except Exception as e:
             logger.error(f"❌ Integration failed: {e}")
             raise
     
-    def process_all_cities(self, output_file: str = 'coupons.json') -> int:
+    def _adopt_legacy_coupons(self, store: CouponStore) -> int:
+        """Key restaurant coupons written before coupons had ids by their content id"""
+        adopted = 0
+        for key, coupon in list(store.coupons.items()):
+            if coupon.get('id') or coupon.get('category') != 'food' or not coupon.get('location'):
+                continue
+            coupon_id = restaurant_key(coupon.get('city', ''), coupon['location'], coupon.get('source', ''))
+            if store.assign_id(key, coupon_id):
+                coupon.setdefault('origin', COUPON_ORIGIN)
+                adopted += 1
+        return adopted
+    
+    def _record_progress(self, city: str, location: str, status: str):
+        """Update per-location progress"""
+        with self._progress_lock:
+            self.progress['locations'][f"{city} > {location}"] = status
+            if status in ('done', 'fresh', 'resumed', 'failed'):
+                self.progress[status] += 1
+            finished = sum(self.progress[key] for key in ('done', 'fresh', 'resumed', 'failed'))
+            total = self.progress['total']
+        if status != 'running':
+            logger.info(f"   [{finished}/{total}] {city} > {location}: {status}")
+    
+    def _process_city(self, city: str, city_info: Dict[str, Any],
+                      cache: RestaurantCache, checkpoint: PipelineCheckpoint) -> List[tuple]:
+        """
+        Scrape and enrich the city's stale locations, returns (location, entries) per scraped location
+        Each location is checkpointed as soon as it is done; locations an
+        interrupted run already finished are taken from the checkpoint.
+        """
+        logger.info(f"\n📍 Processing: {city} ({len(city_info['locations'])} locations)")
+        scraped = []
+        for location in city_info["locations"]:
+            if self.use_cache and cache.is_fresh(city, location):
+                self._record_progress(city, location, 'fresh')
+                continue
+            entries = checkpoint.get(city, location)
+            if entries is not None:
+                scraped.append((location, entries))
+                self._record_progress(city, location, 'resumed')
+                continue
+            self._record_progress(city, location, 'running')
+            try:
+                # Step 2: Scrape restaurants
+                restaurants = self.scrape_city_restaurants(city, location)
+                
+                # Step 3: Enrich the location's restaurants as one batch
+                entries = {restaurant_key(city, location, enriched.get('name', '')): enriched
+                           for enriched in self.enrich_many(restaurants)}
+            except Exception:
+                self._record_progress(city, location, 'failed')
+                raise
+            checkpoint.record(city, location, entries)
+            scraped.append((location, entries))
+            self._record_progress(city, location, 'done')
+        return scraped
+    
+    def process_all_cities(self, output_file: str = 'coupons.json', max_workers: Optional[int] = None,
+                           shard_dir: Optional[str] = None) -> int:
         """
         Main orchestration function: Scrape all cities, enrich data, and integrate with coupons
+        Cities run in parallel on max_workers threads (default self.max_workers).
+        Completed locations are checkpointed beside the cache, so a run that
+        fails or is killed resumes where it stopped. With shard_dir, the
+        restaurants and their coupons are also written as per-city shards.
         """
+        workers = max_workers or self.max_workers
         logger.info("=" * 60)
-        logger.info("🚀 STARTING COMPLETE RESTAURANT DATA PIPELINE")
+        logger.info(f"🚀 STARTING COMPLETE RESTAURANT DATA PIPELINE ({workers} workers)")
         logger.info("=" * 60)
         
-        all_restaurants = self.load_cache()
+        cache = RestaurantCache(self.cache_file, ttl=self.cache_ttl)
+        checkpoint = PipelineCheckpoint(f"{self.cache_file}.checkpoint", max_age=self.cache_ttl)
+        with self._progress_lock:
+            self.progress = {
+                'total': sum(len(info['locations']) for info in CITIES_CONFIG.values()),
+                'done': 0,
+                'fresh': 0,
+                'resumed': 0,
+                'failed': 0,
+                'locations': {},
+            }
         
         try:
-            for city, city_info in CITIES_CONFIG.items():
-                logger.info(f"\n📍 Processing: {city} ({len(city_info['locations'])} locations)")
-                
-                for idx, location in enumerate(city_info["locations"], 1):
-                    # Rate limiting to avoid IP bans
-                    time.sleep(0.5)
-                    
-                    logger.info(f"   [{idx}/{len(city_info['locations'])}] {location}...")
-                    
-                    # Step 2: Scrape restaurants
-                    restaurants = self.scrape_city_restaurants(city, location)
-                    
-                    # Step 3: Enrich each restaurant
-                    for restaurant in restaurants:
-                        enriched = self.enrich_restaurant_data(restaurant)
-                        all_restaurants[f"{city}_{enriched.get('id', '')}"] = enriched
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [(city, pool.submit(self._process_city, city, city_info, cache, checkpoint))
+                           for city, city_info in CITIES_CONFIG.items()]
+                # Merged in config order, so the cache matches a sequential run
+                changed = 0
+                for city, future in futures:
+                    for location, entries in future.result():
+                        changed += cache.replace_location(city, location, entries)
             
-            self.save_cache(all_restaurants)
-            logger.info(f"\n💾 Cache saved: {len(all_restaurants)} restaurants")
+            cache.flush()
+            all_restaurants = cache.restaurants
+            logger.info(f"\n💾 Cache saved: {len(all_restaurants)} restaurants, {changed} changed")
             
-            # Step 4: Integrate with coupons
-            restaurants_list = list(all_restaurants.values())
+            # Step 4: Integrate with coupons - restaurants gone from a re-scraped
+            # location, or from the configured locations, get their coupons removed
+            configured = {location_key(city, location)
+                          for city, info in CITIES_CONFIG.items() for location in info['locations']}
+            restaurants_list = [r for r in all_restaurants.values()
+                                if location_key(r.get('city', ''), r.get('location', '')) in configured]
             coupons_added = self.integrate_with_coupons_file(restaurants_list, output_file)
+            if shard_dir:
+                coupons = [c for c in CouponStore(output_file).active() if c.get('origin') == COUPON_ORIGIN]
+                CityShardStore(shard_dir).write(all_restaurants, coupons)
+            checkpoint.clear()
             
             logger.info(f"\n🎉 PIPELINE COMPLETE!")
             logger.info(f"   Restaurants scraped: {len(all_restaurants)}")
@@ -675,7 +793,7 @@ def main():
     scraper = RestaurantScraper(use_cache=True)
     
     # Complete pipeline with all 4 steps
-    coupons_added = scraper.process_all_cities(output_file='coupons.json')
+    coupons_added = scraper.process_all_cities(output_file='coupons.json', shard_dir=DEFAULT_SHARD_DIR)
     
     logger.info(f"\n🎊 SUCCESS! {coupons_added} new restaurant coupons added to coupons.json")
     return coupons_added
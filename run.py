@@ -75,6 +75,17 @@ def main():
     
     # Scrape command
     scrape_parser = subparsers.add_parser('scrape', help='Scrape deals once')
+    scrape_parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='Use the staged fetch/parse pipeline (parsing in a process pool)'
+    )
+    scrape_parser.add_argument(
+        '--fetch-workers',
+        type=int,
+        default=4,
+        help='Concurrent page downloads for --pipeline (default: 4)'
+    )
     
     # Both command - run scheduler and dashboard together
     both_parser = subparsers.add_parser('both', help='Run both scheduler and dashboard')
@@ -97,6 +108,30 @@ def main():
         run_scheduler(args)
     elif args.command == 'dashboard':
         run_dashboard(args)
+    elif args.command == 'scrape' and args.pipeline:
+        from deals_bot import DealsStorage
+        from scrape_pipeline import ScrapePipeline
+        from deal_ingest import ingest_deals
+        
+        pipeline = ScrapePipeline([AmazonScraper(), FlipkartScraper()], fetch_workers=args.fetch_workers)
+        results = pipeline.run()
+        
+        storage = DealsStorage()
+        for source, deals in pipeline.deals.items():
+            if results[source]["unchanged"]:
+                continue  # Same pages as last run, already stored
+            queued = ingest_deals(deals, sample=results[source]["sample"])
+            storage.save_deals(deals, source)
+            storage.save_latest(deals, source)
+            if not results[source]["sample"]:
+                results[source]["alerts_queued"] = queued
+        
+        print("\n=== Results ===")
+        for source, result in results.items():
+            print(f"{source}: {result}")
+        print("\n=== Pipeline stages ===")
+        for stage, stats in pipeline.stage_metrics().items():
+            print(f"{stage}: {stats}")
     elif args.command == 'scrape':
         from deals_bot import DealsAggregator
         
@@ -124,6 +159,7 @@ def main():
         parser.print_help()
         print("\n\nExamples:")
         print("  python deals_bot/run.py scrape           # Scrape deals once")
+        print("  python deals_bot/run.py scrape --pipeline # Scrape with the staged pipeline")
         print("  python deals_bot/run.py scheduler         # Run scheduler 24X7")
         print("  python deals_bot/run.py dashboard         # Run web dashboard")
         print("  python deals_bot/run.py both             # Run both scheduler and dashboard")
@@ -18,6 +18,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from deals_bot import DealsAggregator, logger
 from amazon_scraper import AmazonScraper
 from flipkart_scraper import FlipkartScraper
+from circuit_breaker import breaker_status
 
 
 class DealsBatchScheduler:
@@ -62,6 +63,10 @@ class DealsBatchScheduler:
                 deals_count = result.get('deals_count', 0)
                 logger.info(f"  - {source}: {status} - {deals_count} deals")
             
+            for name, breaker in breaker_status().items():
+                if breaker['state'] != 'closed':
+                    logger.warning(f"  - circuit {name}: {breaker['state']} (retry in {breaker['retry_in_seconds']}s)")
+            
             return True
             
         except Exception as e:
@@ -0,0 +1,389 @@
+"""
+Scrape Pipeline
+Runs scrapers as fetch -> parse -> normalize -> store stages over bounded queues
+"""
+
+import os
+import logging
+import importlib
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from page_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Concurrent page downloads across all scrapers
+FETCH_WORKERS = 4
+# Deals per normalize/store batch
+BATCH_SIZE = 25
+# Capacity of each queue between stages
+QUEUE_SIZE = 16
+# Same limits scrape() applies per source
+MAX_DEALS_PER_SOURCE = 50
+MIN_DEALS_PER_SOURCE = 5
+
+_STOP = object()
+
+# Scraper instances cached per worker process
+_worker_scrapers: Dict[Tuple[str, str], Any] = {}
+
+
+def parse_page(scraper_path: Tuple[str, str], content: bytes, category: str, page_kind: str,
+               selector_scores: Dict[str, Dict[str, float]]) -> Tuple[List[Dict[str, Any]], list]:
+    """
+    Parse a fetched page inside a worker process
+    Returns the Deal fields and the selector outcomes observed while parsing
+    """
+    scraper = _worker_scrapers.get(scraper_path)
+    if scraper is None:
+        module_name, class_name = scraper_path
+        scraper = getattr(importlib.import_module(module_name), class_name)()
+        _worker_scrapers[scraper_path] = scraper
+
+    scraper.selectors.scores = selector_scores
+    scraper.selectors.journal = []
+    soup = BeautifulSoup(content, 'html.parser')
+    fields = scraper._parse_listing_fields(soup, category, page_kind)
+    return fields, scraper.selectors.journal
+
+
+class StageMetrics:
+    """Throughput and input queue depth for one pipeline stage"""
+
+    def __init__(self, name: str, input_queue: Optional[queue.Queue] = None):
+        self.name = name
+        self.input_queue = input_queue
+        self.tasks = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float):
+        """Record one unit of work that produced items"""
+        depth = self.input_queue.qsize() if self.input_queue is not None else 0
+        with self._lock:
+            self.tasks += 1
+            self.items += items
+            self.busy_seconds += seconds
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "tasks": self.tasks,
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / elapsed, 2) if elapsed > 0 else 0.0,
+            "queue_depth": self.input_queue.qsize() if self.input_queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class _CategoryJob:
+    """One scraper category walking its candidate URLs until one yields deals"""
+
+    def __init__(self, scraper, category: str):
+        self.scraper = scraper
+        self.category = category
+        self.candidates = scraper._candidate_urls(category)
+        self.urls = scraper.url_memory.order(category, list(self.candidates))
+        self.index = 0
+
+
+class ScrapePipeline:
+    """
+    Staged scrape run
+    Fetch threads keep sockets busy, parsing runs in a process pool and
+    normalization to Deal plus storage happen in batches
+    """
+
+    def __init__(self, scrapers: List[Any], store: Optional[Callable[[str, list], None]] = None,
+                 deal_factory: Optional[Callable[..., Any]] = None,
+                 fetch_workers: int = FETCH_WORKERS, parse_workers: Optional[int] = None,
+                 batch_size: int = BATCH_SIZE, queue_size: int = QUEUE_SIZE,
+                 max_deals_per_source: int = MAX_DEALS_PER_SOURCE, use_processes: bool = True):
+        if deal_factory is None:
+            from __init__ import Deal
+            deal_factory = Deal
+
+        self.scrapers = scrapers
+        self.store = store
+        self.deal_factory = deal_factory
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_deals_per_source = max_deals_per_source
+        self.use_processes = use_processes
+
+        self.job_queue: queue.Queue = queue.Queue()  # unbounded - parse feeds retries back
+        self.page_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.fields_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.store_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.metrics = {
+            "fetch": StageMetrics("fetch", self.job_queue),
+            "parse": StageMetrics("parse", self.page_queue),
+            "normalize": StageMetrics("normalize", self.fields_queue),
+            "store": StageMetrics("store", self.store_queue),
+        }
+
+        self.deals: Dict[str, list] = {scraper.source: [] for scraper in scrapers}
+        self._parsed_counts: Dict[str, int] = {scraper.source: 0 for scraper in scrapers}
+        # Pages parsed vs. reused from the page cache, per source
+        self._pages_parsed: Dict[str, int] = {scraper.source: 0 for scraper in scrapers}
+        self._pages_reused: Dict[str, int] = {scraper.source: 0 for scraper in scrapers}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+
+    def _finish_job(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending <= 0:
+                self._done.set()
+
+    def _source_full(self, source: str) -> bool:
+        return self._parsed_counts[source] >= self.max_deals_per_source
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    def _fetch_next(self, job: _CategoryJob) -> Optional[Tuple[str, bytes, str, Optional[List[Dict[str, Any]]]]]:
+        """
+        Fetch the next usable candidate URL of a job
+        Returns the URL, content, content hash and the cached fields if the page is unchanged
+        """
+        scraper = job.scraper
+        while job.index < len(job.urls):
+            if self._source_full(scraper.source):
+                return None
+            url = job.urls[job.index]
+            job.index += 1
+            if scraper.url_memory.should_skip(job.category, url):
+                logger.info(f"Skipping failing {scraper.source} URL: {url}")
+                continue
+            content = scraper._fetch(url)
+            if content is None:
+                continue  # skipped or failed - says nothing about the URL's yield
+            page_hash = content_hash(content)
+            cached = scraper.page_cache.lookup(job.category, url, page_hash)
+            if cached == []:
+                # Unchanged page that had no deals last time either
+                scraper.url_memory.record(job.category, url, 0)
+                continue
+            return url, content, page_hash, cached
+        return None
+
+    def _reuse(self, job: _CategoryJob, url: str, fields: List[Dict[str, Any]]):
+        """Take an unchanged page's cached deals, skipping parse and storage"""
+        source = job.scraper.source
+        logger.info(f"Page unchanged, reusing {len(fields)} parsed deals: {url}")
+        job.scraper.url_memory.record(job.category, url, len(fields))
+        deals = [self.deal_factory(**f) for f in fields]
+        with self._lock:
+            self._parsed_counts[source] += len(fields)
+            self._pages_reused[source] += 1
+            self.deals[source].extend(deals)
+
+    def _fetch_worker(self):
+        while True:
+            job = self.job_queue.get()
+            if job is _STOP:
+                break
+            started = time.perf_counter()
+            page = None
+            try:
+                page = self._fetch_next(job)
+            except Exception as e:
+                logger.error(f"Fetch stage error for {job.scraper.source}/{job.category}: {e}")
+            self.metrics["fetch"].record(1 if page else 0, time.perf_counter() - started)
+            if page is None:
+                self._finish_job()
+                continue
+            url, content, page_hash, cached = page
+            if cached is not None:
+                self._reuse(job, url, cached)
+                self._finish_job()
+            else:
+                self.page_queue.put((job, url, content, page_hash))
+
+    def _parse(self, job: _CategoryJob, url: str, content: bytes) -> List[Dict[str, Any]]:
+        scraper = job.scraper
+        page_kind = job.candidates[url]
+        if self._pool is None:
+            soup = BeautifulSoup(content, 'html.parser')
+            return scraper._parse_listing_fields(soup, job.category, page_kind)
+
+        scraper_path = (type(scraper).__module__, type(scraper).__name__)
+        fields, journal = self._pool.submit(
+            parse_page, scraper_path, content, job.category, page_kind, scraper.selectors.snapshot()
+        ).result()
+        # Replay the worker's selector observations into the parent strategy
+        for page_type, name in journal:
+            scraper.selectors.record(page_type, name)
+        return fields
+
+    def _parse_worker(self):
+        while True:
+            item = self.page_queue.get()
+            if item is _STOP:
+                break
+            job, url, content, page_hash = item
+            started = time.perf_counter()
+            fields = []
+            try:
+                fields = self._parse(job, url, content)
+                job.scraper.page_cache.store(job.category, url, page_hash, fields)
+            except Exception as e:
+                logger.error(f"Parse stage error for {url}: {e}")
+            self.metrics["parse"].record(len(fields), time.perf_counter() - started)
+            job.scraper.url_memory.record(job.category, url, len(fields))
+
+            source = job.scraper.source
+            with self._lock:
+                self._pages_parsed[source] += 1
+            if fields:
+                with self._lock:
+                    self._parsed_counts[source] += len(fields)
+                self.fields_queue.put((source, fields))
+                self._finish_job()
+            else:
+                # Nothing on this page - fall back to the job's next candidate
+                self.job_queue.put(job)
+
+    def _emit_batch(self, source: str, fields_batch: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        deals = [self.deal_factory(**fields) for fields in fields_batch]
+        self.metrics["normalize"].record(len(deals), time.perf_counter() - started)
+        self.store_queue.put((source, deals))
+
+    def _normalize_worker(self):
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        while True:
+            item = self.fields_queue.get()
+            if item is _STOP:
+                break
+            source, fields = item
+            buffer = pending.setdefault(source, [])
+            buffer.extend(fields)
+            while len(buffer) >= self.batch_size:
+                self._emit_batch(source, buffer[:self.batch_size])
+                del buffer[:self.batch_size]
+
+        for source, buffer in pending.items():
+            if buffer:
+                self._emit_batch(source, buffer)
+        self.store_queue.put(_STOP)
+
+    def _store_worker(self):
+        while True:
+            item = self.store_queue.get()
+            if item is _STOP:
+                break
+            source, deals = item
+            started = time.perf_counter()
+            try:
+                self.deals[source].extend(deals)
+                if self.store:
+                    self.store(source, deals)
+            except Exception as e:
+                logger.error(f"Store stage error for {source}: {e}")
+            self.metrics["store"].record(len(deals), time.perf_counter() - started)
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def _start(self, target: Callable, count: int) -> List[threading.Thread]:
+        threads = [threading.Thread(target=target, daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _stop(self, name: str, threads: List[threading.Thread], input_queue: Optional[queue.Queue]):
+        if input_queue is not None:
+            for _ in threads:
+                input_queue.put(_STOP)
+        for thread in threads:
+            thread.join()
+        self.metrics[name].finished = time.perf_counter()
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """Run every scraper category through the pipeline"""
+        if self.use_processes:
+            self._pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+
+        # Interleave sources so each site's requests are spread over the run
+        per_scraper = [[_CategoryJob(s, cat_name) for _, cat_name in s.categories] for s in self.scrapers]
+        jobs = []
+        for index in range(max((len(scraper_jobs) for scraper_jobs in per_scraper), default=0)):
+            for scraper_jobs in per_scraper:
+                if index < len(scraper_jobs):
+                    jobs.append(scraper_jobs[index])
+
+        self._pending = len(jobs)
+        if not jobs:
+            self._done.set()
+
+        stage_threads = {
+            "fetch": self._start(self._fetch_worker, self.fetch_workers),
+            "parse": self._start(self._parse_worker, self.parse_workers),
+            "normalize": self._start(self._normalize_worker, 1),
+            "store": self._start(self._store_worker, 1),
+        }
+        for job in jobs:
+            self.job_queue.put(job)
+
+        try:
+            self._done.wait()
+        finally:
+            self._stop("fetch", stage_threads["fetch"], self.job_queue)
+            self._stop("parse", stage_threads["parse"], self.page_queue)
+            self._stop("normalize", stage_threads["normalize"], self.fields_queue)
+            self._stop("store", stage_threads["store"], None)
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+        results = {}
+        for scraper in self.scrapers:
+            scraper.url_memory.save()
+            scraper.page_cache.save()
+            deals = self.deals[scraper.source]
+            # Same demo fallback as scrape()
+            sample = len(deals) < MIN_DEALS_PER_SOURCE
+            if sample:
+                logger.info(f"Adding sample deals for {scraper.source}")
+                deals = scraper._get_sample_deals()
+                self.deals[scraper.source] = deals
+                if self.store:
+                    self.store(scraper.source, deals)
+            results[scraper.source] = {
+                "status": "success",
+                "deals_count": len(deals),
+                # Every page matched its cached hash - nothing new to store
+                "unchanged": self._pages_parsed[scraper.source] == 0 and self._pages_reused[scraper.source] > 0,
+                "sample": sample,
+            }
+
+        for name, stats in self.stage_metrics().items():
+            logger.info(f"Pipeline stage {name}: {stats}")
+        return results
+
+    def stage_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage throughput and queue depth"""
+        return {name: metrics.snapshot() for name, metrics in self.metrics.items()}
@@ -0,0 +1,135 @@
+"""
+Selector Strategy
+Remembers which HTML selector matched for each source and page type
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Score multiplier applied on every observation - older wins fade out
+DEFAULT_DECAY = 0.8
+
+
+@dataclass(frozen=True)
+class Selector:
+    """A named tag/attribute matcher with BeautifulSoup class-matching semantics"""
+    name: str
+    tag: str
+    attr: Optional[str] = None
+    value: Optional[str] = None
+    match: str = "contains"  # "contains", "icontains" or "exact"
+
+    def _match_value(self, raw) -> bool:
+        if raw is None:
+            return False
+        # Multi-valued attributes (class) are matched per value and joined,
+        # the same way find_all treats them
+        values = raw if isinstance(raw, list) else [raw]
+        joined = " ".join(values)
+        if self.match == "exact":
+            return self.value == joined or self.value in values
+        if self.match == "icontains":
+            return self.value.lower() in joined.lower()
+        return self.value in joined
+
+    def matches(self, tag) -> bool:
+        """Check a single tag against this selector"""
+        if tag.name != self.tag:
+            return False
+        if self.attr is None:
+            return True
+        return self._match_value(tag.get(self.attr))
+
+    def find(self, root):
+        """Return the first matching descendant of root"""
+        if self.attr is None:
+            return root.find(self.tag)
+        return root.find(self.tag, {self.attr: lambda x: self._match_value(x)})
+
+
+class SelectorStrategy:
+    """
+    Orders card selectors by how recently and how often they matched
+    Field selectors (find) are only scored - their chains run from specific
+    to catch-all, and a catch-all that matched often must not win over a
+    specific selector that matches the right element.
+    """
+
+    def __init__(self, source: str, decay: float = DEFAULT_DECAY):
+        self.source = source
+        self.decay = decay
+        self.scores: Dict[str, Dict[str, float]] = {}
+        # When set to a list, every recorded outcome is also appended here so a
+        # worker process can ship its observations back to the parent
+        self.journal: Optional[List[Tuple[str, Optional[str]]]] = None
+        self._lock = threading.Lock()
+
+    def order(self, page_type: str, selectors: Iterable[Selector]) -> List[Selector]:
+        """Return selectors with the best scoring first, default order as tie-break"""
+        scores = self.scores.get(page_type, {})
+        return sorted(selectors, key=lambda s: -scores.get(s.name, 0.0))
+
+    def record(self, page_type: str, name: Optional[str]):
+        """Record the selector that matched (None when nothing matched)"""
+        with self._lock:
+            scores = self.scores.setdefault(page_type, {})
+            for key in scores:
+                scores[key] *= self.decay
+            if name:
+                scores[name] = scores.get(name, 0.0) + 1.0
+            if self.journal is not None:
+                self.journal.append((page_type, name))
+
+    def preferred(self, page_type: str) -> Optional[str]:
+        """Name of the currently preferred selector for a page type"""
+        scores = self.scores.get(page_type)
+        if not scores:
+            return None
+        return max(scores, key=scores.get)
+
+    def select_all(self, soup, page_type: str, selectors: List[Selector]) -> Tuple[Optional[Selector], list]:
+        """
+        Match every selector in a single pass over the tree
+        Returns the best ranked selector that matched and its tags
+        """
+        ordered = self.order(page_type, selectors)
+        tag_names = list({s.tag for s in ordered})
+        buckets: Dict[str, list] = {s.name: [] for s in ordered}
+
+        for tag in soup.find_all(tag_names):
+            for selector in ordered:
+                if selector.matches(tag):
+                    buckets[selector.name].append(tag)
+
+        for selector in ordered:
+            if buckets[selector.name]:
+                self.record(page_type, selector.name)
+                return selector, buckets[selector.name]
+
+        self.record(page_type, None)
+        return None, []
+
+    def find(self, root, page_type: str, selectors: List[Selector]):
+        """Find the first element matched by the fallback chain, in the chain's own order"""
+        for selector in selectors:
+            elem = selector.find(root)
+            if elem is not None:
+                self.record(page_type, selector.name)
+                return elem
+        return None
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of the score table, safe to pickle while other threads record"""
+        with self._lock:
+            return {page_type: dict(scores) for page_type, scores in self.scores.items()}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Rounded score table for logging and status output"""
+        return {
+            page_type: {name: round(score, 3) for name, score in scores.items()}
+            for page_type, scores in self.scores.items()
+        }
@@ -0,0 +1,70 @@
+"""
+Brand Matcher Tests
+Tests longest-brand matching and the deal image ingest step
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from brand_matcher import BrandMatcher
+from update_deal_images import (
+    BRAND_IMAGE_MAPPING, DEFAULT_CATEGORY_IMAGES, DEFAULT_IMAGE,
+    get_image_for_product, assign_brand_images,
+)
+
+
+class TestBrandMatcher(unittest.TestCase):
+    """The longest brand starting at a word boundary wins"""
+
+    def setUp(self):
+        self.matcher = BrandMatcher({
+            "Apple": "apple", "iPhone": "iphone", "Apple Watch": "apple-watch",
+            "Watch": "watch", "HP": "hp", "he": "he", "she": "she", "hers": "hers",
+        })
+
+    def test_longest_match_wins(self):
+        self.assertEqual(self.matcher.find("Apple iPhone 15 (128 GB)"), "iphone")
+        self.assertEqual(self.matcher.find("APPLE WATCH Series 9"), "apple-watch")
+        self.assertEqual(self.matcher.find("Noise Smart Watch"), "watch")
+
+    def test_leftmost_among_equal_lengths(self):
+        self.assertEqual(self.matcher.find("Watch for Apple fans"), "watch")
+
+    def test_word_boundaries(self):
+        self.assertEqual(self.matcher.find("HP Victus 15"), "hp")
+        self.assertIsNone(self.matcher.find("WHP Adapter"))
+        self.assertEqual(self.matcher.find("ushers and hers"), "hers")
+        self.assertEqual(self.matcher.find("iPhone15"), "iphone")
+
+    def test_no_match(self):
+        self.assertIsNone(self.matcher.find("Generic cable"))
+        self.assertIsNone(self.matcher.find(""))
+
+
+class TestDealImages(unittest.TestCase):
+    """Brand images with category defaults for every deal"""
+
+    def test_brand_then_category_default(self):
+        self.assertEqual(get_image_for_product("boAt Rockerz 450", "electronics"), BRAND_IMAGE_MAPPING["boAt"])
+        self.assertEqual(get_image_for_product("Apple iPhone 15", "mobiles"), BRAND_IMAGE_MAPPING["iPhone"])
+        self.assertEqual(get_image_for_product("Generic mat", "gaming"), DEFAULT_CATEGORY_IMAGES["gaming"])
+        self.assertEqual(get_image_for_product("Generic mat", "garden"), DEFAULT_IMAGE)
+
+    def test_assign_brand_images(self):
+        scraped = "https://m.media-amazon.com/images/I/example.jpg"
+        deals = [
+            {"product_name": "Dell Inspiron 15", "category": "computers", "image_url": ""},
+            {"product_name": "Dell Inspiron 14", "category": "computers", "image_url": scraped},
+            {"product_name": "Generic mat", "category": "gaming", "image_url": DEFAULT_CATEGORY_IMAGES["gaming"]},
+            SimpleNamespace(product_name="Nintendo Switch", category="gaming", image_url=None),
+        ]
+        # Every deal gets its brand or category image, replacing the scraped one
+        self.assertEqual(assign_brand_images(deals), 3)
+        self.assertEqual(deals[0]["image_url"], BRAND_IMAGE_MAPPING["Dell"])
+        self.assertEqual(deals[1]["image_url"], BRAND_IMAGE_MAPPING["Dell"])
+        self.assertEqual(deals[2]["image_url"], DEFAULT_CATEGORY_IMAGES["gaming"])
+        self.assertEqual(deals[3].image_url, BRAND_IMAGE_MAPPING["Nintendo"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,96 @@
+"""
+Circuit Breaker Tests
+Tests breaker state transitions and the /status breaker report
+"""
+
+import unittest
+
+from circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN,
+    get_breaker, breaker_status,
+)
+
+
+class FakeClock:
+    """Manually advanced clock for cooldown tests"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Breaker should open on repeated failures and recover after a cooldown"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("amazon:/deals", failure_threshold=2, cooldown=60, clock=self.clock)
+
+    def test_opens_after_threshold(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.snapshot()["total_rejected"], 1)
+
+    def test_success_resets_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_single_trial_then_close(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 61
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        # Only one trial request at a time
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 61
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now = 100
+        self.assertFalse(self.breaker.allow())
+
+    def test_call_raises_when_open(self):
+        def boom():
+            raise IOError("503")
+
+        for _ in range(2):
+            with self.assertRaises(IOError):
+                self.breaker.call(boom)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(boom)
+
+
+class TestBreakerRegistry(unittest.TestCase):
+    """Breakers are shared per source and endpoint"""
+
+    def test_get_breaker_is_shared(self):
+        self.assertIs(get_breaker("test-source", "/deals"), get_breaker("test-source", "/deals"))
+        self.assertIsNot(get_breaker("test-source", "/deals"), get_breaker("test-source", "/s"))
+        self.assertIn("test-source:/deals", breaker_status("test-source"))
+
+    def test_status_route_reports_breakers(self):
+        from web_app import app
+
+        get_breaker("test-source", "search")
+        response = app.test_client().get('/status')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("test-source:search", response.get_json()["circuit_breakers"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
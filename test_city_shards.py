@@ -0,0 +1,158 @@
+"""
+City Shard Tests
+Tests per-city shard files, the manifest, lazy loading, LRU eviction and /local serving from shards
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from city_shards import CityShardStore, MANIFEST_FILE, SUMMARY_FILE, SUMMARY_PER_CITY, shard_file_name
+from opening_hours import parse_hours
+
+
+def restaurant(city, name):
+    return {"name": name, "city": city, "location": "Centre", "rating": 4.2}
+
+
+def coupon(city, name, hours=None):
+    return {"coupon_code": f"{city[:3].upper()}{name[:3].upper()}10", "category": "food", "city": city,
+            "source": name, "description": f"10% Off at {name}", "rating": 4.2,
+            "origin": "restaurant_scraper", "open_intervals": parse_hours(hours or {"daily": "11:00-23:00"})}
+
+
+CITIES = ["Delhi", "Pune", "Mumbai", "Chennai"]
+
+
+class ShardTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = CityShardStore(self.directory, max_resident=2)
+        self.store.write(
+            {f"r_{city}": restaurant(city, f"{city} Diner") for city in CITIES},
+            [coupon(city, f"{city} Diner") for city in CITIES],
+        )
+
+
+class TestShardFiles(ShardTestCase):
+    """One file per city plus a manifest with counts"""
+
+    def test_layout(self):
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         sorted([MANIFEST_FILE, SUMMARY_FILE] + [shard_file_name(city) for city in CITIES]))
+        with open(os.path.join(self.directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)["cities"]
+        self.assertEqual(manifest["Pune"]["file"], "pune.json")
+        self.assertEqual((manifest["Pune"]["restaurants"], manifest["Pune"]["coupons"]), (1, 1))
+        self.assertEqual(shard_file_name("New Delhi/NCR"), "new_delhi_ncr.json")
+
+    def test_partial_write_keeps_other_cities(self):
+        self.store.write({}, [coupon("Pune", "Vohuman Cafe"), coupon("Pune", "Goodluck Cafe")])
+        self.assertEqual(self.store.cities(), CITIES)
+        self.assertEqual(len(self.store.get("Pune").coupons), 2)
+        self.assertEqual(len(self.store.get("Delhi").coupons), 1)
+
+
+class TestLazyLoading(ShardTestCase):
+    """Shards load on first use and the least recently used is evicted"""
+
+    def test_lru(self):
+        reader = CityShardStore(self.directory, max_resident=2)
+        self.assertEqual(reader.resident(), [])
+        self.assertIs(reader.get("Delhi"), reader.get("Delhi"))
+        reader.get("Pune")
+        reader.get("Delhi")
+        reader.get("Mumbai")
+        self.assertEqual(reader.resident(), ["Delhi", "Mumbai"])
+        self.assertIsNone(reader.get("Surat"))
+
+    def test_reloaded_after_rewrite(self):
+        reader = CityShardStore(self.directory)
+        first = reader.get("Pune")
+        self.store.write({}, [coupon("Pune", "Vohuman Cafe"), coupon("Pune", "Goodluck Cafe")])
+        second = reader.get("Pune")
+        self.assertIsNot(first, second)
+        self.assertEqual(len(second.coupons), 2)
+
+    def test_missing_directory(self):
+        reader = CityShardStore(os.path.join(self.directory, "absent"))
+        self.assertEqual(reader.cities(), [])
+        self.assertEqual(list(reader.shards()), [])
+
+
+class TestSummary(ShardTestCase):
+    """The all-cities view reads a bounded summary instead of every shard"""
+
+    def test_best_rated_per_city(self):
+        many = [dict(coupon("Pune", f"Cafe {i}"), rating=3.0 + i / 100) for i in range(SUMMARY_PER_CITY + 5)]
+        self.store.write({}, many)
+        reader = CityShardStore(self.directory)
+        summary = reader.summary()
+        pune = [c for c in summary.coupons if c["city"] == "Pune"]
+        self.assertEqual(len(pune), SUMMARY_PER_CITY)
+        self.assertEqual(pune[0]["source"], f"Cafe {SUMMARY_PER_CITY + 4}")
+        self.assertEqual([c["city"] for c in summary.coupons if c["city"] != "Pune"], ["Delhi", "Mumbai", "Chennai"])
+        self.assertIs(reader.summary(), summary)
+        self.assertEqual(reader.resident(), [])
+
+    def test_ingest_applied_on_load(self):
+        self.store.write({}, [coupon("Pune", "Old Cafe"), dict(coupon("Pune", "Expired Cafe"), expired=True)])
+        reader = CityShardStore(self.directory, ingest=lambda coupons: [c for c in coupons if not c.get("expired")])
+        self.assertEqual([c["source"] for c in reader.get("Pune").coupons], ["Old Cafe"])
+        self.assertNotIn("Expired Cafe", [c["source"] for c in reader.summary().coupons])
+
+
+class TestLocalFromShards(ShardTestCase):
+    """/local?city= serves restaurant coupons from that city's shard only"""
+
+    def test_city_page_loads_one_shard(self):
+        import web_app
+        reader = CityShardStore(self.directory, max_resident=2)
+        other = {"coupon_code": "AMAZON500", "category": "electronics", "city": "all"}
+        with mock.patch.object(web_app, "coupons_cache", [other]), \
+                mock.patch.object(web_app, "restaurant_shards", reader), \
+                mock.patch.object(web_app, "check_and_refresh"):
+            client = web_app.app.test_client()
+            html = client.get("/local?city=Pune").get_data(as_text=True)
+            self.assertEqual(reader.resident(), ["Pune"])
+            closed = client.get("/local?city=Pune&open_at=mon%2003:00").get_data(as_text=True)
+        self.assertIn("Pune Diner", html)
+        self.assertNotIn("Delhi Diner", html)
+        self.assertNotIn("Pune Diner", closed)
+
+    def test_all_cities_page_loads_no_shard(self):
+        import web_app
+        reader = CityShardStore(self.directory, max_resident=2, ingest=web_app.prepare_coupons)
+        other = {"coupon_code": "AMAZON500", "category": "electronics", "city": "all"}
+        with mock.patch.object(web_app, "coupons_cache", [other]), \
+                mock.patch.object(web_app, "restaurant_shards", reader), \
+                mock.patch.object(web_app, "check_and_refresh"):
+            html = web_app.app.test_client().get("/local").get_data(as_text=True)
+        self.assertEqual(reader.resident(), [])
+        for city in CITIES:
+            self.assertIn(f"{city} Diner", html)
+        self.assertEqual(reader.summary().coupons[0]["deal_category"], "food")
+        self.assertIn("top-rated restaurants of each city", html)
+
+    def test_near_me_loads_cities_in_range(self):
+        import web_app
+        chandni_chowk = web_app.gazetteer.coordinates("Delhi", "Chandni Chowk")
+        many = [dict(coupon("Delhi", f"Cafe {i}"), rating=4.0, latitude=chandni_chowk[0], longitude=chandni_chowk[1])
+                for i in range(SUMMARY_PER_CITY + 3)]
+        self.store.write({}, many)
+        reader = CityShardStore(self.directory, max_resident=2)
+        other = {"coupon_code": "AMAZON500", "category": "electronics", "city": "all"}
+        with mock.patch.object(web_app, "coupons_cache", [other]), \
+                mock.patch.object(web_app, "restaurant_shards", reader), \
+                mock.patch.object(web_app, "check_and_refresh"):
+            html = web_app.app.test_client().get(
+                f"/local?user_lat={chandni_chowk[0]}&user_lng={chandni_chowk[1]}").get_data(as_text=True)
+        self.assertEqual(reader.resident(), ["Delhi"])
+        self.assertIn(f"{SUMMARY_PER_CITY + 3} restaurants", html)
+        self.assertNotIn("top-rated restaurants of each city", html)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,120 @@
+"""
+Coupon Store Tests
+Tests keyed upserts, tombstones, the change journal and compaction
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from coupon_store import CouponStore, merge, COMPACT_MIN_LINES
+
+
+def coupon(code, rating=4.0, expires="2026-12-01", origin="restaurant_scraper", **extra):
+    return {"coupon_code": code, "description": f"10% Off at {code}", "rating": rating,
+            "expires": expires, "category": "food", "origin": origin,
+            "timestamp": datetime.now().isoformat(), "product_url": f"https://www.zomato.com/?q={code}",
+            **extra}
+
+
+class CouponStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "coupons.json")
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"timestamp": "", "count": 2, "coupons": [
+                coupon("KEEP1", origin=None),
+                coupon("REST1"),
+            ]}, f)
+        self.store = CouponStore(self.path)
+
+
+class TestUpsert(CouponStoreTestCase):
+    """Coupons are added, updated in place or left alone"""
+
+    def test_add_update_unchanged(self):
+        self.assertEqual(self.store.upsert(coupon("REST2")), "added")
+        self.assertEqual(self.store.upsert(coupon("REST1", product_url="https://www.swiggy.com/")), "unchanged")
+        self.assertEqual(self.store.upsert(coupon("REST1", rating=4.5, expires="2027-01-01")), "updated")
+        self.assertEqual(list(self.store.coupons), ["KEEP1", "REST1", "REST2"])
+        self.assertEqual(self.store.coupons["REST1"]["rating"], 4.5)
+        self.assertEqual(self.store.coupons["REST1"]["expires"], "2027-01-01")
+
+    def test_loads_list_and_dict_files(self):
+        for data in ([coupon("A"), coupon("B")], {"A": coupon("A"), "B": coupon("B")}):
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            self.assertEqual(list(CouponStore(self.path).coupons), ["A", "B"])
+
+
+class TestMerge(CouponStoreTestCase):
+    """Owned coupons that are gone are tombstoned, the rest are kept"""
+
+    def test_summary_and_tombstones(self):
+        summary = merge(self.store, [coupon("REST2"), coupon("REST2", rating=5.0)],
+                        owned={"origin": "restaurant_scraper"})
+        self.assertEqual(summary, {"added": 1, "updated": 0, "unchanged": 0, "removed": 1})
+        self.assertEqual(self.store.coupons["REST2"]["rating"], 4.0)  # first in the batch wins
+        self.assertIn("removed_at", self.store.coupons["REST1"])
+        self.assertEqual([c["coupon_code"] for c in self.store.active()], ["KEEP1", "REST2"])
+
+    def test_removed_coupon_comes_back(self):
+        merge(self.store, [], owned={"origin": "restaurant_scraper"})
+        summary = merge(self.store, [coupon("REST1")], owned={"origin": "restaurant_scraper"})
+        self.assertEqual(summary["updated"], 1)
+        self.assertNotIn("removed_at", self.store.coupons["REST1"])
+
+
+class TestAssignId(CouponStoreTestCase):
+    """Coupons keyed by code can be moved to an id"""
+
+    def test_assign_id_compacts_on_save(self):
+        self.assertTrue(self.store.assign_id("REST1", "r_1"))
+        self.assertFalse(self.store.assign_id("KEEP1", "r_1"))
+        self.assertFalse(self.store.assign_id("MISSING", "r_2"))
+        self.assertEqual(list(self.store.coupons), ["KEEP1", "r_1"])
+        self.store.save()
+        self.assertEqual(list(CouponStore(self.path).coupons), ["KEEP1", "r_1"])
+        self.assertEqual(self.store.upsert(coupon("REST1", id="r_1")), "unchanged")
+
+
+class TestJournal(CouponStoreTestCase):
+    """Only changes are written until the journal is compacted"""
+
+    def test_changes_go_to_journal(self):
+        with open(self.path, 'rb') as f:
+            original = f.read()
+        merge(self.store, [coupon("REST1", rating=4.8), coupon("REST2")], owned={"origin": "restaurant_scraper"})
+        self.assertEqual(self.store.save(), 2)
+        self.assertEqual(self.store.save(), 0)
+
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+        with open(self.store.journal_path) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        reloaded = CouponStore(self.path)
+        self.assertEqual(reloaded.coupons["REST1"]["rating"], 4.8)
+        self.assertEqual(len(reloaded.active()), 3)
+
+    def test_compaction(self):
+        merge(self.store, [coupon(f"NEW{i}") for i in range(COMPACT_MIN_LINES)] + [coupon("REST1")])
+        self.store.save()
+        self.assertFalse(os.path.exists(self.store.journal_path))
+        with open(self.path) as f:
+            data = json.load(f)
+        self.assertEqual(data["count"], COMPACT_MIN_LINES + 2)
+
+    def test_old_tombstones_dropped_on_compaction(self):
+        self.store.remove("REST1")
+        self.store.coupons["REST1"]["removed_at"] = (datetime.now() - timedelta(days=30)).isoformat()
+        self.store.remove("KEEP1")
+        self.store.compact()
+        with open(self.path) as f:
+            codes = [c["coupon_code"] for c in json.load(f)["coupons"]]
+        self.assertEqual(codes, ["KEEP1"])
+        self.assertEqual(CouponStore(self.path).active(), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
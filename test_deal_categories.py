@@ -0,0 +1,67 @@
+"""
+Deal Category Tests
+Tests the rule-based deal classifier
+"""
+
+import os
+import json
+import tempfile
+import unittest
+
+from deal_categories import CategoryClassifier, FALLBACK_RULE, DEFAULT_RULES_FILE
+
+
+class TestCategoryClassifier(unittest.TestCase):
+    """The first matching rule wins, by category or description keyword"""
+
+    def setUp(self):
+        self.classifier = CategoryClassifier.from_file(DEFAULT_RULES_FILE)
+
+    def classify(self, category, description):
+        return self.classifier.classify(category, description)["name"]
+
+    def test_category_match(self):
+        self.assertEqual(self.classify("fashion", "Flat 40% off"), "fashion")
+        self.assertEqual(self.classify("Mobiles", "Extra discount"), "electronics")
+
+    def test_description_keywords(self):
+        self.assertEqual(self.classify("all", "Up to 60% off on Shoes"), "fashion")
+        self.assertEqual(self.classify("", "Kindle eBooks from Rs. 49"), "books")
+        self.assertEqual(self.classify("", "Free delivery on Swiggy orders"), "food")
+
+    def test_earlier_rule_wins(self):
+        # electronics comes before fashion and food in the rules file
+        self.assertEqual(self.classify("fashion", "Phone cases and shirts"), "electronics")
+        self.assertEqual(self.classify("food", "Order on Zomato with your phone"), "electronics")
+
+    def test_keywords_match_word_starts(self):
+        self.assertEqual(self.classify("", "Smart TVs from Rs. 9999"), "electronics")
+        self.assertEqual(self.classify("", "Horseshoe magnets"), "shopping")  # "shoe" inside a word
+
+    def test_default(self):
+        self.assertEqual(self.classify("travel", "Flat Rs. 500 off on flights"), "shopping")
+
+    def test_apply(self):
+        coupon = self.classifier.apply({"category": "beauty", "description": "Lipstick offers"})
+        self.assertEqual(coupon["deal_category"], "beauty")
+        self.assertEqual(coupon["image_icon"], "fa-spa")
+        self.assertTrue(coupon["image_gradient"].startswith("linear-gradient"))
+
+    def test_rules_are_data(self):
+        rules_file = os.path.join(tempfile.mkdtemp(), "rules.json")
+        with open(rules_file, 'w') as f:
+            json.dump({"rules": [{
+                "name": "travel", "categories": ["travel"], "keywords": ["flight", "hotel"],
+                "icon": "fa-plane", "gradient": "linear-gradient(#000, #fff)",
+            }]}, f)
+        classifier = CategoryClassifier.from_file(rules_file)
+        self.assertEqual(classifier.classify("", "Cheap hotels in Goa")["icon"], "fa-plane")
+        self.assertEqual(classifier.classify("fashion", "Shirts"), FALLBACK_RULE)
+
+    def test_missing_rules_file(self):
+        classifier = CategoryClassifier.from_file(os.path.join(tempfile.mkdtemp(), "absent.json"))
+        self.assertEqual(classifier.classify("electronics", "Laptops"), FALLBACK_RULE)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,46 @@
+"""
+Deal Ingest Tests
+Tests that scraped batches get images and alerts before storage
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from price_alerts import SubscriptionStore, AlertEngine
+from deal_ingest import ingest_deals
+
+
+def deal(name, price, image_url=""):
+    return {"product_name": name, "product_url": f"https://example.com/{name.replace(' ', '-')}",
+            "image_url": image_url, "current_price": price, "discount_percent": 30,
+            "category": "electronics", "source": "amazon"}
+
+
+class TestIngestDeals(unittest.TestCase):
+    """Every scraped batch is given images and matched against subscriptions"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        store = SubscriptionStore(os.path.join(directory, "subs.json"))
+        store.add("a@example.com", keywords="jbl", max_price=2000)
+        self.alerts = AlertEngine(store, os.path.join(directory, "outbox.jsonl"))
+
+    def test_images_and_alerts(self):
+        deals = [deal("JBL Flip 6", 1800), deal("Unknown Gadget", 500)]
+        self.assertEqual(ingest_deals(deals, alerts=self.alerts), 1)
+        self.assertTrue(all(d["image_url"] for d in deals))
+
+    def test_sample_deals_never_alert(self):
+        deals = [deal("JBL Flip 6", 1800)]
+        self.assertEqual(ingest_deals(deals, sample=True, alerts=self.alerts), 0)
+        self.assertTrue(deals[0]["image_url"])
+
+    def test_alert_failure_does_not_fail_ingest(self):
+        with mock.patch.object(self.alerts, "process", side_effect=OSError("disk full")):
+            self.assertEqual(ingest_deals([deal("JBL Flip 6", 1800)], alerts=self.alerts), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,79 @@
+"""
+Gazetteer Tests
+Tests locality lookups, city centre fallback and bulk coordinate assignment
+"""
+
+import os
+import tempfile
+import unittest
+
+from gazetteer import Gazetteer, DEFAULT_GAZETTEER_FILE
+from restaurant_scraper import RestaurantScraper, CITIES_CONFIG
+
+
+class TestGazetteer(unittest.TestCase):
+    """Localities resolve to their own centroid, unknown ones to the city centre"""
+
+    def setUp(self):
+        self.gazetteer = Gazetteer({
+            "Delhi": {"centre": [28.6139, 77.2090],
+                      "locations": {"Saket": [28.5245, 77.2066], "Khan Market": [28.6003, 77.2270]}},
+            "Pune": {"locations": {"Baner": [18.5590, 73.7868]}},
+        })
+
+    def test_lookup(self):
+        self.assertEqual(self.gazetteer.coordinates("Delhi", "Saket"), (28.5245, 77.2066))
+        self.assertEqual(self.gazetteer.coordinates(" delhi", "KHAN  market"), (28.6003, 77.2270))
+        self.assertEqual(self.gazetteer.coordinates("Delhi", "Nowhere"), (28.6139, 77.2090))
+        self.assertIsNone(self.gazetteer.coordinates("Pune", "Nowhere"))
+        self.assertIsNone(self.gazetteer.coordinates("Surat", "Adajan"))
+        self.assertEqual(len(self.gazetteer), 4)
+
+    def test_assign(self):
+        restaurants = [
+            {"city": "Delhi", "location": "Saket"},
+            {"city": "Delhi", "location": "Saket"},
+            {"city": "Delhi", "location": "Nowhere"},
+            {"city": "Surat", "location": "Adajan"},
+        ]
+        self.assertEqual(self.gazetteer.assign(restaurants), 2)
+        self.assertEqual([(r["latitude"], r["longitude"]) for r in restaurants], [
+            (28.5245, 77.2066), (28.5245, 77.2066), (28.6139, 77.2090), (None, None),
+        ])
+
+    def test_cities_near(self):
+        self.assertEqual(self.gazetteer.cities_near(28.5245, 77.2066, 5), ["Delhi"])
+        self.assertEqual(self.gazetteer.cities_near(18.5590, 73.7868, 5), ["Pune"])
+        self.assertEqual(self.gazetteer.cities_near(22.0, 75.0, 5), [])
+
+    def test_missing_file(self):
+        self.assertEqual(len(Gazetteer.from_file(os.path.join(tempfile.mkdtemp(), "absent.json"))), 0)
+
+
+class TestGazetteerData(unittest.TestCase):
+    """The shipped gazetteer covers the scraped cities with distinct localities"""
+
+    def test_cities_covered(self):
+        gazetteer = Gazetteer.from_file(DEFAULT_GAZETTEER_FILE)
+        points = []
+        for city, info in CITIES_CONFIG.items():
+            centre = (info["lat"], info["lng"])
+            self.assertEqual(gazetteer.coordinates(city, ""), centre)
+            located = [gazetteer.coordinates(city, loc) for loc in info["locations"]]
+            located = [point for point in located if point != centre]
+            self.assertGreaterEqual(len(located), len(info["locations"]) - 1, city)
+            points.extend(located)
+        self.assertEqual(len(set(points)), len(points))
+
+    def test_enrichment_uses_locality_centroids(self):
+        scraper = RestaurantScraper(use_cache=False)
+        saket, khan_market = scraper.enrich_many([
+            {"id": "Del_Saket_0", "name": "A", "city": "Delhi", "location": "Saket", "cuisines_text": "Cafe"},
+            {"id": "Del_Khan_Market_0", "name": "B", "city": "Delhi", "location": "Khan Market", "cuisines_text": "Cafe"},
+        ])
+        self.assertEqual((saket["latitude"], saket["longitude"]), (28.5245, 77.2066))
+        self.assertNotEqual(saket["latitude"], khan_market["latitude"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,178 @@
+"""
+Image Health Tests
+Tests image URL checks against a local HTTP stub
+"""
+
+import os
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from coupon_store import CouponStore
+from restaurant_cache import RestaurantCache, restaurant_key
+from image_health import ImageHealthChecker, CATEGORY_FALLBACK_IMAGES, OK_TTL, FAILED_TTL, validate_files
+
+
+class StubImageHandler(BaseHTTPRequestHandler):
+    """Serves /ok.jpg, /page.html and /head-blocked.jpg, everything else is a 404"""
+
+    requests_seen = []
+
+    def _respond(self, send_body):
+        self.requests_seen.append((self.command, self.path))
+        if self.path == "/ok.jpg":
+            status, content_type = 200, "image/jpeg"
+        elif self.path == "/page.html":
+            status, content_type = 200, "text/html"
+        elif self.path == "/head-blocked.jpg":
+            status, content_type = (405, "text/plain") if self.command == "HEAD" else (200, "image/jpeg")
+        else:
+            status, content_type = 404, "text/plain"
+        body = b"x" * 16
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def log_message(self, *args):
+        pass
+
+
+class ImageStubTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubImageHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubImageHandler.requests_seen = []
+        self.now = 1_000_000.0
+        self.state_file = os.path.join(tempfile.mkdtemp(), "image_health.json")
+        self.checker = self.make_checker()
+
+    def make_checker(self):
+        return ImageHealthChecker(state_file=self.state_file, max_workers=4, timeout=2, clock=lambda: self.now)
+
+
+class TestImageHealthChecker(ImageStubTestCase):
+    """Probing and result caching"""
+
+    def test_classifies_urls(self):
+        results = self.checker.check_many([
+            f"{self.base}/ok.jpg",
+            f"{self.base}/missing.jpg",
+            f"{self.base}/page.html",
+            f"{self.base}/head-blocked.jpg",
+            "http://127.0.0.1:1/unreachable.jpg",
+        ])
+        self.assertTrue(results[f"{self.base}/ok.jpg"])
+        self.assertFalse(results[f"{self.base}/missing.jpg"])
+        self.assertFalse(results[f"{self.base}/page.html"])
+        self.assertTrue(results[f"{self.base}/head-blocked.jpg"])
+        self.assertFalse(results["http://127.0.0.1:1/unreachable.jpg"])
+
+    def test_duplicates_probed_once(self):
+        url = f"{self.base}/ok.jpg"
+        self.checker.check_many([url, url, url])
+        self.assertEqual(StubImageHandler.requests_seen, [("HEAD", "/ok.jpg")])
+
+    def test_cached_results_respect_ttl(self):
+        ok, missing = f"{self.base}/ok.jpg", f"{self.base}/missing.jpg"
+        self.checker.check_many([ok, missing])
+        self.checker.save()
+
+        checker = self.make_checker()
+        StubImageHandler.requests_seen = []
+        checker.check_many([ok, missing])
+        self.assertEqual(StubImageHandler.requests_seen, [])
+
+        self.now += FAILED_TTL
+        checker.check_many([ok, missing])
+        self.assertEqual(StubImageHandler.requests_seen, [("HEAD", "/missing.jpg")])
+
+        self.now += OK_TTL
+        StubImageHandler.requests_seen = []
+        checker.check_many([ok])
+        self.assertEqual(StubImageHandler.requests_seen, [("HEAD", "/ok.jpg")])
+
+
+class TestValidation(ImageStubTestCase):
+    """Broken images are replaced with category defaults"""
+
+    def test_validate_items(self):
+        items = [
+            {"category": "fashion", "image_url": f"{self.base}/missing.jpg"},
+            {"category": "beauty", "image_url": f"{self.base}/ok.jpg"},
+            {"cuisines": ["Biryani"], "image_url": f"{self.base}/gone.jpg"},
+            {"category": "fashion"},
+        ]
+        self.assertEqual(self.checker.validate(items), 2)
+        self.assertEqual(items[0]["image_url"], CATEGORY_FALLBACK_IMAGES["fashion"])
+        self.assertEqual(items[1]["image_url"], f"{self.base}/ok.jpg")
+        self.assertEqual(items[2]["image_url"], CATEGORY_FALLBACK_IMAGES["food"])
+        self.assertNotIn("image_url", items[3])
+
+    def test_validate_files_rewrites_only_changed_files(self):
+        directory = os.path.dirname(self.state_file)
+        deals_file = os.path.join(directory, "deals.json")
+        cache_file = os.path.join(directory, "restaurant_cache.json")
+        with open(deals_file, 'w') as f:
+            json.dump({"deals": [{"category": "gaming", "image_url": f"{self.base}/missing.jpg"}]}, f)
+        with open(cache_file, 'w') as f:
+            json.dump({"Delhi_1": {"cuisines": ["Chinese"], "image_url": f"{self.base}/ok.jpg"}}, f)
+        cache_mtime = os.path.getmtime(cache_file)
+
+        summary = validate_files([deals_file, cache_file, os.path.join(directory, "absent.json")], self.checker)
+
+        self.assertEqual(summary, {deals_file: 1, cache_file: 0})
+        with open(deals_file) as f:
+            self.assertEqual(json.load(f)["deals"][0]["image_url"], CATEGORY_FALLBACK_IMAGES["gaming"])
+        self.assertEqual(os.path.getmtime(cache_file), cache_mtime)
+        self.assertTrue(os.path.exists(self.state_file))
+
+    def test_validate_files_through_journals(self):
+        directory = tempfile.mkdtemp(dir=os.path.dirname(self.state_file))
+        coupons_file = os.path.join(directory, "coupons.json")
+        cache_file = os.path.join(directory, "restaurant_cache.json")
+        with open(coupons_file, 'w') as f:
+            json.dump({"coupons": [{"coupon_code": "OLD", "category": "beauty", "image_url": f"{self.base}/ok.jpg"}]}, f)
+        # Entries that exist only in the journals
+        store = CouponStore(coupons_file)
+        store.upsert({"coupon_code": "NEW", "category": "fashion", "image_url": f"{self.base}/missing.jpg"})
+        store.save()
+        cache = RestaurantCache(cache_file)
+        key = restaurant_key("Pune", "Baner", "Diner")
+        cache.put(key, {"city": "Pune", "location": "Baner", "name": "Diner",
+                        "cuisines": ["Chinese"], "image_url": f"{self.base}/gone.jpg"})
+        cache.flush()
+        fetched_at = cache.restaurants[key]["fetched_at"]
+
+        summary = validate_files([coupons_file, cache_file], self.checker)
+
+        self.assertEqual(summary, {coupons_file: 1, cache_file: 1})
+        coupons = {c["coupon_code"]: c for c in CouponStore(coupons_file).active()}
+        self.assertEqual(coupons["NEW"]["image_url"], CATEGORY_FALLBACK_IMAGES["fashion"])
+        self.assertEqual(coupons["OLD"]["image_url"], f"{self.base}/ok.jpg")
+        restaurant = RestaurantCache(cache_file).restaurants[key]
+        self.assertEqual(restaurant["image_url"], CATEGORY_FALLBACK_IMAGES["food"])
+        self.assertEqual(restaurant["fetched_at"], fetched_at)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
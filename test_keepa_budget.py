@@ -0,0 +1,77 @@
+"""
+Keepa Budget Tests
+Tests token refill estimates, waiting and lookup ordering
+"""
+
+import unittest
+
+from keepa_budget import TokenBudget, LookupQueue
+
+
+class FakeClock:
+    """Clock advanced by the fake sleep"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBudget(unittest.TestCase):
+    """Budget should follow the API's token reports and refill rate"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.budget = TokenBudget(clock=self.clock, sleep=self.clock.sleep)
+
+    def test_unknown_budget_allows_requests(self):
+        self.assertTrue(self.budget.acquire(100))
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_refill_over_time(self):
+        self.budget.update({"tokensLeft": 5, "refillRate": 20})
+        self.assertEqual(self.budget.available(), 5)
+        self.clock.now = 30
+        self.assertEqual(self.budget.available(), 15)
+        # Capped at an hour of refills
+        self.clock.now = 10 * 3600
+        self.assertEqual(self.budget.available(), 20 * 60)
+
+    def test_acquire_waits_for_refill(self):
+        self.budget.update({"tokensLeft": 0, "refillRate": 20})
+        self.assertTrue(self.budget.acquire(10))
+        self.assertEqual(self.clock.sleeps, [30.0])
+        self.assertEqual(self.budget.available(), 0)
+
+    def test_acquire_gives_up_past_max_wait(self):
+        self.budget.update({"tokensLeft": 0, "refillRate": 1})
+        self.assertFalse(self.budget.acquire(10, max_wait=60))
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_no_refill_rate_never_waits(self):
+        self.budget.update({"tokensLeft": 0})
+        self.assertFalse(self.budget.acquire(1))
+
+
+class TestLookupQueue(unittest.TestCase):
+    """Queue should pop highest priority first, stable among equals"""
+
+    def test_priority_order(self):
+        queue = LookupQueue()
+        queue.push("low", 5)
+        queue.push("high", 60)
+        queue.push("new-a", 100)
+        queue.push("new-b", 100)
+        self.assertEqual(queue.pop_batch(3), ["new-a", "new-b", "high"])
+        self.assertEqual(len(queue), 1)
+        self.assertEqual(queue.pop_batch(10), ["low"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
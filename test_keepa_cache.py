@@ -0,0 +1,97 @@
+"""
+Keepa Cache Tests
+Tests volatility-based TTLs, negative entries and cached search results
+"""
+
+import os
+import tempfile
+import unittest
+
+from keepa_cache import (KeepaCache, ttl_for, MIN_TTL, MAX_TTL, SEARCH_TTL, MAX_FIELDS_AGE,
+                         UNAVAILABLE_TTL, FAILED_LOOKUP_TTL)
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestKeepaCache(unittest.TestCase):
+    """Stable prices should be cached longer than volatile ones"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.state_file = os.path.join(tempfile.mkdtemp(), "keepa.json")
+        self.cache = KeepaCache(self.state_file, clock=self.clock)
+
+    def fields(self, price):
+        return {"title": "Phone", "image": "", "current_price": price, "original_price": 200.0}
+
+    def test_ttl_bounds(self):
+        self.assertEqual(ttl_for(0.0), MAX_TTL)
+        self.assertEqual(ttl_for(0.5), MIN_TTL)
+
+    def test_new_product_expires_after_min_ttl(self):
+        self.cache.store_product("B0TEST0001", self.fields(100.0))
+        self.assertEqual(self.cache.stale(["B0TEST0001", "B0TEST0002"]), ["B0TEST0002"])
+        self.clock.now += MIN_TTL
+        self.assertEqual(self.cache.stale(["B0TEST0001"]), ["B0TEST0001"])
+        # Expired entries are still readable
+        self.assertEqual(self.cache.get("B0TEST0001")["current_price"], 100.0)
+
+    def test_stable_price_extends_ttl(self):
+        self.cache.store_product("B0STABLE01", self.fields(100.0))
+        self.cache.store_product("B0VOLATILE", self.fields(100.0))
+        for _ in range(3):
+            self.cache.store_product("B0STABLE01", self.fields(100.0))
+            self.cache.store_product("B0VOLATILE", self.fields(150.0))
+            self.cache.store_product("B0VOLATILE", self.fields(100.0))
+
+        self.assertGreater(self.cache.products["B0STABLE01"]["ttl"], 20 * 3600)
+        self.assertEqual(self.cache.products["B0VOLATILE"]["ttl"], MIN_TTL)
+
+    def test_unavailable_product_not_served(self):
+        self.cache.store_product("B0TEST0001", self.fields(100.0))
+        self.cache.store_unavailable("B0TEST0001")
+        self.assertIsNone(self.cache.get("B0TEST0001"))
+        self.assertEqual(self.cache.stale(["B0TEST0001"]), [])
+        self.clock.now += UNAVAILABLE_TTL
+        self.assertEqual(self.cache.stale(["B0TEST0001"]), ["B0TEST0001"])
+        # Back in stock
+        self.cache.store_product("B0TEST0001", self.fields(90.0))
+        self.assertEqual(self.cache.get("B0TEST0001")["current_price"], 90.0)
+
+    def test_failed_lookup_retried_sooner(self):
+        self.cache.store_unavailable("B0TEST0001", ttl=FAILED_LOOKUP_TTL)
+        self.clock.now += FAILED_LOOKUP_TTL
+        self.assertEqual(self.cache.stale(["B0TEST0001"]), ["B0TEST0001"])
+        self.assertIsNone(self.cache.get("B0TEST0001"))
+
+    def test_fields_past_max_age_not_served(self):
+        self.cache.store_product("B0TEST0001", self.fields(100.0))
+        self.clock.now += MAX_FIELDS_AGE - 1
+        self.assertIsNotNone(self.cache.get("B0TEST0001"))
+        self.clock.now += 1
+        self.assertIsNone(self.cache.get("B0TEST0001"))
+
+    def test_search_results_expire(self):
+        self.assertIsNone(self.cache.search_asins("deals"))
+        self.cache.store_search("deals", ["B0TEST0001"])
+        self.assertEqual(self.cache.search_asins("deals"), ["B0TEST0001"])
+        self.clock.now += SEARCH_TTL
+        self.assertIsNone(self.cache.search_asins("deals"))
+
+    def test_save_and_reload(self):
+        self.cache.store_product("B0TEST0001", self.fields(100.0))
+        self.cache.save()
+        reloaded = KeepaCache(self.state_file, clock=self.clock)
+        self.assertTrue(reloaded.is_fresh("B0TEST0001"))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,111 @@
+"""
+Opening Hours Tests
+Tests hour parsing, the per-snapshot interval index and the /local open filters
+"""
+
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from opening_hours import (OpeningHoursIndex, parse_hours, parse_open_at, minute_of_week,
+                           LOCAL_TZ, MINUTES_PER_DAY, MINUTES_PER_WEEK)
+
+DAY = MINUTES_PER_DAY
+CAFE = {'monday_friday': '09:00-23:00', 'saturday_sunday': '09:00-24:00',
+        'notes': 'Lunch 11:00-15:00, Dinner 19:00-23:00'}
+BAR = {'daily': '18:00-02:00'}
+
+
+class TestParseHours(unittest.TestCase):
+    """Hour strings become merged minute-of-week intervals"""
+
+    def test_weekdays_and_weekend(self):
+        intervals = parse_hours(CAFE)
+        self.assertEqual(intervals[0], [9 * 60, 23 * 60])
+        self.assertEqual(intervals[4], [4 * DAY + 9 * 60, 4 * DAY + 23 * 60])
+        self.assertEqual(intervals[5], [5 * DAY + 9 * 60, 6 * DAY])
+        self.assertEqual(len(intervals), 7)
+
+    def test_past_midnight(self):
+        intervals = parse_hours(BAR)
+        self.assertEqual(intervals[0], [0, 2 * 60])  # Sunday night runs into Monday
+        self.assertEqual(intervals[1], [18 * 60, DAY + 2 * 60])
+        self.assertEqual(intervals[-1], [6 * DAY + 18 * 60, MINUTES_PER_WEEK])
+
+    def test_split_and_invalid_ranges(self):
+        self.assertEqual(parse_hours({'monday': '12:00-15:00, 19:00-23:00'}), [[720, 900], [1140, 1380]])
+        self.assertEqual(parse_hours({'monday': 'closed', 'notes': '10:00-11:00', 'friday': '25:00-26:00'}), [])
+        self.assertEqual(parse_hours({}), [])
+
+    def test_open_at(self):
+        monday = datetime(2026, 10, 19, 8, 0, tzinfo=LOCAL_TZ)
+        self.assertEqual(parse_open_at("21:30", now=monday), 21 * 60 + 30)
+        self.assertEqual(parse_open_at("Sat 21:30"), 5 * DAY + 21 * 60 + 30)
+        self.assertEqual(parse_open_at("saturday 09:05"), 5 * DAY + 9 * 60 + 5)
+        self.assertIsNone(parse_open_at("xyz 21:30"))
+        self.assertIsNone(parse_open_at("25:00"))
+        self.assertIsNone(parse_open_at("tonight"))
+        self.assertEqual(minute_of_week(monday), 8 * 60)
+
+
+class TestOpeningHoursIndex(unittest.TestCase):
+    """Coupons are matched through their shared schedule"""
+
+    def setUp(self):
+        self.cafe = {'coupon_code': 'CAFE', 'opening_hours': CAFE}
+        self.cafe2 = {'coupon_code': 'CAFE2', 'opening_hours': dict(CAFE)}
+        self.bar = {'coupon_code': 'BAR', 'open_intervals': parse_hours(BAR)}
+        self.unknown = {'coupon_code': 'UNKNOWN'}
+        self.coupons = [self.cafe, self.cafe2, self.bar, self.unknown]
+        self.index = OpeningHoursIndex(self.coupons)
+
+    def codes(self, minute):
+        return [c['coupon_code'] for c in self.index.open_at(self.coupons, minute)]
+
+    def test_open_at(self):
+        # Coupons without hours are never filtered out
+        self.assertEqual(self.codes(10 * 60), ['CAFE', 'CAFE2', 'UNKNOWN'])
+        self.assertEqual(self.codes(22 * 60), ['CAFE', 'CAFE2', 'BAR', 'UNKNOWN'])
+        self.assertEqual(self.codes(23 * 60), ['BAR', 'UNKNOWN'])
+        self.assertEqual(self.codes(DAY + 60), ['BAR', 'UNKNOWN'])
+        self.assertEqual(self.codes(5 * 60), ['UNKNOWN'])
+        self.assertEqual(self.codes(0), ['BAR', 'UNKNOWN'])
+
+    def test_schedules_shared(self):
+        self.assertEqual(len(self.index._starts), 2)
+        self.assertTrue(self.index.covers(self.coupons))
+        self.assertFalse(self.index.covers(list(self.coupons)))
+
+    def test_open_now(self):
+        saturday_night = datetime(2026, 10, 24, 23, 30, tzinfo=LOCAL_TZ)
+        open_coupons = self.index.open_now(self.coupons, now=saturday_night)
+        self.assertEqual([c['coupon_code'] for c in open_coupons], ['CAFE', 'CAFE2', 'BAR', 'UNKNOWN'])
+
+
+class TestLocalOpenFilter(unittest.TestCase):
+    """/local?open_at= keeps only restaurants open at that time"""
+
+    def test_open_at_param(self):
+        import web_app
+        coupons = [
+            {"coupon_code": "LATEBAR", "category": "food", "city": "Delhi", "rating": 4.2,
+             "source": "Late Bar", "description": "Late night bar deal", "open_intervals": parse_hours(BAR)},
+            {"coupon_code": "DAYCAFE", "category": "food", "city": "Delhi", "rating": 4.2,
+             "source": "Day Cafe", "description": "Morning cafe deal", "opening_hours": CAFE},
+            {"coupon_code": "SWIGGY100", "category": "food", "city": "Delhi", "rating": 4.2,
+             "source": "Swiggy", "description": "Flat 100 off on Swiggy"},
+        ]
+        with mock.patch.object(web_app, "coupons_cache", coupons), \
+                mock.patch.object(web_app, "check_and_refresh"):
+            client = web_app.app.test_client()
+            late = client.get("/local?open_at=mon%2001:00").get_data(as_text=True)
+            anytime = client.get("/local?open_at=bogus").get_data(as_text=True)
+        self.assertIn("Late Bar", late)
+        self.assertNotIn("Day Cafe", late)
+        self.assertIn("SWIGGY100", late)  # platform promo without hours
+        self.assertIn("Day Cafe", anytime)
+        self.assertTrue(web_app.opening_index.covers(coupons))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
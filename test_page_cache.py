@@ -0,0 +1,66 @@
+"""
+Page Cache Tests
+Tests volatile-token normalization and cached result reuse
+"""
+
+import os
+import tempfile
+import unittest
+
+from page_cache import PageCache, content_hash
+
+PAGE = b"""
+<html><head><script>var t = 1718000000123;</script></head>
+<body data-request-id="%s">
+<input type="hidden" name="csrf" value="%s">
+<a href="/dp/B0CHX2W5BY?ref_=%s">Phone</a><span>%s</span>
+</body></html>
+"""
+
+
+class TestContentHash(unittest.TestCase):
+    """Hash should ignore tokens that change on every request"""
+
+    def test_volatile_tokens_ignored(self):
+        first = PAGE % (b"abc", b"tok1", b"deal_1", b"49,999")
+        second = PAGE.replace(b"1718000000123", b"1718000099999") % (b"xyz", b"tok2", b"deal_2", b"49,999")
+        self.assertEqual(content_hash(first), content_hash(second))
+
+    def test_content_change_detected(self):
+        first = PAGE % (b"abc", b"tok", b"deal", b"49,999")
+        second = PAGE % (b"abc", b"tok", b"deal", b"44,999")
+        self.assertNotEqual(content_hash(first), content_hash(second))
+
+
+class TestPageCache(unittest.TestCase):
+    """Cached fields are returned only for a matching hash"""
+
+    def setUp(self):
+        self.state_file = os.path.join(tempfile.mkdtemp(), "pages.json")
+        self.cache = PageCache("amazon", state_file=self.state_file)
+        self.fields = [{"product_name": "Phone", "timestamp": "2024-01-01T00:00:00"}]
+
+    def test_lookup_hit_and_miss(self):
+        self.assertIsNone(self.cache.lookup("electronics", "https://a", "h1"))
+        self.cache.store("electronics", "https://a", "h1", self.fields)
+
+        reused = self.cache.lookup("electronics", "https://a", "h1")
+        self.assertEqual(reused[0]["product_name"], "Phone")
+        self.assertNotEqual(reused[0]["timestamp"], "2024-01-01T00:00:00")
+        self.assertIsNone(self.cache.lookup("electronics", "https://a", "h2"))
+        self.assertIsNone(self.cache.lookup("fashion", "https://a", "h1"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+
+    def test_save_keeps_other_sources(self):
+        other = PageCache("flipkart", state_file=self.state_file)
+        other.store("electronics", "https://f", "h", [])
+        other.save()
+        self.cache.store("electronics", "https://a", "h1", self.fields)
+        self.cache.save()
+
+        self.assertIsNotNone(PageCache("amazon", state_file=self.state_file).lookup("electronics", "https://a", "h1"))
+        self.assertEqual(PageCache("flipkart", state_file=self.state_file).lookup("electronics", "https://f", "h"), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -11,6 +11,8 @@ Tests the "Near Me" geolocation feature including:
 import json
 import math
 import unittest
+from unittest import mock
+import web_app
 from web_app import app, calculate_distance, filter_by_distance, load_coupons
 
 class TestGeolocation(unittest.TestCase):
@@ -90,6 +92,22 @@ class TestGeolocation(unittest.TestCase):
         else:
             print(f"[SKIP] Only {len(filtered)} result(s) - skipping sort check")
 
+    def test_filter_by_distance_one_calculation_per_point(self):
+        """Restaurants sharing a locality centroid share one distance calculation"""
+        restaurants = [
+            {'source': f'Saket {i}', 'latitude': 28.5245, 'longitude': 77.2066} for i in range(5)
+        ] + [
+            {'source': f'Khan Market {i}', 'latitude': 28.6003, 'longitude': 77.2270} for i in range(3)
+        ] + [{'source': 'Nowhere', 'latitude': None, 'longitude': None}]
+
+        with mock.patch.object(web_app, 'calculate_distance', wraps=calculate_distance) as distance:
+            filtered = filter_by_distance(restaurants, 28.6328, 77.2197, max_distance_km=50.0)
+
+        self.assertEqual(distance.call_count, 2)
+        self.assertEqual([r['source'] for r in filtered][:3], ['Khan Market 0', 'Khan Market 1', 'Khan Market 2'])
+        self.assertEqual(len(filtered), 8)
+        self.assertEqual(filtered[-1]['distance_km'], calculate_distance(28.6328, 77.2197, 28.5245, 77.2066))
+
     def test_local_route_without_geolocation(self):
         """Test /local route without geolocation parameters"""
         response = self.client.get('/local')
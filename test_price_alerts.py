@@ -0,0 +1,144 @@
+"""
+Price Alert Tests
+Tests subscription matching, alert dedup and the alert API
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from price_alerts import SubscriptionStore, AlertMatcher, AlertEngine
+
+
+def deal(name, price, discount, category="electronics", url=None):
+    return {
+        "product_name": name,
+        "product_url": url or f"https://example.com/{name.replace(' ', '-')}",
+        "current_price": price,
+        "discount_percent": discount,
+        "category": category,
+        "source": "amazon",
+    }
+
+
+class TestAlertMatcher(unittest.TestCase):
+    """Every criterion of a subscription must hold"""
+
+    def setUp(self):
+        self.store = SubscriptionStore(os.path.join(tempfile.mkdtemp(), "subs.json"))
+        self.jbl = self.store.add("a@example.com", keywords="JBL headphones", max_price=1500)
+        self.electronics = self.store.add("b@example.com", category="Electronics", min_discount=40)
+        self.any_big = self.store.add("c@example.com", min_discount=70)
+        self.boat = self.store.add("d@example.com", keywords="boat")
+        self.matcher = AlertMatcher(self.store.subscriptions.values())
+
+    def matched(self, d):
+        return {sub.id for sub in self.matcher.match(d)}
+
+    def test_keywords_and_price_cap(self):
+        self.assertEqual(self.matched(deal("JBL Tune 510BT Wireless Headphones", 1299, 10)), {self.jbl.id})
+        # Over the cap
+        self.assertEqual(self.matched(deal("JBL Tune 510BT Wireless Headphones", 1999, 10)), set())
+        # Only one of the keywords
+        self.assertEqual(self.matched(deal("JBL Flip 6 Speaker", 999, 10)), set())
+
+    def test_category_and_discount_thresholds(self):
+        self.assertEqual(self.matched(deal("Sony TV", 40000, 45)), {self.electronics.id})
+        self.assertEqual(self.matched(deal("Sony TV", 40000, 75)), {self.electronics.id, self.any_big.id})
+        self.assertEqual(self.matched(deal("Shirt", 400, 75, category="fashion")), {self.any_big.id})
+
+    def test_deal_without_price_never_matches(self):
+        self.assertEqual(self.matched(deal("JBL Tune 510BT Wireless Headphones", 0, 10)), set())
+        self.assertEqual(self.matched(deal("Sony TV", None, 75)), set())
+
+    def test_uncapped_keyword_subscription(self):
+        self.assertEqual(self.matched(deal("boAt Rockerz 550", 99999, 0)), {self.boat.id})
+
+    def test_subscription_needs_criteria(self):
+        with self.assertRaises(ValueError):
+            self.store.add("a@example.com")
+
+
+class TestAlertEngine(unittest.TestCase):
+    """Alerts go to the outbox once per price drop"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.store = SubscriptionStore(os.path.join(directory, "subs.json"))
+        self.store.add("a@example.com", keywords="jbl", max_price=2000)
+        self.outbox = os.path.join(directory, "outbox.jsonl")
+        self.engine = AlertEngine(self.store, self.outbox)
+
+    def read_outbox(self):
+        with open(self.outbox, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_alert_once_then_on_lower_price(self):
+        self.assertEqual(self.engine.process([deal("JBL Flip 6", 1800, 20, url="u")]), 1)
+        self.assertEqual(self.engine.process([deal("JBL Flip 6", 1800, 20, url="u")]), 0)
+        self.assertEqual(self.engine.process([deal("JBL Flip 6", 1600, 25, url="u")]), 1)
+        messages = self.read_outbox()
+        self.assertEqual([m["current_price"] for m in messages], [1800, 1600])
+        self.assertEqual(messages[0]["contact"], "a@example.com")
+
+    def test_new_subscriptions_rebuild_indexes(self):
+        self.engine.process([deal("Nike Shoes", 999, 50, category="fashion")])
+        self.store.add("b@example.com", keywords="nike")
+        self.assertEqual(self.engine.process([deal("Nike Shoes", 999, 50, category="fashion")]), 1)
+
+
+class TestSharedSubscriptionFile(unittest.TestCase):
+    """Stores sharing a file merge their changes instead of overwriting each other"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.state_file = os.path.join(directory, "subs.json")
+        self.outbox = os.path.join(directory, "outbox.jsonl")
+
+    def test_concurrent_adds_both_kept(self):
+        first, second = SubscriptionStore(self.state_file), SubscriptionStore(self.state_file)
+        a = first.add("a@example.com", keywords="jbl")
+        b = second.add("b@example.com", keywords="nike")
+        first.save()
+        second.save()
+        self.assertEqual(set(SubscriptionStore(self.state_file).subscriptions), {a.id, b.id})
+        self.assertFalse(os.path.exists(f"{self.state_file}.lock"))
+
+    def test_engine_keeps_subscriptions_made_after_start(self):
+        engine = AlertEngine(SubscriptionStore(self.state_file), self.outbox)
+        web = SubscriptionStore(self.state_file)
+        nike = web.add("b@example.com", keywords="nike")
+        web.save()
+        self.assertEqual(engine.process([deal("Nike Shoes", 999, 50, category="fashion")]), 1)
+        web = SubscriptionStore(self.state_file)
+        self.assertIn(nike.id, web.subscriptions)
+        self.assertIn(nike.id, web.notified)
+        web.remove(nike.id)
+        web.save()
+        self.assertEqual(engine.process([deal("Nike Shoes", 899, 55, category="fashion")]), 0)
+        self.assertEqual(SubscriptionStore(self.state_file).subscriptions, {})
+
+
+class TestAlertRoutes(unittest.TestCase):
+    """Subscriptions can be created and removed over the API"""
+
+    def test_create_and_delete(self):
+        import web_app
+
+        state_file = os.path.join(tempfile.mkdtemp(), "subs.json")
+        with mock.patch.object(web_app, "ALERT_SUBSCRIPTIONS_FILE", state_file):
+            client = web_app.app.test_client()
+            response = client.post("/api/alerts", json={"contact": "a@example.com", "keywords": "jbl", "max_price": "1500"})
+            self.assertEqual(response.status_code, 201)
+            sub_id = response.get_json()["subscription_id"]
+            self.assertEqual(SubscriptionStore(state_file).subscriptions[sub_id].max_price, 1500.0)
+
+            self.assertEqual(client.post("/api/alerts", json={"contact": "a@example.com"}).status_code, 400)
+            self.assertEqual(client.delete(f"/api/alerts/{sub_id}").status_code, 200)
+            self.assertEqual(client.delete(f"/api/alerts/{sub_id}").status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
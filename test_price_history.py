@@ -0,0 +1,98 @@
+"""
+Price History Tests
+Tests Keepa history decoding and the delta-encoded per-ASIN store
+"""
+
+import os
+import tempfile
+import unittest
+
+from price_history import PriceHistoryStore, decode_history, keepa_minutes, CSV_AMAZON, CSV_NEW
+
+NOW = 1_700_000_000
+DAY = 86400
+
+
+def series(*points):
+    """Keepa csv series from (unix seconds, price) points"""
+    flat = []
+    for when, price in points:
+        flat.extend((keepa_minutes(when), price))
+    return flat
+
+
+class TestDecodeHistory(unittest.TestCase):
+    """Keepa series should split into time and price columns"""
+
+    def test_decode_pairs(self):
+        times, prices = decode_history([100, 4999, 160, -1, 220, 4599, 999])
+        self.assertEqual(list(times), [100, 160, 220])
+        self.assertEqual(list(prices), [4999, -1, 4599])
+
+    def test_decode_empty(self):
+        times, prices = decode_history([])
+        self.assertEqual(len(times), 0)
+        self.assertEqual(len(prices), 0)
+
+
+class TestPriceHistoryStore(unittest.TestCase):
+    """Store should round-trip history and answer window queries"""
+
+    def setUp(self):
+        self.store = PriceHistoryStore(tempfile.mkdtemp(), clock=lambda: NOW)
+        self.store.write("B0TEST0001", *decode_history(series(
+            (NOW - 120 * DAY, 99900),   # before the 90-day window
+            (NOW - 100 * DAY, 149900),  # in effect when the window starts
+            (NOW - 30 * DAY, -1),       # out of stock
+            (NOW - 20 * DAY, 129900),
+            (NOW - 2 * DAY, 139900),
+            (NOW - 3600, 119900),
+        )))
+
+    def test_round_trip(self):
+        times, prices = self.store.history("B0TEST0001")
+        self.assertEqual(len(times), 6)
+        self.assertEqual(list(prices)[-1], 119900)
+        self.assertEqual(self.store.current_price("B0TEST0001"), 1199.0)
+
+    def test_append_only_adds_newer_points(self):
+        path = os.path.join(self.store.directory, "B0TEST0001.bin")
+        size = os.path.getsize(path)
+        added = self.store.write("B0TEST0001", *decode_history(series(
+            (NOW - 2 * DAY, 139900), (NOW - 3600, 119900), (NOW - 60, 109900)
+        )))
+        self.assertEqual(added, 1)
+        # One int32 (time, price) delta pair per point
+        self.assertEqual(os.path.getsize(path), size + 8)
+        self.assertEqual(self.store.current_price("B0TEST0001"), 1099.0)
+
+    def test_lowest_in_window(self):
+        self.assertEqual(self.store.lowest_in("B0TEST0001", days=90), 1199.0)
+        self.assertEqual(self.store.lowest_in("B0TEST0001", days=365), 999.0)
+        self.assertIsNone(self.store.lowest_in("B0UNKNOWN1"))
+
+    def test_dropped_since_yesterday(self):
+        self.assertEqual(self.store.price_at("B0TEST0001", NOW - DAY), 1399.0)
+        self.assertIsNone(self.store.price_at("B0TEST0001", NOW - 25 * DAY))
+        self.assertTrue(self.store.dropped_since("B0TEST0001", hours=24))
+        self.assertFalse(self.store.dropped_since("B0UNKNOWN1", hours=24))
+
+    def test_rejects_invalid_asin(self):
+        with self.assertRaises(ValueError):
+            self.store.history("../etc/passwd")
+
+    def test_series_kept_in_separate_segments(self):
+        # Marketplace points interleaved with the Amazon ones must not be dropped or mixed in
+        added = self.store.write("B0TEST0001", *decode_history(series(
+            (NOW - 3 * DAY, 89900), (NOW - 1800, 94900)
+        )), series=CSV_NEW)
+        self.assertEqual(added, 2)
+        self.assertEqual(self.store.current_price("B0TEST0001", series=CSV_NEW), 949.0)
+        self.assertEqual(self.store.lowest_in("B0TEST0001", days=90, series=CSV_NEW), 899.0)
+        self.assertEqual(self.store.current_price("B0TEST0001", series=CSV_AMAZON), 1199.0)
+        self.assertEqual(self.store.lowest_in("B0TEST0001", days=90), 1199.0)
+        self.assertEqual(sorted(os.listdir(self.store.directory)), ["B0TEST0001.1.bin", "B0TEST0001.bin"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
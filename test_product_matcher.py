@@ -0,0 +1,88 @@
+"""
+Product Matcher Tests
+Tests near-duplicate grouping of product titles and best-price collapsing
+"""
+
+import unittest
+from unittest import mock
+
+from product_matcher import group_titles, assign_product_ids, collapse_duplicates
+
+
+class TestGroupTitles(unittest.TestCase):
+    """Near-duplicate titles share a group, different models do not"""
+
+    def assertSameProduct(self, a, b):
+        groups = group_titles([a, b])
+        self.assertEqual(groups[0], groups[1], f"{a!r} vs {b!r}")
+
+    def assertDifferentProduct(self, a, b):
+        groups = group_titles([a, b])
+        self.assertNotEqual(groups[0], groups[1], f"{a!r} vs {b!r}")
+
+    def test_title_variations_match(self):
+        self.assertSameProduct("boAt Rockerz 550 Bluetooth", "BOAT Rockerz-550 bluetooth headphone")
+        self.assertSameProduct("boAt Rockerz 550 Bluetooth", "boAt Rockerz 550 Bluetooth Wireless Headphones")
+        self.assertSameProduct("Apple iPhone 15 Pro Max (256GB) - Natural Titanium",
+                               "Apple iPhone 15 Pro Max 256 GB Natural Titanium")
+
+    def test_different_models_do_not_match(self):
+        self.assertDifferentProduct("boAt Rockerz 550 Bluetooth", "boAt Rockerz 450 Bluetooth")
+        self.assertDifferentProduct("Apple iPhone 15", "Apple iPhone 15 Pro Max")
+        self.assertDifferentProduct("Nike Running Shoes", "Puma Running Shoes")
+
+    def test_product_ids_are_stable(self):
+        first = [{"product_name": "boAt Rockerz 550 Bluetooth"}, {"product_name": "JBL Flip 6"}]
+        second = [{"product_name": "JBL Flip 6"}, {"product_name": "boAt Rockerz 550 Bluetooth"}]
+        assign_product_ids(first)
+        assign_product_ids(second)
+        self.assertEqual(first[0]["product_id"], second[1]["product_id"])
+        self.assertNotEqual(first[0]["product_id"], first[1]["product_id"])
+
+
+class TestCollapseDuplicates(unittest.TestCase):
+    """One entry per product at its best price"""
+
+    def test_keeps_lowest_price_in_first_position(self):
+        deals = [
+            {"product_name": "boAt Rockerz 550 Bluetooth", "current_price": 1499.0, "source": "amazon"},
+            {"description": "Flat Rs. 500 Off", "source": "Amazon"},
+            {"product_name": "boAt Rockerz 550 Bluetooth Headphones", "current_price": 1299.0, "source": "flipkart"},
+            {"product_name": "JBL Flip 6 Bluetooth Speaker", "current_price": 7999.0, "source": "amazon"},
+        ]
+        collapsed = collapse_duplicates(deals)
+        self.assertEqual(len(collapsed), 3)
+        self.assertEqual(collapsed[0]["source"], "flipkart")
+        self.assertEqual(collapsed[0]["offer_count"], 2)
+        self.assertEqual(collapsed[0]["other_sources"], ["amazon"])
+        # Coupons without a product title pass through
+        self.assertEqual(collapsed[1]["description"], "Flat Rs. 500 Off")
+
+    def test_input_items_not_modified(self):
+        deals = [
+            {"product_name": "JBL Flip 6 Bluetooth Speaker", "current_price": 7999.0, "source": "amazon"},
+            {"product_name": "JBL Flip 6 Bluetooth Speaker", "current_price": 7499.0, "source": "flipkart"},
+        ]
+        snapshot = [dict(d) for d in deals]
+        collapsed = collapse_duplicates(deals)
+        self.assertEqual(deals, snapshot)
+        self.assertEqual(collapsed[0]["offer_count"], 2)
+        self.assertIsNot(collapsed[0], deals[1])
+
+    def test_search_route_collapses_results(self):
+        import web_app
+
+        amazon = [{"title": "boAt Rockerz 550 Bluetooth", "price_numeric": 1499, "source": "Amazon"}]
+        flipkart = [{"title": "boAt Rockerz 550 Bluetooth Headphone", "price_numeric": 1399, "source": "Flipkart"}]
+        with mock.patch.object(web_app, "search_amazon_products", return_value=amazon), \
+                mock.patch.object(web_app, "search_flipkart_products", return_value=flipkart):
+            response = web_app.app.test_client().get("/api/search-products?q=rockerz")
+
+        products = response.get_json()["products"]
+        self.assertEqual(len(products), 1)
+        self.assertEqual(products[0]["source"], "Flipkart")
+        self.assertEqual(products[0]["other_sources"], ["Amazon"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
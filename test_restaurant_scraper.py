@@ -0,0 +1,396 @@
+"""
+Restaurant Scraper Tests
+Tests batch enrichment, the parallel city pipeline, checkpoints, the incremental cache and per-host rate limiting
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from restaurant_scraper import RestaurantScraper, HostRateLimiter, CITIES_CONFIG
+from restaurant_cache import RestaurantCache, PipelineCheckpoint, restaurant_key
+from coupon_store import CouponStore
+from city_shards import CityShardStore
+
+# Fields that are random or time-dependent in every run
+VOLATILE_FIELDS = {'phone', 'timestamp', 'product_url', 'expires', 'fetched_at'}
+
+
+def stable(record):
+    return {key: value for key, value in record.items() if key not in VOLATILE_FIELDS}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+
+class TestHostRateLimiter(unittest.TestCase):
+    """Requests to one host are spaced out, other hosts are independent"""
+
+    def test_spacing_per_host(self):
+        clock = FakeClock()
+        limiter = HostRateLimiter(0.5, clock=clock, sleep=clock.sleep)
+        self.assertEqual(limiter.wait("https://www.zomato.com/a"), 0)
+        self.assertEqual(limiter.wait("https://www.zomato.com/b"), 0.5)
+        self.assertEqual(limiter.wait("https://www.zomato.com/c"), 1.0)
+        self.assertEqual(limiter.wait("https://www.swiggy.com/a"), 0)
+        self.assertEqual(clock.sleeps, [0.5, 1.0])
+
+    def test_slot_frees_up_over_time(self):
+        clock = FakeClock()
+        limiter = HostRateLimiter(0.5, clock=clock, sleep=clock.sleep)
+        limiter.wait("https://www.zomato.com/a")
+        clock.now = 2.0
+        self.assertEqual(limiter.wait("https://www.zomato.com/b"), 0)
+
+
+def restaurant(idx, cuisines_text, rating=4.0, name=None, location="Saket"):
+    return {
+        'id': f"Del_{location.replace(' ', '_')}_{idx}",
+        'name': name or f"Restaurant {idx}",
+        'location': location,
+        'city': 'Delhi',
+        'rating': rating,
+        'cuisines_text': cuisines_text,
+        'url': None,
+        'image_url': None,
+    }
+
+
+class TestEnrichMany(unittest.TestCase):
+    """Batch enrichment matches single enrichment and shares nested objects"""
+
+    def setUp(self):
+        self.scraper = RestaurantScraper(use_cache=False)
+
+    def test_matches_per_restaurant_enrichment(self):
+        batch = [
+            restaurant(0, "North Indian, Continental, Chinese", 4.6),
+            restaurant(1, "Cafe, Bakery", 3.2, name="Street Bakes"),
+            restaurant(2, "Fast Food", 4.1, location="Connaught Place"),
+            restaurant(3, "Unknown fusion", 3.9, name="Luxury Lounge"),
+        ]
+        single = [stable(RestaurantScraper(use_cache=False).enrich_restaurant_data(r)) for r in batch]
+        self.assertEqual([stable(r) for r in self.scraper.enrich_many(batch)], single)
+
+    def test_fields(self):
+        enriched = self.scraper.enrich_many([restaurant(0, "Chinese, north indian, Chinese", 3.0)])[0]
+        self.assertEqual(enriched['cuisines'], ['North Indian', 'Chinese'])
+        self.assertEqual(enriched['rating'], 3.5)
+        self.assertEqual(enriched['price_range'], '₹₹₹')
+        self.assertEqual(enriched['highlights'], ['Multi-Cuisine'])
+        self.assertNotIn('cuisines_text', enriched)
+
+    def test_shares_nested_objects(self):
+        first, second, other_tier, other_cuisine = self.scraper.enrich_many([
+            restaurant(0, "Chinese, Continental", 4.1),
+            restaurant(1, "continental, chinese", 4.2, location="Khan Market"),
+            restaurant(2, "Chinese, Continental", 4.7),
+            restaurant(3, "Bakery", 4.1),
+        ])
+        for field in ('cuisines', 'opening_hours', 'meal_periods', 'highlights'):
+            self.assertIs(first[field], second[field])
+        self.assertIsNot(first['highlights'], other_tier['highlights'])
+        self.assertIs(first['cuisines'], other_tier['cuisines'])
+        self.assertIsNot(first['cuisines'], other_cuisine['cuisines'])
+        self.assertEqual(len(self.scraper._profiles), 2)
+
+
+class TestProcessAllCities(unittest.TestCase):
+    """Parallel runs produce the same cache and coupons as a sequential one"""
+
+    def run_pipeline(self, workers, directory=None, **kwargs):
+        directory = directory or tempfile.mkdtemp()
+        scraper = RestaurantScraper(use_cache=True, max_workers=workers, **kwargs)
+        scraper.cache_file = os.path.join(directory, "restaurant_cache.json")
+        output_file = os.path.join(directory, "coupons.json")
+        added = scraper.process_all_cities(output_file)
+        cache = RestaurantCache(scraper.cache_file).restaurants
+        coupons = CouponStore(output_file).active()
+        return scraper, added, cache, coupons
+
+    def test_parallel_matches_sequential(self):
+        _, added_seq, cache_seq, coupons_seq = self.run_pipeline(1)
+        _, added_par, cache_par, coupons_par = self.run_pipeline(4)
+        self.assertEqual(added_seq, added_par)
+        self.assertEqual(list(cache_seq), list(cache_par))
+        self.assertEqual([stable(r) for r in cache_seq.values()], [stable(r) for r in cache_par.values()])
+        self.assertEqual([stable(c) for c in coupons_seq], [stable(c) for c in coupons_par])
+
+    def test_progress_tracks_every_location(self):
+        scraper, _, _, _ = self.run_pipeline(3)
+        total = sum(len(info['locations']) for info in CITIES_CONFIG.values())
+        self.assertEqual(scraper.progress['total'], total)
+        self.assertEqual(scraper.progress['done'], total)
+        self.assertEqual(scraper.progress['failed'], 0)
+        self.assertEqual(set(scraper.progress['locations'].values()), {'done'})
+
+    def test_fresh_locations_not_rescraped(self):
+        directory = tempfile.mkdtemp()
+        self.run_pipeline(2, directory)
+        journal = os.path.join(directory, "restaurant_cache.json.journal")
+        size = os.path.getsize(journal)
+
+        scraper, _, cache, _ = self.run_pipeline(2, directory)
+        self.assertEqual(scraper.progress['fresh'], scraper.progress['total'])
+        self.assertEqual(scraper.progress['done'], 0)
+        self.assertEqual(os.path.getsize(journal), size)
+        self.assertTrue(cache)
+        self.assertFalse(os.path.exists(scraper.cache_file))  # journal only, not compacted yet
+
+        scraper, _, _, _ = self.run_pipeline(2, directory, cache_ttl=0)
+        self.assertEqual(scraper.progress['done'], scraper.progress['total'])
+
+    def test_shards_written_per_city(self):
+        directory = tempfile.mkdtemp()
+        shard_dir = os.path.join(directory, "restaurants")
+        scraper, _, cache, coupons = self.run_pipeline(2, directory)
+        scraper.process_all_cities(os.path.join(directory, "coupons.json"), shard_dir=shard_dir)
+
+        shards = CityShardStore(shard_dir)
+        self.assertEqual(shards.cities(), list(dict.fromkeys(r['city'] for r in cache.values())))
+        hyderabad = shards.get("Hyderabad")
+        self.assertEqual(set(hyderabad.restaurants), {key for key, r in cache.items() if r['city'] == 'Hyderabad'})
+        self.assertEqual([c['id'] for c in hyderabad.coupons], [c['id'] for c in coupons if c['city'] == 'Hyderabad'])
+        self.assertTrue(hyderabad.coupons)
+
+    def test_vanished_restaurant_coupon_removed(self):
+        directory = tempfile.mkdtemp()
+        self.run_pipeline(2, directory)
+        scraper = RestaurantScraper(use_cache=True, max_workers=2, cache_ttl=0)
+        scraper.cache_file = os.path.join(directory, "restaurant_cache.json")
+        scrape = scraper.scrape_city_restaurants
+
+        def without_karims(city, location):
+            return [r for r in scrape(city, location) if r['name'] != "Karim's"]
+
+        output_file = os.path.join(directory, "coupons.json")
+        with mock.patch.object(scraper, "scrape_city_restaurants", side_effect=without_karims):
+            scraper.process_all_cities(output_file)
+
+        karims = restaurant_key('Delhi', 'Chandni Chowk', "Karim's")
+        self.assertEqual(scraper.merge_summary['removed'], 1)
+        self.assertNotIn(karims, RestaurantCache(scraper.cache_file).restaurants)
+        store = CouponStore(output_file)
+        self.assertIn('removed_at', store.coupons[karims])
+        self.assertNotIn(karims, [c['id'] for c in store.active()])
+
+    def test_without_cache_everything_is_scraped(self):
+        directory = tempfile.mkdtemp()
+        self.run_pipeline(2, directory)
+        scraper = RestaurantScraper(use_cache=False, max_workers=2)
+        scraper.cache_file = os.path.join(directory, "restaurant_cache.json")
+        scraper.process_all_cities(os.path.join(directory, "coupons.json"))
+        self.assertEqual(scraper.progress['done'], scraper.progress['total'])
+
+
+class TestCheckpointResume(unittest.TestCase):
+    """An interrupted run resumes from its checkpoint without scraping finished locations again"""
+
+    def scraper(self, directory, use_cache=True):
+        scraper = RestaurantScraper(use_cache=use_cache, max_workers=3)
+        scraper.cache_file = os.path.join(directory, "restaurant_cache.json")
+        return scraper
+
+    def interrupted_run(self, directory, use_cache=True):
+        scraper = self.scraper(directory, use_cache)
+        scrape = scraper.scrape_city_restaurants
+
+        def failing_scrape(city, location):
+            if city == "Kolkata" and location == "Jadavpur":
+                raise ConnectionError("connection reset")
+            return scrape(city, location)
+
+        with mock.patch.object(scraper, "scrape_city_restaurants", side_effect=failing_scrape):
+            with self.assertRaises(ConnectionError):
+                scraper.process_all_cities(os.path.join(directory, "coupons.json"))
+        return scraper
+
+    def resume(self, directory, use_cache=True):
+        scraper = self.scraper(directory, use_cache)
+        with mock.patch.object(scraper, "scrape_city_restaurants",
+                               wraps=scraper.scrape_city_restaurants) as scrape:
+            scraper.process_all_cities(os.path.join(directory, "coupons.json"))
+        return scraper, [call.args for call in scrape.call_args_list]
+
+    def test_resume_scrapes_only_unfinished_locations(self):
+        for use_cache in (True, False):
+            directory = tempfile.mkdtemp()
+            self.interrupted_run(directory, use_cache)
+            checkpoint_file = os.path.join(directory, "restaurant_cache.json.checkpoint")
+            self.assertTrue(os.path.exists(checkpoint_file))
+
+            with self.assertLogs("restaurant_scraper", "INFO") as logs:
+                scraper, scraped = self.resume(directory, use_cache)
+            kolkata = CITIES_CONFIG["Kolkata"]["locations"]
+            self.assertEqual(scraped, [("Kolkata", location) for location in kolkata[kolkata.index("Jadavpur"):]])
+            self.assertEqual(scraper.progress['done'], len(scraped))
+            self.assertEqual(scraper.progress['resumed'], scraper.progress['total'] - len(scraped))
+            total = scraper.progress['total']
+            self.assertTrue(any(f"[{total}/{total}]" in line for line in logs.output))
+            self.assertFalse(os.path.exists(checkpoint_file))
+
+    def test_resumed_run_matches_clean_run(self):
+        directory = tempfile.mkdtemp()
+        self.interrupted_run(directory)
+        self.resume(directory)
+        clean = tempfile.mkdtemp()
+        self.scraper(clean).process_all_cities(os.path.join(clean, "coupons.json"))
+
+        resumed_cache = RestaurantCache(os.path.join(directory, "restaurant_cache.json")).restaurants
+        clean_cache = RestaurantCache(os.path.join(clean, "restaurant_cache.json")).restaurants
+        self.assertEqual(list(resumed_cache), list(clean_cache))
+        self.assertEqual([stable(c) for c in CouponStore(os.path.join(directory, "coupons.json")).active()],
+                         [stable(c) for c in CouponStore(os.path.join(clean, "coupons.json")).active()])
+
+    def test_stale_checkpoint_discarded(self):
+        path = os.path.join(tempfile.mkdtemp(), "restaurant_cache.json.checkpoint")
+        now = [1_000_000.0]
+        PipelineCheckpoint(path, clock=lambda: now[0]).record("Delhi", "Saket", {"r_1": {"name": "Karim"}})
+        with open(path, 'a') as f:
+            f.write('{"location": "Delhi > Kh')
+        self.assertEqual(PipelineCheckpoint(path, max_age=60, clock=lambda: now[0]).get("Delhi", "Saket"),
+                         {"r_1": {"name": "Karim"}})
+        now[0] += 60
+        self.assertIsNone(PipelineCheckpoint(path, max_age=60, clock=lambda: now[0]).get("Delhi", "Saket"))
+        self.assertFalse(os.path.exists(path))
+
+
+class TestRestaurantCache(unittest.TestCase):
+    """Per-entry fetch times, journaled changes and compaction"""
+
+    def setUp(self):
+        self.now = 1_000_000.0
+        self.path = os.path.join(tempfile.mkdtemp(), "restaurant_cache.json")
+
+    def cache(self, ttl=3600):
+        return RestaurantCache(self.path, ttl=ttl, clock=lambda: self.now)
+
+    KEY = restaurant_key('Delhi', 'Saket', 'Karim')
+
+    def entry(self, rating=4.0, phone="+91-11-4100-0000"):
+        return {'id': 'Del_Saket_0', 'name': 'Karim', 'city': 'Delhi', 'location': 'Saket',
+                'rating': rating, 'phone': phone, 'timestamp': str(self.now)}
+
+    def test_freshness_by_location_and_entry(self):
+        cache = self.cache()
+        self.assertFalse(cache.is_fresh('Delhi', 'Saket'))
+        self.assertTrue(cache.put(self.KEY, self.entry()))
+        cache.mark_location('Delhi', 'Saket')
+        cache.flush()
+
+        reloaded = self.cache()
+        self.assertTrue(reloaded.is_fresh('Delhi', 'Saket'))
+        self.assertEqual(reloaded.restaurants[self.KEY]['fetched_at'], self.now)
+        self.now += 3600
+        self.assertFalse(reloaded.is_fresh('Delhi', 'Saket'))
+
+    def test_unchanged_entries_journal_only_fetch_time(self):
+        cache = self.cache()
+        cache.put(self.KEY, self.entry())
+        cache.flush()
+        self.now += 10
+        self.assertFalse(cache.put(self.KEY, self.entry(phone="+91-11-4999-9999")))
+        self.assertTrue(cache.put(self.KEY, self.entry(rating=4.4)))
+        cache.flush()
+
+        with open(cache.journal_path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records[1], {'restaurant': self.KEY, 'fetched_at': self.now})
+        self.assertEqual(records[2]['entry']['rating'], 4.4)
+        self.assertEqual(self.cache().restaurants[self.KEY]['rating'], 4.4)
+
+    def test_rescrape_replaces_location(self):
+        cache = self.cache()
+        gone = restaurant_key('Delhi', 'Saket', 'Closed Diner')
+        cache.replace_location('Delhi', 'Saket', {self.KEY: self.entry(), gone: {**self.entry(), 'name': 'Closed Diner'}})
+        cache.flush()
+        self.now += 7200
+
+        self.assertFalse(cache.is_fresh('Delhi', 'Saket'))
+        self.assertEqual(cache.replace_location('Delhi', 'Saket', {self.KEY: self.entry()}), 1)
+        cache.flush()
+        self.now += 60
+        reloaded = self.cache()
+        self.assertEqual(list(reloaded.restaurants), [self.KEY])
+        self.assertTrue(reloaded.is_fresh('Delhi', 'Saket'))
+
+    def test_compaction_keeps_state(self):
+        cache = self.cache()
+        cache.put(self.KEY, self.entry())
+        cache.mark_location('Delhi', 'Saket')
+        cache.flush()
+        cache.compact()
+
+        with open(self.path) as f:
+            self.assertIn(self.KEY, json.load(f))
+        with open(cache.journal_path) as f:
+            self.assertEqual(len(f.readlines()), 1)  # just the location fetch time
+        self.assertTrue(self.cache().is_fresh('Delhi', 'Saket'))
+
+    def test_torn_journal_line_ignored(self):
+        cache = self.cache()
+        cache.put(self.KEY, self.entry())
+        cache.flush()
+        with open(cache.journal_path, 'a') as f:
+            f.write('{"restaurant": "r_0a1b')
+        self.assertIn(self.KEY, self.cache().restaurants)
+
+    def test_old_snapshot_keys_migrated(self):
+        with open(self.path, 'w') as f:
+            json.dump({'Delhi_Del_Saket_0': self.entry()}, f)
+        self.assertEqual(list(self.cache().restaurants), [self.KEY])
+
+
+class TestCouponIds(unittest.TestCase):
+    """Coupons are identified by a content hash, separate from the display code"""
+
+    def setUp(self):
+        self.scraper = RestaurantScraper(use_cache=False)
+
+    def coupon(self, **kwargs):
+        enriched = self.scraper.enrich_many([restaurant(0, "North Indian", **kwargs)])[0]
+        return self.scraper.generate_coupon_from_restaurant(enriched, 'Delhi')
+
+    def test_id_is_stable_and_distinct_from_code(self):
+        karim = self.coupon(name="Karim's")
+        self.assertEqual(karim['id'], restaurant_key('Delhi', 'Saket', "Karim's"))
+        self.assertEqual(karim['id'], restaurant_key(' delhi', 'SAKET', "karim's "))
+        self.assertEqual(karim['coupon_code'], 'DELSAK20')
+
+        neighbour = self.coupon(name="Moti Mahal")
+        self.assertEqual(neighbour['coupon_code'], karim['coupon_code'])
+        self.assertNotEqual(neighbour['id'], karim['id'])
+
+    def test_same_code_restaurants_all_kept(self):
+        output_file = os.path.join(tempfile.mkdtemp(), "coupons.json")
+        batch = [restaurant(i, "North Indian", name=name) for i, name in enumerate(["Karim's", "Moti Mahal"])]
+        self.assertEqual(self.scraper.integrate_with_coupons_file(self.scraper.enrich_many(batch), output_file), 2)
+        self.assertEqual(len(CouponStore(output_file).active()), 2)
+
+    def test_legacy_coupons_adopted(self):
+        output_file = os.path.join(tempfile.mkdtemp(), "coupons.json")
+        legacy = {key: value for key, value in self.coupon(name="Karim's").items() if key not in ('id', 'origin')}
+        with open(output_file, 'w') as f:
+            json.dump({"coupons": [{"coupon_code": "SWIGGY100", "category": "food"}, legacy]}, f)
+
+        self.scraper.integrate_with_coupons_file(self.scraper.enrich_many([restaurant(0, "North Indian", name="Karim's")]),
+                                                 output_file)
+        self.assertEqual(self.scraper.merge_summary['added'], 0)
+        store = CouponStore(output_file)
+        self.assertEqual(list(store.coupons), ["SWIGGY100", restaurant_key('Delhi', 'Saket', "Karim's")])
+        self.assertFalse(os.path.exists(store.journal_path))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
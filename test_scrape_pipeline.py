@@ -0,0 +1,125 @@
+"""
+Scrape Pipeline Tests
+Tests the staged fetch/parse/normalize/store run with a fake scraper
+"""
+
+import os
+import tempfile
+import unittest
+
+from selector_strategy import Selector, SelectorStrategy
+from url_memory import UrlSuccessMemory
+from page_cache import PageCache
+from scrape_pipeline import ScrapePipeline, _CategoryJob
+
+STATE_DIR = tempfile.mkdtemp()
+
+CARD_SELECTORS = [Selector("card", "div", "class", "card")]
+
+FULL_PAGE = b"""
+<div class="card">One</div><div class="card">Two</div><div class="card">Three</div>
+"""
+EMPTY_PAGE = b"<html><body>No deals today</body></html>"
+
+
+class FakeScraper:
+    """Scraper with canned pages - the first candidate of every category is empty"""
+
+    def __init__(self, source: str = "fake"):
+        self.source = source
+        self.categories = [("a", "a"), ("b", "b")]
+        self.selectors = SelectorStrategy(source)
+        self.url_memory = UrlSuccessMemory(source, state_file=os.path.join(STATE_DIR, f"{source}.json"))
+        self.page_cache = PageCache(source, state_file=os.path.join(STATE_DIR, f"{source}-pages.json"))
+        self.fetched = []
+
+    def _candidate_urls(self, category):
+        return {
+            f"https://example.com/{category}/empty": "deals",
+            f"https://example.com/{category}/full": "deals",
+            f"https://example.com/{category}/unused": "deals",
+        }
+
+    def _fetch(self, url):
+        self.fetched.append(url)
+        return FULL_PAGE if url.endswith("/full") else EMPTY_PAGE
+
+    def _parse_listing_fields(self, soup, category, page_kind):
+        _, cards = self.selectors.select_all(soup, "deals", CARD_SELECTORS)
+        return [
+            {"product_name": card.get_text(), "category": category, "source": self.source}
+            for card in cards
+        ]
+
+    def _get_sample_deals(self):
+        return [{"product_name": "sample", "source": self.source}] * 5
+
+
+class TestScrapePipeline(unittest.TestCase):
+    """Pipeline should fall back across candidates and batch its output"""
+
+    def run_pipeline(self, scrapers, **kwargs):
+        stored = []
+        pipeline = ScrapePipeline(
+            scrapers,
+            store=lambda source, deals: stored.append((source, len(deals))),
+            deal_factory=dict,
+            **kwargs
+        )
+        return pipeline, pipeline.run(), stored
+
+    def test_threaded_run_falls_back_to_next_candidate(self):
+        scraper = FakeScraper("threaded")
+        pipeline, results, stored = self.run_pipeline([scraper], use_processes=False, batch_size=4)
+
+        self.assertEqual(results["threaded"], {"status": "success", "deals_count": 6, "unchanged": False, "sample": False})
+        self.assertEqual(len(pipeline.deals["threaded"]), 6)
+        self.assertNotIn("https://example.com/a/unused", scraper.fetched)
+        # 6 deals in batches of 4
+        self.assertEqual(sorted(count for _, count in stored), [2, 4])
+
+    def test_stage_metrics(self):
+        pipeline, _, _ = self.run_pipeline([FakeScraper("metrics")], use_processes=False)
+        metrics = pipeline.stage_metrics()
+        self.assertEqual(set(metrics), {"fetch", "parse", "normalize", "store"})
+        self.assertEqual(metrics["parse"]["tasks"], 4)
+        self.assertEqual(metrics["parse"]["items"], 6)
+        self.assertEqual(metrics["store"]["items"], 6)
+        self.assertEqual(metrics["store"]["queue_depth"], 0)
+
+    def test_process_pool_parsing_and_selector_replay(self):
+        scraper = FakeScraper("pooled")
+        pipeline, results, _ = self.run_pipeline([scraper], parse_workers=2)
+        self.assertEqual(results["pooled"]["deals_count"], 6)
+        # Selector wins observed in the workers are replayed into the parent
+        self.assertEqual(scraper.selectors.preferred("deals"), "card")
+
+    def test_unchanged_pages_skip_parse_and_store(self):
+        scraper = FakeScraper("repeat")
+        self.run_pipeline([scraper], use_processes=False)
+        scraper.fetched = []
+
+        pipeline, results, stored = self.run_pipeline([scraper], use_processes=False)
+        self.assertTrue(results["repeat"]["unchanged"])
+        self.assertEqual(results["repeat"]["deals_count"], 6)
+        self.assertEqual(stored, [])
+        self.assertEqual(pipeline.stage_metrics()["parse"]["tasks"], 0)
+
+    def test_unfetched_pages_not_recorded(self):
+        scraper = FakeScraper("breaker")
+        full = scraper._fetch
+        scraper._fetch = lambda url: None if url.endswith("/empty") else full(url)  # breaker open
+        self.run_pipeline([scraper], use_processes=False)
+        self.assertNotIn("https://example.com/a/empty", scraper.url_memory.stats["a"])
+        self.assertEqual(scraper.url_memory.stats["a"]["https://example.com/a/full"]["successes"], 1)
+
+    def test_source_cap_stops_new_fetches(self):
+        scraper = FakeScraper("capped")
+        pipeline = ScrapePipeline([scraper], deal_factory=dict, max_deals_per_source=3, use_processes=False)
+        pipeline._parsed_counts["capped"] = 3
+        self.assertIsNone(pipeline._fetch_next(_CategoryJob(scraper, "a")))
+        self.assertEqual(scraper.fetched, [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
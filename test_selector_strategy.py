@@ -0,0 +1,101 @@
+"""
+Selector Strategy Tests
+Tests single-pass card matching and learned selector ordering
+"""
+
+import unittest
+from bs4 import BeautifulSoup
+
+from selector_strategy import Selector, SelectorStrategy
+
+CARD_SELECTORS = [
+    Selector("deal-grid-item", "div", "class", "DealGridItem"),
+    Selector("deal-card", "div", "class", "deal-card"),
+    Selector("search-result", "div", "data-component-type", "s-search-result", "exact"),
+]
+
+PAGE = """
+<html><body>
+  <div class="deal-card x"><span>A</span></div>
+  <div class="deal-card"><span>B</span></div>
+  <div data-component-type="s-search-result"><span>C</span></div>
+</body></html>
+"""
+
+
+class TestSelector(unittest.TestCase):
+    """Selector matching should agree with find_all class matching"""
+
+    def test_matches_same_tags_as_find_all(self):
+        soup = BeautifulSoup(PAGE, "html.parser")
+        selector = CARD_SELECTORS[1]
+        expected = soup.find_all('div', {'class': lambda x: x and 'deal-card' in x})
+        found = [tag for tag in soup.find_all('div') if selector.matches(tag)]
+        self.assertEqual(found, expected)
+
+    def test_exact_match_on_multi_valued_class(self):
+        soup = BeautifulSoup('<div class="col _2-gKeQ"></div>', "html.parser")
+        selector = Selector("col", "div", "class", "col _2-gKeQ", "exact")
+        self.assertTrue(selector.matches(soup.div))
+        self.assertIs(selector.find(soup), soup.div)
+
+    def test_tag_only_selector(self):
+        soup = BeautifulSoup('<div><h2>Title</h2></div>', "html.parser")
+        self.assertEqual(Selector("h2", "h2").find(soup).get_text(), "Title")
+
+
+class TestSelectorStrategy(unittest.TestCase):
+    """Strategy should remember the winning selector and decay old wins"""
+
+    def test_select_all_uses_default_order(self):
+        strategy = SelectorStrategy("amazon")
+        soup = BeautifulSoup(PAGE, "html.parser")
+        selector, cards = strategy.select_all(soup, "deals", CARD_SELECTORS)
+        self.assertEqual(selector.name, "deal-card")
+        self.assertEqual(len(cards), 2)
+        self.assertEqual(strategy.preferred("deals"), "deal-card")
+
+    def test_select_all_prefers_remembered_selector(self):
+        strategy = SelectorStrategy("amazon")
+        strategy.record("deals", "search-result")
+        soup = BeautifulSoup(PAGE, "html.parser")
+        selector, cards = strategy.select_all(soup, "deals", CARD_SELECTORS)
+        self.assertEqual(selector.name, "search-result")
+        self.assertEqual(len(cards), 1)
+
+    def test_stale_choice_decays(self):
+        strategy = SelectorStrategy("amazon", decay=0.5)
+        strategy.record("deals", "deal-card")
+        strategy.record("deals", "search-result")
+        strategy.record("deals", "search-result")
+        self.assertEqual(strategy.preferred("deals"), "search-result")
+        self.assertEqual(strategy.stats()["deals"]["deal-card"], 0.25)
+
+    def test_no_match_records_miss(self):
+        strategy = SelectorStrategy("amazon", decay=0.5)
+        strategy.record("deals", "deal-card")
+        soup = BeautifulSoup("<div class='other'></div>", "html.parser")
+        selector, cards = strategy.select_all(soup, "deals", CARD_SELECTORS)
+        self.assertIsNone(selector)
+        self.assertEqual(cards, [])
+        self.assertEqual(strategy.stats()["deals"]["deal-card"], 0.5)
+
+    def test_find_keeps_specific_selector_first(self):
+        strategy = SelectorStrategy("amazon")
+        image_selectors = [
+            Selector("a-dynamic-image", "img", "class", "a-dynamic-image", "exact"),
+            Selector("img", "img"),
+        ]
+        # The catch-all matched on earlier cards without a product image...
+        for _ in range(5):
+            strategy.record("card.image", "img")
+        # ...but here it would pick the badge instead of the product photo
+        card = BeautifulSoup('<div><img src="prime-badge.png"><img class="a-dynamic-image" src="product.jpg"></div>',
+                             "html.parser")
+        self.assertEqual(strategy.find(card, "card.image", image_selectors)["src"], "product.jpg")
+        bare = BeautifulSoup('<div><img src="only.jpg"></div>', "html.parser")
+        self.assertEqual(strategy.find(bare, "card.image", image_selectors)["src"], "only.jpg")
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,176 @@
+"""
+Thumbnail Tests
+Tests the /img/<hash> thumbnail cache against a local HTTP stub
+"""
+
+import io
+import zlib
+import struct
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from thumbnails import ThumbnailCache, Image, CARD_SIZE, FAILED_RETRY_SECONDS, url_hash
+
+
+def png_bytes(width=64, height=40):
+    """A valid solid-colour PNG"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + b"\xcc\x33\x33" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows))
+            + chunk(b"IEND", b""))
+
+
+class StubImageHandler(BaseHTTPRequestHandler):
+    """Serves a PNG at /photo.png, everything else is a 404"""
+
+    hits = []
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        if self.path == "/photo.png":
+            status, content_type, body = 200, "image/png", png_bytes()
+        else:
+            status, content_type, body = 404, "text/plain", b"missing"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ThumbnailTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubImageHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubImageHandler.hits = []
+        self.now = 1_000_000.0
+        self.directory = tempfile.mkdtemp()
+        self.cache = ThumbnailCache(self.directory, clock=lambda: self.now)
+        self.photo = f"{self.base}/photo.png"
+        self.missing = f"{self.base}/missing.png"
+        self.cache.register([self.photo, self.missing, "", "data:image/png;base64,xx"])
+
+
+class TestThumbnailCache(ThumbnailTestCase):
+    """Source images are fetched once and served from disk"""
+
+    def test_only_registered_urls_rewritten(self):
+        self.assertEqual(self.cache.url_for(self.photo), f"/img/{url_hash(self.photo)}")
+        self.assertEqual(self.cache.url_for("https://example.com/other.jpg"), "https://example.com/other.jpg")
+        self.assertEqual(self.cache.url_for(""), "")
+        self.assertEqual(len(self.cache.sources), 2)
+
+    def test_fetches_source_once(self):
+        key = url_hash(self.photo)
+        first = self.cache.get(key)
+        second = ThumbnailCache(self.directory).get(key)  # fresh instance, disk only
+        self.assertIsNotNone(first)
+        self.assertEqual(first, second)
+        self.assertEqual(StubImageHandler.hits, ["/photo.png"])
+
+    def test_concurrent_requests_share_fetch(self):
+        key = url_hash(self.photo)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get(key))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(StubImageHandler.hits, ["/photo.png"])
+
+    def test_failed_source_retried_later(self):
+        key = url_hash(self.missing)
+        self.assertIsNone(self.cache.get(key))
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(StubImageHandler.hits, ["/missing.png"])
+        self.now += FAILED_RETRY_SECONDS
+        self.cache.get(key)
+        self.assertEqual(StubImageHandler.hits, ["/missing.png", "/missing.png"])
+
+    def test_concurrent_requests_share_failure(self):
+        key = url_hash(self.missing)
+
+        def slow_failure(url):
+            time.sleep(0.2)
+            return None
+
+        with mock.patch.object(self.cache, "_fetch", side_effect=slow_failure) as fetch:
+            threads = [threading.Thread(target=self.cache.get, args=(key,)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_unknown_and_malformed_keys(self):
+        self.assertIsNone(self.cache.get("0" * 16))
+        self.assertIsNone(self.cache.get("../../etc/passwd"))
+        self.assertEqual(StubImageHandler.hits, [])
+
+    def test_resized_to_card(self):
+        body, content_type = self.cache.get(url_hash(self.photo))
+        self.assertEqual(content_type, "image/jpeg")
+        with Image.open(io.BytesIO(body)) as image:
+            self.assertEqual(image.size, CARD_SIZE)
+
+
+class TestThumbnailRoute(ThumbnailTestCase):
+    """/img/<hash> serves cached thumbnails with long-lived cache headers"""
+
+    def setUp(self):
+        super().setUp()
+        import web_app
+        self.web_app = web_app
+        self.client = web_app.app.test_client()
+        patcher = mock.patch.object(web_app, "thumbnails", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_serves_thumbnail(self):
+        response = self.client.get(f"/img/{url_hash(self.photo)}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("image/"))
+        self.assertIn("max-age=", response.headers["Cache-Control"])
+
+    def test_unfetchable_source_redirects(self):
+        response = self.client.get(f"/img/{url_hash(self.missing)}")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.headers["Location"], self.missing)
+
+    def test_unknown_hash(self):
+        self.assertEqual(self.client.get("/img/0123456789abcdef").status_code, 404)
+
+    def test_templates_use_thumbnail_urls(self):
+        coupons = [{
+            "coupon_code": "THUMB1", "source": "Teststore", "category": "electronics",
+            "description": "Thumbnail test deal", "discount": "10%", "image_url": self.photo,
+        }]
+        with mock.patch.object(self.web_app, "coupons_cache", coupons), \
+                mock.patch.object(self.web_app, "check_and_refresh"):
+            html = self.client.get("/deals").get_data(as_text=True)
+        self.assertIn(f'src="/img/{url_hash(self.photo)}"', html)
+        self.assertNotIn(f'src="{self.photo}"', html)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
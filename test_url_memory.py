@@ -0,0 +1,111 @@
+"""
+URL Success Memory Tests
+Tests yield ordering, dead URL skipping, persistence and candidate iteration
+"""
+
+import os
+import json
+import tempfile
+import unittest
+
+from url_memory import UrlSuccessMemory
+
+DEALS = "https://www.amazon.in/deals"
+GP_DEALS = "https://www.amazon.in/gp/deals"
+BESTSELLERS = "https://www.amazon.in/gp/bestsellers/"
+
+
+class TestUrlSuccessMemory(unittest.TestCase):
+    """URL memory should order by yield and park failing URLs"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.tmp_dir.name, "url_stats.json")
+        self.memory = UrlSuccessMemory("amazon", state_file=self.state_file,
+                                       failure_threshold=2, probe_interval=100)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_untried_urls_keep_default_order(self):
+        urls = [DEALS, GP_DEALS, BESTSELLERS]
+        self.assertEqual(self.memory.order("electronics", urls), urls)
+
+    def test_order_by_recent_yield(self):
+        self.memory.record("electronics", DEALS, 0)
+        self.memory.record("electronics", BESTSELLERS, 12)
+        ordered = self.memory.order("electronics", [DEALS, GP_DEALS, BESTSELLERS])
+        self.assertEqual(ordered[0], BESTSELLERS)
+        # Statistics are per category
+        self.assertEqual(self.memory.order("fashion", [DEALS, BESTSELLERS]), [DEALS, BESTSELLERS])
+
+    def test_failing_url_skipped_until_probe_interval(self):
+        self.memory.record("electronics", DEALS, 0, now=1000)
+        self.assertFalse(self.memory.should_skip("electronics", DEALS, now=1001))
+        self.memory.record("electronics", DEALS, 0, now=1002)
+        self.assertTrue(self.memory.should_skip("electronics", DEALS, now=1050))
+        self.assertFalse(self.memory.should_skip("electronics", DEALS, now=1103))
+
+    def test_success_resets_failures(self):
+        self.memory.record("electronics", DEALS, 0, now=1000)
+        self.memory.record("electronics", DEALS, 0, now=1001)
+        self.memory.record("electronics", DEALS, 5, now=1200)
+        self.assertFalse(self.memory.should_skip("electronics", DEALS, now=1201))
+
+    def test_save_keeps_other_sources(self):
+        other = UrlSuccessMemory("flipkart", state_file=self.state_file)
+        other.record("mobiles", "https://www.flipkart.com/offers", 7)
+        other.save()
+
+        self.memory.record("electronics", DEALS, 3)
+        self.memory.save()
+
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertIn("flipkart", data)
+        self.assertIn("amazon", data)
+
+        reloaded = UrlSuccessMemory("amazon", state_file=self.state_file)
+        self.assertEqual(reloaded.stats["electronics"][DEALS]["successes"], 1)
+
+
+class TestIterCandidates(unittest.TestCase):
+    """Only pages read to the end are recorded"""
+
+    # Stubbed pages - DEALS is empty, GP_DEALS has three deals, BESTSELLERS is blocked
+    PAGES = {DEALS: [], GP_DEALS: ["a", "b", "c"], BESTSELLERS: None}
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.memory = UrlSuccessMemory("amazon", state_file=os.path.join(self.tmp_dir.name, "url_stats.json"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def iterate(self, limit=None):
+        return self.memory.iter_candidates(
+            "electronics", [BESTSELLERS, DEALS, GP_DEALS], self.PAGES.get,
+            lambda url, content: iter(content), limit,
+        )
+
+    def test_full_page_recorded(self):
+        self.assertEqual(list(self.iterate()), ["a", "b", "c"])
+        stats = self.memory.stats["electronics"]
+        self.assertNotIn(BESTSELLERS, stats)  # not fetched
+        self.assertEqual(stats[DEALS]["consecutive_failures"], 1)
+        self.assertEqual(stats[GP_DEALS]["avg_yield"], 1.5)
+
+    def test_limit_not_recorded(self):
+        self.assertEqual(list(self.iterate(limit=2)), ["a", "b"])
+        self.assertNotIn(GP_DEALS, self.memory.stats["electronics"])
+        self.assertEqual(list(self.iterate(limit=0)), [])
+
+    def test_early_stop_not_recorded(self):
+        deals = self.iterate()
+        self.assertEqual(next(deals), "a")
+        deals.close()
+        self.assertNotIn(GP_DEALS, self.memory.stats["electronics"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
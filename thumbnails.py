@@ -0,0 +1,171 @@
+"""
+Thumbnails
+Disk-cached, card-sized copies of deal and restaurant images served from /img/<hash>
+"""
+
+import io
+import os
+import re
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import requests
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_THUMBNAIL_DIR = os.path.join(_file_dir, "data", "thumbnails")
+
+# Cards show images 200px tall at up to ~320px wide - room for 1.5x displays
+CARD_SIZE = (480, 300)
+JPEG_QUALITY = 70
+# Larger source images are not fetched
+MAX_SOURCE_BYTES = 5 * 1024 * 1024
+# Seconds per source fetch
+FETCH_TIMEOUT = 10
+# Seconds before a failed source is fetched again
+FAILED_RETRY_SECONDS = 3600
+# Browser cache lifetime of served thumbnails - a hash always maps to the same source URL
+THUMBNAIL_MAX_AGE = 30 * 24 * 3600
+
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{16}$")
+# Extensions of cached files by content type
+_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+_CONTENT_TYPES = {ext: content_type for content_type, ext in _EXTENSIONS.items()}
+
+
+def url_hash(url: str) -> str:
+    """Thumbnail key of a source URL"""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+def resize_to_card(data: bytes, size: Tuple[int, int] = CARD_SIZE) -> bytes:
+    """Crop and scale an image to card size, re-encoded as progressive JPEG"""
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source).convert("RGB")
+    image = ImageOps.fit(image, size, Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+class ThumbnailCache:
+    """
+    Maps snapshot image URLs to hashes and keeps one resized copy per source
+    on disk. Only registered URLs are fetched, so /img/<hash> is not an open
+    proxy, and concurrent requests for the same image share a single fetch.
+    """
+
+    def __init__(self, directory: str = DEFAULT_THUMBNAIL_DIR, session: Optional[requests.Session] = None,
+                 clock: Callable[[], float] = time.time):
+        self.directory = directory
+        self.session = session or requests.Session()
+        self.clock = clock
+        self.sources: Dict[str, str] = {}
+        self._failed: Dict[str, float] = {}
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, urls: Iterable[str]):
+        """Replace the known sources with the image URLs of a new snapshot"""
+        sources = {url_hash(url): url for url in urls if url and url.startswith(("http://", "https://"))}
+        with self._lock:
+            self.sources = sources
+        logger.info(f"Registered {len(sources)} thumbnail sources")
+
+    def url_for(self, url: str) -> str:
+        """/img/<hash> for registered URLs, anything else unchanged"""
+        if not url:
+            return url
+        key = url_hash(url)
+        return f"/img/{key}" if self.sources.get(key) == url else url
+
+    def source_url(self, key: str) -> Optional[str]:
+        return self.sources.get(key)
+
+    def _cached(self, key: str) -> Optional[Tuple[bytes, str]]:
+        for ext, content_type in _CONTENT_TYPES.items():
+            try:
+                with open(os.path.join(self.directory, f"{key}.{ext}"), 'rb') as f:
+                    return f.read(), content_type
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _fetch(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """Source image bytes and content type, None if unusable"""
+        try:
+            response = self.session.get(url, timeout=FETCH_TIMEOUT, stream=True)
+            with response:
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                if response.status_code != 200 or not content_type.startswith("image/"):
+                    logger.warning(f"Thumbnail source {url} returned {response.status_code} {content_type}")
+                    return None
+                data = b""
+                for chunk in response.iter_content(64 * 1024):
+                    data += chunk
+                    if len(data) > MAX_SOURCE_BYTES:
+                        logger.warning(f"Thumbnail source {url} exceeds {MAX_SOURCE_BYTES} bytes")
+                        return None
+                return data, content_type
+        except requests.RequestException as e:
+            logger.warning(f"Failed to fetch thumbnail source {url}: {e}")
+            return None
+
+    def _store(self, key: str, data: bytes, content_type: str) -> Optional[Tuple[bytes, str]]:
+        try:
+            data, content_type = resize_to_card(data), "image/jpeg"
+        except Exception as e:
+            logger.warning(f"Could not resize image {key}: {e}")
+            return None
+        ext = _EXTENSIONS[content_type]
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{key}.{ext}")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data, content_type
+
+    def _recently_failed(self, key: str) -> bool:
+        return self.clock() - self._failed.get(key, float("-inf")) < FAILED_RETRY_SECONDS
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Thumbnail bytes and content type, fetched and cached on first use"""
+        if not _HASH_PATTERN.match(key):
+            return None
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        url = self.sources.get(key)
+        if url is None or self._recently_failed(key):
+            return None
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            cached = self._cached(key)  # another request may have fetched it meanwhile
+            if cached is not None:
+                return cached
+            if self._recently_failed(key):  # or tried and failed meanwhile
+                return None
+            fetched = self._fetch(url)
+            result = self._store(key, *fetched) if fetched else None
+            if result is None:
+                self._failed[key] = self.clock()
+            else:
+                self._failed.pop(key, None)
+        with self._lock:
+            self._fetch_locks.pop(key, None)
+        return result
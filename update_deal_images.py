@@ -1,5 +1,15 @@
+"""
+Deal Images
+Brand and category images for deals that were scraped without one
+"""
+
 import json
-import re
+import logging
+from typing import Any, Iterable
+
+from brand_matcher import BrandMatcher
+
+logger = logging.getLogger(__name__)
 
 # Brand-to-Image mapping with curated Unsplash URLs specific to each brand/product type
 BRAND_IMAGE_MAPPING = {
@@ -63,61 +73,58 @@ DEFAULT_CATEGORY_IMAGES = {
     'gaming': 'https://images.unsplash.com/photo-1606144042614-b2417e99c4e3?w=400&q=80',  # Gaming
     'beauty': 'https://images.unsplash.com/photo-1527799820374-dcf8d9d4a388?w=400&q=80',  # Beauty
 }
+DEFAULT_IMAGE = 'https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=400&q=80'
 
-def extract_brand(product_name):
-    """Extract brand name from product name"""
-    # Split by space and take first word as brand
-    words = product_name.split()
-    if words:
-        brand = words[0]
-        return brand
-    return None
+# Compiled once - one pass over a product name finds its longest brand
+_BRAND_MATCHER = BrandMatcher(BRAND_IMAGE_MAPPING)
 
 def get_image_for_product(product_name, category):
     """Get appropriate image URL for a product based on brand and category"""
-    brand = extract_brand(product_name)
-    
-    # Check if brand has specific mapping
-    if brand:
-        for key, image_url in BRAND_IMAGE_MAPPING.items():
-            if key.lower() in product_name.lower():
-                return image_url
-    
+    image_url = _BRAND_MATCHER.find(product_name or '')
+    if image_url:
+        return image_url
     # Fall back to category default
-    return DEFAULT_CATEGORY_IMAGES.get(category, 'https://images.unsplash.com/photo-1505740420928-5e560c06d30e?w=400&q=80')
+    return DEFAULT_CATEGORY_IMAGES.get(category, DEFAULT_IMAGE)
 
-# Load and update the combined_deals.json
-json_path = 'deals_bot/data/combined_deals.json'
+def _field(deal: Any, name: str) -> Any:
+    return deal.get(name) if isinstance(deal, dict) else getattr(deal, name, None)
 
-try:
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    print(f"Found {len(data['deals'])} deals to update...")
-    
-    # Update each deal with brand-specific image
-    updated_count = 0
-    for deal in data['deals']:
-        old_image = deal['image_url']
-        new_image = get_image_for_product(deal['product_name'], deal['category'])
-        
-        if old_image != new_image:
-            deal['image_url'] = new_image
-            updated_count += 1
-            print(f"✓ {deal['product_name']:<40} → Brand-specific image")
+def assign_brand_images(deals: Iterable[Any]) -> int:
+    """
+    Ingest step for newly scraped deals (Deal objects or dicts) - gives every
+    deal its brand or category image, returns how many images changed
+    """
+    updated = 0
+    for deal in deals:
+        image_url = get_image_for_product(_field(deal, 'product_name'), _field(deal, 'category'))
+        if _field(deal, 'image_url') == image_url:
+            continue
+        if isinstance(deal, dict):
+            deal['image_url'] = image_url
         else:
-            print(f"→ {deal['product_name']:<40} (already correct)")
-    
-    # Save updated data back
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    
-    print(f"\n✅ Successfully updated {updated_count} deals with brand-specific images!")
-    print(f"📁 File saved: {json_path}")
-    
-except FileNotFoundError:
-    print(f"❌ Error: File not found at {json_path}")
-except json.JSONDecodeError:
-    print(f"❌ Error: Invalid JSON in {json_path}")
-except Exception as e:
-    print(f"❌ Error: {str(e)}")
+            deal.image_url = image_url
+        updated += 1
+    if updated:
+        logger.info(f"Assigned brand images to {updated} deals")
+    return updated
+
+def main(json_path: str = 'deals_bot/data/combined_deals.json'):
+    """Assign brand images to the deals of an existing file"""
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ Error: File not found at {json_path}")
+        return
+    except json.JSONDecodeError:
+        print(f"❌ Error: Invalid JSON in {json_path}")
+        return
+
+    updated_count = assign_brand_images(data['deals'])
+    if updated_count:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    print(f"✅ Assigned images to {updated_count} of {len(data['deals'])} deals in {json_path}")
+
+if __name__ == '__main__':
+    main()
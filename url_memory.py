@@ -0,0 +1,138 @@
+"""
+URL Success Memory
+Persists per-category yield statistics for scraper candidate URLs
+"""
+
+import os
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_file_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_STATE_FILE = os.path.join(_file_dir, "data", "url_stats.json")
+
+# Consecutive empty/failed attempts before a URL is parked
+FAILURE_THRESHOLD = 3
+# How long a parked URL is skipped before it is probed again (seconds)
+PROBE_INTERVAL = 6 * 3600
+# Weight of the latest attempt in the moving average yield
+YIELD_ALPHA = 0.5
+# HTTP statuses of a page that no longer exists - a fetch that yielded nothing,
+# unlike errors and open breakers, which say nothing about the URL
+GONE_STATUSES = (404, 410)
+
+
+class UrlSuccessMemory:
+    """Remembers which candidate URLs yield deals, per source and category"""
+
+    def __init__(self, source: str, state_file: str = DEFAULT_STATE_FILE,
+                 failure_threshold: int = FAILURE_THRESHOLD,
+                 probe_interval: float = PROBE_INTERVAL):
+        self.source = source
+        self.state_file = state_file
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, Dict[str, Any]]] = self._load().get(source, {})
+
+    def _load(self) -> Dict[str, Any]:
+        """Load the whole state file (all sources)"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable URL stats file {self.state_file}: {e}")
+            return {}
+
+    def save(self):
+        """Write this source's statistics, keeping other sources untouched"""
+        with self._lock:
+            try:
+                data = self._load()
+                data[self.source] = self.stats
+                os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+                tmp_path = f"{self.state_file}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp_path, self.state_file)
+            except Exception as e:
+                logger.error(f"Failed to save URL stats: {e}")
+
+    def _entry(self, category: str, url: str) -> Dict[str, Any]:
+        return self.stats.setdefault(category, {}).setdefault(url, {
+            "attempts": 0,
+            "successes": 0,
+            "consecutive_failures": 0,
+            "avg_yield": 0.0,
+            "last_attempt": 0.0,
+            "last_success": 0.0,
+        })
+
+    def order(self, category: str, urls: List[str]) -> List[str]:
+        """Order candidate URLs by recent yield, untried URLs keep their position"""
+        category_stats = self.stats.get(category, {})
+        return sorted(urls, key=lambda url: -category_stats.get(url, {}).get("avg_yield", 0.0))
+
+    def should_skip(self, category: str, url: str, now: Optional[float] = None) -> bool:
+        """True if the URL keeps failing and its probe interval has not passed yet"""
+        entry = self.stats.get(category, {}).get(url)
+        if not entry or entry["consecutive_failures"] < self.failure_threshold:
+            return False
+        now = time.time() if now is None else now
+        return now - entry["last_attempt"] < self.probe_interval
+
+    def record(self, category: str, url: str, deal_count: int, now: Optional[float] = None):
+        """Record the outcome of fetching a candidate URL"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entry(category, url)
+            entry["attempts"] += 1
+            entry["last_attempt"] = now
+            entry["avg_yield"] = round(
+                YIELD_ALPHA * deal_count + (1 - YIELD_ALPHA) * entry["avg_yield"], 3
+            )
+            if deal_count > 0:
+                entry["successes"] += 1
+                entry["consecutive_failures"] = 0
+                entry["last_success"] = now
+            else:
+                entry["consecutive_failures"] += 1
+
+    def iter_candidates(self, category: str, urls: List[str], fetch: Callable[[str], Optional[bytes]],
+                        parse: Callable[[str, bytes], Iterable[Any]], limit: Optional[int] = None) -> Iterator[Any]:
+        """
+        Yield items from the first candidate URL that has any, best yielding URLs first
+        fetch returns None for a page that was not fetched, which is not recorded.
+        A page is recorded only when it was read to the end - one cut short by
+        the limit or by the consumer stopping says nothing about its yield.
+        """
+        if limit is not None and limit <= 0:
+            return
+
+        for url in self.order(category, urls):
+            if self.should_skip(category, url):
+                logger.info(f"Skipping failing {self.source} URL: {url}")
+                continue
+
+            logger.info(f"Trying {self.source} URL: {url}")
+            content = fetch(url)
+            if content is None:
+                continue  # not fetched - no yield to record
+
+            count = 0
+            for item in parse(url, content):
+                count += 1
+                yield item
+                if limit is not None and count >= limit:
+                    return  # truncated, the page's yield is unknown
+            self.record(category, url, count)
+
+            if count:
+                return
@@ -12,9 +12,19 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any
 from bs4 import BeautifulSoup
 
-from flask import Flask, render_template_string, jsonify, request, make_response
+from flask import Flask, render_template_string, jsonify, request, make_response, redirect
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from circuit_breaker import get_breaker, looks_blocked, breaker_status
+from product_matcher import collapse_duplicates
+from price_alerts import SubscriptionStore, DEFAULT_SUBSCRIPTIONS_FILE
+from thumbnails import ThumbnailCache, THUMBNAIL_MAX_AGE
+from deal_categories import CategoryClassifier
+from coupon_store import CouponStore
+from opening_hours import OpeningHoursIndex, parse_open_at, minute_of_week, LOCAL_TZ
+from city_shards import CityShardStore
+from gazetteer import Gazetteer
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
@@ -22,11 +32,32 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Product search breakers cool down faster than the scraper ones - users are waiting
+SEARCH_BREAKER_COOLDOWN = 120
+
 # Global variable to store cached coupons
 coupons_cache = None
 cache_updated = None
 REFRESH_INTERVAL_HOURS = 1  # Refresh every hour for fresh deals
 
+# Card images are served resized from /img/<hash>
+thumbnails = ThumbnailCache()
+# Deal category, icon and gradient - compiled once from data/category_rules.json
+category_classifier = CategoryClassifier.from_file()
+# Opening hours of the coupons snapshot, for the /local open_now and open_at filters
+opening_index = None
+# Coupons written by the restaurant pipeline, served from the shards of sharded cities
+RESTAURANT_COUPON_ORIGIN = "restaurant_scraper"
+# Locality centroids - /local "Near Me" loads only the shards of cities within NEAR_ME_KM
+gazetteer = Gazetteer.from_file()
+NEAR_ME_KM = 5.0
+
+
+@app.template_filter("thumb")
+def thumb_url(url: str) -> str:
+    """Template filter rewriting snapshot image URLs to /img/<hash>"""
+    return thumbnails.url_for(url)
+
 
 # ============================================================================
 # GEOLOCATION HELPER FUNCTIONS
@@ -59,16 +90,22 @@ def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
 def filter_by_distance(restaurants: List[Dict[str, Any]], user_lat: float, user_lng: float, max_distance_km: float = 5.0) -> List[Dict[str, Any]]:
     """
     Filter restaurants by distance from user location
-    Calculates distance and adds it to each restaurant object
+    Calculates distance and adds it to each restaurant object. Restaurants
+    of a locality share its centroid, so the distance is computed once per
+    distinct point and reused for the rest of the group.
     """
     nearby = []
+    distances: Dict[tuple, float] = {}
     
     for restaurant in restaurants:
         rest_lat = restaurant.get('latitude', 0)
         rest_lng = restaurant.get('longitude', 0)
         
         if rest_lat and rest_lng:
-            distance = calculate_distance(user_lat, user_lng, rest_lat, rest_lng)
+            point = (rest_lat, rest_lng)
+            distance = distances.get(point)
+            if distance is None:
+                distance = distances[point] = calculate_distance(user_lat, user_lng, rest_lat, rest_lng)
             
             # Only include if within max distance
             if distance <= max_distance_km:
@@ -553,19 +590,46 @@ def add_default_coupons():
         logger.error(f"Error adding default coupons: {e}")
 
 
+def prepare_coupons(coupons: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop expired coupons, classify the rest and register their card images"""
+    coupons = filter_valid_coupons(coupons)
+    for coupon in coupons:
+        category_classifier.apply(coupon)
+    thumbnails.register(c.get("image_url", "") for c in coupons)
+    return coupons
+
+
+# Restaurant coupons per city, loaded when /local asks for the city and
+# prepared like the snapshot as they load
+restaurant_shards = CityShardStore(ingest=prepare_coupons)
+
+
 def refresh_coupons():
     """Refresh coupons from data file"""
     global coupons_cache, cache_updated
     coupons_cache = load_coupons()
-    # Also filter out expired coupons
-    if coupons_cache:
-        coupons_cache = filter_valid_coupons(coupons_cache)
+    sharded = set(restaurant_shards.cities())
+    if sharded and coupons_cache:
+        coupons_cache = [
+            c for c in coupons_cache
+            if not (c.get("origin") == RESTAURANT_COUPON_ORIGIN and c.get("city") in sharded)
+        ]
+    coupons_cache = prepare_coupons(coupons_cache or [])
+    get_opening_index(coupons_cache)
     cache_updated = datetime.now()
     logger.info(
         f"Coupons refreshed: {len(coupons_cache)} valid coupons at {cache_updated}"
     )
 
 
+def get_opening_index(coupons: List[Dict[str, Any]]) -> OpeningHoursIndex:
+    """Opening-hours index of a coupons snapshot, rebuilt only when the snapshot changes"""
+    global opening_index
+    if opening_index is None or not opening_index.covers(coupons):
+        opening_index = OpeningHoursIndex(coupons)
+    return opening_index
+
+
 def check_and_refresh():
     """Check if refresh needed and refresh if needed"""
     global cache_updated
@@ -1189,6 +1253,25 @@ LOCAL_RESTAURANTS_TEMPLATE = """
                 </form>
             </div>
 
+            <!-- Open Now Filter -->
+            <div class="filter-group">
+                <label>Open</label>
+                <form method="get" style="display: inline; width: 100%;">
+                    <input type="hidden" name="city" value="{{ selected_city }}">
+                    <input type="hidden" name="location" value="{{ selected_location }}">
+                    <input type="hidden" name="meal_period" value="{{ selected_meal }}">
+                    <input type="hidden" name="min_rating" value="{{ min_rating }}">
+                    <input type="hidden" name="price_range" value="{{ selected_price_range }}">
+                    {% for cuisine in selected_cuisines %}
+                    <input type="hidden" name="cuisine" value="{{ cuisine }}">
+                    {% endfor %}
+                    <select name="open_now" onchange="this.form.submit()">
+                        <option value="">Any Time</option>
+                        <option value="1" {% if open_now %}selected{% endif %}>Open Now</option>
+                    </select>
+                </form>
+            </div>
+
             <!-- Near Me Button -->
             <div class="filter-group" style="align-items: flex-end;">
                 {% if near_me %}
@@ -1214,6 +1297,11 @@ LOCAL_RESTAURANTS_TEMPLATE = """
             <h2>🎉 Available Restaurants</h2>
             <span class="deals-count">{{ total_coupons }} restaurants</span>
         </div>
+        {% if top_rated_sample %}
+        <p class="sample-note" style="color: #666; margin: -10px 0 20px;">
+            <i class="fas fa-circle-info"></i> Showing the top-rated restaurants of each city. Pick a city or use Near Me to see every restaurant.
+        </p>
+        {% endif %}
 
         {% if coupons %}
         <div class="restaurant-grid">
@@ -1222,7 +1310,7 @@ LOCAL_RESTAURANTS_TEMPLATE = """
                 <!-- Image Section -->
                 <div class="restaurant-image-wrapper">
                     {% if coupon.image_url and coupon.image_url != '' %}
-                    <img src="{{ coupon.image_url }}" alt="{{ coupon.source }}" class="restaurant-image" onerror="this.style.display='none'">
+                    <img src="{{ coupon.image_url | thumb }}" alt="{{ coupon.source }}" class="restaurant-image" onerror="this.style.display='none'">
                     {% endif %}
                     
                     <!-- Discount Badge -->
@@ -2109,7 +2197,7 @@ DAILY_DEALS_TEMPLATE = """
             {% for deal in featured_deals %}
             <div class="featured-card">
                 {% if deal.image_url and deal.image_url != '' %}
-                <img src="{{ deal.image_url }}" alt="{{ deal.description }}" class="featured-image" onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">
+                <img src="{{ deal.image_url | thumb }}" alt="{{ deal.description }}" class="featured-image" onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">
                 {% endif %}
                 <div class="featured-image" style="background: {{ deal.image_gradient }}; display: {% if deal.image_url and deal.image_url != '' %}none{% else %}flex{% endif %}; align-items: center; justify-content: center;">
                     <i class="fas {{ deal.image_icon }}" style="font-size: 4rem; color: white;"></i>
@@ -2145,7 +2233,7 @@ DAILY_DEALS_TEMPLATE = """
             <div class="deal-card">
                 <div class="deal-image-wrapper">
                     {% if deal.image_url and deal.image_url != '' %}
-                    <img src="{{ deal.image_url }}" alt="{{ deal.description }}" class="deal-image" onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">
+                    <img src="{{ deal.image_url | thumb }}" alt="{{ deal.description }}" class="deal-image" onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">
                     {% endif %}
                     <div class="deal-image" style="background: {{ deal.image_gradient }}; display: {% if deal.image_url and deal.image_url != '' %}none{% else %}flex{% endif %}; align-items: center; justify-content: center;">
                         <i class="fas {{ deal.image_icon }}" style="font-size: 3rem; color: white;"></i>
@@ -4688,7 +4776,8 @@ def load_coupons() -> List[Dict[str, Any]]:
                     data = json.load(f)
                     # Handle different JSON structures
                     if "coupons" in data:
-                        return data.get("coupons", [])
+                        # Through the store so journaled changes and removals apply
+                        return CouponStore(filepath).active()
                     elif "deals" in data:
                         return data.get("deals", [])
             except:
@@ -4739,8 +4828,47 @@ def local_deals():
     check_and_refresh()
     all_coupons = coupons_cache if coupons_cache else load_coupons()
 
+    # Open now / open at, answered from the opening-hours indexes
+    open_now = request.args.get("open_now", "") in ("1", "true", "on")
+    open_at = request.args.get("open_at", "").strip()
+    open_minute = None
+    if open_now:
+        open_minute = minute_of_week(datetime.now(LOCAL_TZ))
+    elif open_at:
+        open_minute = parse_open_at(open_at)
+
     # Filter only food/restaurants
     food_coupons = [c for c in all_coupons if c.get("category") == "food"]
+    if open_minute is not None:
+        food_coupons = get_opening_index(all_coupons).open_at(food_coupons, open_minute)
+
+    # "Near Me" coordinates, if given and valid
+    user_lat = request.args.get("user_lat", "")
+    user_lng = request.args.get("user_lng", "")
+    user_point = None
+    if user_lat and user_lng:
+        try:
+            user_point = (float(user_lat), float(user_lng))
+        except ValueError:
+            pass  # Invalid coordinates, skip geolocation filter
+
+    # Restaurant coupons of sharded cities - the selected city's shard, the
+    # shards of cities within reach of the user, or else the best-rated
+    # coupons of every city
+    city = request.args.get("city", "")
+    top_rated_sample = False
+    if city and city != "all":
+        shards = list(restaurant_shards.shards([city]))
+    elif user_point is not None:
+        shards = list(restaurant_shards.shards(gazetteer.cities_near(*user_point, NEAR_ME_KM)))
+    else:
+        shards = [shard for shard in [restaurant_shards.summary()] if shard is not None]
+        top_rated_sample = bool(shards)
+    for shard in shards:
+        if open_minute is not None:
+            food_coupons.extend(shard.opening_index.open_at(shard.coupons, open_minute))
+        else:
+            food_coupons.extend(shard.coupons)
 
     # Get unique cities from food deals
     all_cities = [
@@ -4759,7 +4887,6 @@ def local_deals():
     # =========================================================================
     # STEP 1: City & Location Filtering
     # =========================================================================
-    city = request.args.get("city", "")
     if city and city != "all":
         food_coupons = [
             c for c in food_coupons if c.get("city") == city or c.get("city") == "all"
@@ -4839,19 +4966,12 @@ def local_deals():
     # =========================================================================
     # STEP 6: Geolocation "Near Me" Filtering
     # =========================================================================
-    user_lat = request.args.get("user_lat", "")
-    user_lng = request.args.get("user_lng", "")
     near_me = False
     
-    if user_lat and user_lng:
-        try:
-            user_lat_val = float(user_lat)
-            user_lng_val = float(user_lng)
-            # Filter restaurants within 5km
-            food_coupons = filter_by_distance(food_coupons, user_lat_val, user_lng_val, max_distance_km=5.0)
-            near_me = True
-        except ValueError:
-            pass  # Invalid coordinates, skip geolocation filter
+    if user_point is not None:
+        # Filter restaurants within 5km
+        food_coupons = filter_by_distance(food_coupons, *user_point, max_distance_km=NEAR_ME_KM)
+        near_me = True
 
     # =========================================================================
     # Pagination
@@ -4878,9 +4998,12 @@ def local_deals():
         selected_meal=selected_meal,
         min_rating=min_rating_val,
         selected_price_range=price_range_filter,
+        open_now=open_now,
+        open_at=open_at,
         user_lat=user_lat,
         user_lng=user_lng,
         near_me=near_me,
+        top_rated_sample=top_rated_sample,
         last_updated=(
             cache_updated.strftime("%Y-%m-%d %H:%M") if cache_updated else "N/A"
         ),
@@ -4934,6 +5057,9 @@ def daily_deals():
     if search_query:
         sorted_coupons = [c for c in sorted_coupons if search_query in c.get("description", "").lower() or search_query in c.get("source", "").lower()]
 
+    # Same product listed by several stores - keep the best priced one
+    sorted_coupons = collapse_duplicates(sorted_coupons, "product_name", "current_price")
+
     # Add image, original_price and sale_price to each deal
     import random
     
@@ -4941,35 +5067,9 @@ def daily_deals():
         """Add image, prices and other details to coupon for deal-style display"""
         discount = coupon.get("discount", "")
         
-        # Generate category-based gradient and icon (no external images)
-        category = coupon.get("category", "") or ""
-        description = coupon.get("description", "").lower()
-        
-        # Determine category gradient and icon
-        if "electronics" in category or "mobile" in description or "phone" in description or "laptop" in description or "tv" in description:
-            gradient = "linear-gradient(135deg, #667eea 0%, #764ba2 100%)"
-            icon = "fa-mobile-alt"
-        elif "fashion" in category or "clothing" in description or "shirt" in description or "shoe" in description or "dress" in description or "wear" in description:
-            gradient = "linear-gradient(135deg, #f093fb 0%, #f5576c 100%)"
-            icon = "fa-tshirt"
-        elif "beauty" in category or "makeup" in description or "skincare" in description or "perfume" in description:
-            gradient = "linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)"
-            icon = "fa-spa"
-        elif "home" in category or "furniture" in description or "kitchen" in description or "decor" in description:
-            gradient = "linear-gradient(135deg, #43e97b 0%, #38f9d7 100%)"
-            icon = "fa-couch"
-        elif "food" in category or "restaurant" in description or "zomato" in description or "swiggy" in description or "pizza" in description:
-            gradient = "linear-gradient(135deg, #fa709a 0%, #fee140 100%)"
-            icon = "fa-utensils"
-        elif "book" in description or "kindle" in description:
-            gradient = "linear-gradient(135deg, #a8edea 0%, #fed6e3 100%)"
-            icon = "fa-book"
-        else:
-            gradient = "linear-gradient(135deg, #ff9a9e 0%, #fecfef 100%)"
-            icon = "fa-shopping-bag"
-        
-        coupon["image_gradient"] = gradient
-        coupon["image_icon"] = icon
+        # Category, gradient and icon are classified when the snapshot loads
+        if "image_icon" not in coupon:
+            category_classifier.apply(coupon)
         
         # Preserve existing image_url if available, otherwise use placeholder
         if not coupon.get("image_url"):
@@ -5544,6 +5644,42 @@ def api_visitors():
     return jsonify(data)
 
 
+# Price-drop alert subscriptions, matched against each scrape by AlertEngine
+# Loaded per request - the scrape process updates the same file
+ALERT_SUBSCRIPTIONS_FILE = DEFAULT_SUBSCRIPTIONS_FILE
+
+
+@app.route("/api/alerts", methods=["POST"])
+def api_create_alert():
+    """Subscribe to alerts, e.g. {"contact": ..., "keywords": "jbl headphones", "max_price": 1500}"""
+    data = request.get_json(silent=True) or {}
+    alert_store = SubscriptionStore(ALERT_SUBSCRIPTIONS_FILE)
+    try:
+        max_price = data.get("max_price")
+        min_discount = data.get("min_discount")
+        sub = alert_store.add(
+            contact=str(data.get("contact", "")).strip(),
+            keywords=str(data.get("keywords", "")),
+            category=str(data.get("category", "")),
+            max_price=float(max_price) if max_price not in (None, "") else None,
+            min_discount=int(min_discount) if min_discount not in (None, "") else None,
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    alert_store.save()
+    return jsonify({"status": "success", "subscription_id": sub.id}), 201
+
+
+@app.route("/api/alerts/<sub_id>", methods=["DELETE"])
+def api_delete_alert(sub_id):
+    """Unsubscribe from an alert"""
+    alert_store = SubscriptionStore(ALERT_SUBSCRIPTIONS_FILE)
+    if not alert_store.remove(sub_id):
+        return jsonify({"status": "error", "error": "Unknown subscription"}), 404
+    alert_store.save()
+    return jsonify({"status": "success"})
+
+
 @app.route("/api/search-products")
 def api_search_products():
     """Search for products across e-commerce sites and return price comparisons"""
@@ -5562,6 +5698,9 @@ def api_search_products():
         flipkart_results = search_flipkart_products(query)
         products.extend(flipkart_results)
 
+        # One result per product across stores, at its lowest price
+        products = collapse_duplicates(products, "title", "price_numeric")
+
         # Sort by price (lowest first)
         products.sort(key=lambda x: x.get("price_numeric", 999999))
 
@@ -5578,6 +5717,11 @@ def api_search_products():
 def search_amazon_products(query):
     """Search Amazon India for products"""
     products = []
+    breaker = get_breaker("amazon", "search", cooldown=SEARCH_BREAKER_COOLDOWN)
+    if not breaker.allow():
+        logger.info("Amazon search circuit open, skipping")
+        return products
+
     try:
         search_url = f"https://www.amazon.in/s?k={query.replace(' ', '+')}"
         headers = {
@@ -5586,7 +5730,10 @@ def search_amazon_products(query):
         }
 
         response = requests.get(search_url, headers=headers, timeout=10)
-        if response.status_code == 200:
+        if response.status_code != 200 or looks_blocked(response):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
             soup = BeautifulSoup(response.text, "html.parser")
 
             # Find product cards
@@ -5645,6 +5792,7 @@ def search_amazon_products(query):
                     continue
 
     except Exception as e:
+        breaker.record_failure()
         logger.error(f"Amazon search error: {e}")
 
     return products
@@ -5653,6 +5801,11 @@ def search_amazon_products(query):
 def search_flipkart_products(query):
     """Search Flipkart for products"""
     products = []
+    breaker = get_breaker("flipkart", "search", cooldown=SEARCH_BREAKER_COOLDOWN)
+    if not breaker.allow():
+        logger.info("Flipkart search circuit open, skipping")
+        return products
+
     try:
         search_url = f"https://www.flipkart.com/search?q={query.replace(' ', '%20')}"
         headers = {
@@ -5661,7 +5814,10 @@ def search_flipkart_products(query):
         }
 
         response = requests.get(search_url, headers=headers, timeout=10)
-        if response.status_code == 200:
+        if response.status_code != 200 or looks_blocked(response):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
             soup = BeautifulSoup(response.text, "html.parser")
 
             # Find product cards
@@ -5721,6 +5877,7 @@ def search_flipkart_products(query):
                     continue
 
     except Exception as e:
+        breaker.record_failure()
         logger.error(f"Flipkart search error: {e}")
 
     return products
@@ -5741,6 +5898,23 @@ def run_server(host="0.0.0.0", port=None):
     app.run(host=host, port=port, debug=False)
 
 
+@app.route("/img/<image_hash>")
+def thumbnail(image_hash):
+    """Card-sized copy of a snapshot image, the original if it can't be fetched"""
+    image = thumbnails.get(image_hash)
+    if image is None:
+        source = thumbnails.source_url(image_hash)
+        if source:
+            return redirect(source)
+        return jsonify({"error": "Unknown image"}), 404
+
+    body, content_type = image
+    response = make_response(body)
+    response.headers["Content-Type"] = content_type
+    response.headers["Cache-Control"] = f"public, max-age={THUMBNAIL_MAX_AGE}, immutable"
+    return response
+
+
 @app.route("/api/refresh")
 def refresh():
     """Manually refresh coupons"""
@@ -5762,6 +5936,7 @@ def status():
             "last_updated": cache_updated.isoformat() if cache_updated else None,
             "coupons_count": len(coupons_cache) if coupons_cache else 0,
             "next_refresh": f"in {REFRESH_INTERVAL_HOURS} hours",
+            "circuit_breakers": breaker_status(),
         }
     )
 